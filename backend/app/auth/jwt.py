@@ -20,6 +20,9 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
+# Usernames allowed to read process-wide internals (cache, buffer and feed stats)
+OPS_USERNAMES = {name.strip() for name in os.getenv("OPS_USERNAMES", "").split(",") if name.strip()}
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 logger = logging.getLogger(__name__)
 
@@ -78,4 +81,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        ) 
\ No newline at end of file
+        )
+
+async def get_ops_user(current_user: User = Depends(get_current_user)):
+    if current_user.username not in OPS_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed"
+        )
+    
+    return current_user
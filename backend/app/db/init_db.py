@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.db.database import engine, Base, get_db
-from app.models import user, account, deposit, trade, trade_detail, trade_screenshot, goal, analysis_result
+from app.models import user, account, deposit, trade, trade_detail, trade_screenshot, goal, analysis_result, account_stats, data_version, fx_rate, balance_entry, balance_checkpoint
+from app.db.migrations import run_migrations
 from app.auth.password import hash_password
 import logging
 
@@ -9,6 +10,7 @@ logger = logging.getLogger(__name__)
 
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    run_migrations()
     logger.info("Tables created")
 
 def init_db():
@@ -0,0 +1,60 @@
+# Versioned schema migrations, applied in order on startup
+import logging
+import pkgutil
+import importlib
+
+from sqlalchemy import text
+
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+def discover():
+    """
+    Revision modules of this package (named r<NNNN>_<name>), oldest
+    first. Each defines `revision`, `description` and `upgrade(connection)`.
+    """
+    modules = [
+        importlib.import_module(f"{__name__}.{info.name}")
+        for info in pkgutil.iter_modules(__path__)
+        if info.name.startswith("r")
+    ]
+    return sorted(modules, key=lambda module: module.revision)
+
+
+def applied_revisions(connection) -> set:
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        "revision VARCHAR(32) PRIMARY KEY, "
+        "description VARCHAR(200), "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return {row[0] for row in connection.execute(text(f"SELECT revision FROM {MIGRATIONS_TABLE}"))}
+
+
+def run_migrations(bind=engine) -> list:
+    """
+    Apply every revision not yet recorded in schema_migrations, each in
+    its own transaction. Revisions must be idempotent, since a database
+    created by create_all may already have what they add.
+    """
+    with bind.begin() as connection:
+        applied = applied_revisions(connection)
+
+    ran = []
+    for module in discover():
+        if module.revision in applied:
+            continue
+
+        with bind.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (revision, description) VALUES (:revision, :description)"),
+                {"revision": module.revision, "description": module.description}
+            )
+        logger.info(f"Applied migration {module.revision}: {module.description}")
+        ran.append(module.revision)
+    return ran
@@ -0,0 +1,31 @@
+# Columns and indexes added to the original tables before revisions
+# were numbered: import dedup keys, snapshot hashes, goal completion
+from sqlalchemy import inspect, text, String, DateTime
+
+revision = "0000"
+description = "Baseline columns and indexes"
+
+COLUMNS = [
+    ("trades", "external_id", String(128)),
+    ("analysis_results", "content_hash", String(64)),
+    ("goals", "completed_at", DateTime(timezone=True)),
+]
+
+INDEXES = [
+    # One trade per broker id and account, so re-imports are skipped
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_trades_account_external_id ON trades (account_id, external_id)",
+    "CREATE INDEX IF NOT EXISTS ix_analysis_results_user_type_created ON analysis_results (user_id, analysis_type, created_at)",
+]
+
+
+def upgrade(connection):
+    inspector = inspect(connection)
+    for table, column, column_type in COLUMNS:
+        # Databases created by create_all already have the column
+        if column not in {existing["name"] for existing in inspector.get_columns(table)}:
+            # Type spelled for the connected database (DATETIME is SQLite only)
+            type_sql = column_type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {type_sql}"))
+
+    for statement in INDEXES:
+        connection.execute(text(statement))
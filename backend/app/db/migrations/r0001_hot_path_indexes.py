@@ -0,0 +1,32 @@
+# Composite indexes matching the filters and orderings of the list,
+# balance and analysis queries
+from sqlalchemy import text
+
+revision = "0001"
+description = "Hot path indexes"
+
+INDEXES = [
+    # Accounts of a user (every ownership check and the portfolio view)
+    "CREATE INDEX IF NOT EXISTS ix_accounts_user_id ON accounts (user_id, id)",
+    # Trade list pages, date-range reports and exports
+    "CREATE INDEX IF NOT EXISTS ix_trades_account_date_open ON trades (account_id, date_open, id)",
+    # Trade list filtered by outcome, still ordered by date
+    "CREATE INDEX IF NOT EXISTS ix_trades_account_outcome_date_open ON trades (account_id, win_loss, date_open, id)",
+    # Open positions only: small, and what the open-trade views scan
+    "CREATE INDEX IF NOT EXISTS ix_trades_open ON trades (account_id, date_open, id) WHERE date_closed IS NULL",
+    # Closed trades in close order (balances, equity curves)
+    "CREATE INDEX IF NOT EXISTS ix_trades_closed ON trades (account_id, date_closed) WHERE date_closed IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS ix_deposits_account_date ON deposits (account_id, date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_trade_details_trade_id ON trade_details (trade_id)",
+    "CREATE INDEX IF NOT EXISTS ix_trade_screenshots_trade_uploaded ON trade_screenshots (trade_id, uploaded_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_goals_user_start_date ON goals (user_id, start_date, id)",
+]
+
+
+def upgrade(connection):
+    for statement in INDEXES:
+        connection.execute(text(statement))
+
+    # Without statistics SQLite prefers the widest matching index and
+    # never picks the partial ones
+    connection.execute(text("ANALYZE"))
@@ -0,0 +1,28 @@
+# Backfill the balance ledger from existing deposits and closed trades
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+revision = "0002"
+description = "Balance ledger backfill"
+
+
+def upgrade(connection):
+    connection.execute(text(
+        "INSERT INTO balance_entries (account_id, occurred_at, amount, source, source_id) "
+        "SELECT account_id, date, amount, 'DEPOSIT', id FROM deposits WHERE amount != 0"
+    ))
+    connection.execute(text(
+        "INSERT INTO balance_entries (account_id, occurred_at, amount, source, source_id) "
+        "SELECT account_id, date_closed, COALESCE(profit_amount, 0) - COALESCE(loss_amount, 0), 'TRADE', id "
+        "FROM trades WHERE date_closed IS NOT NULL "
+        "AND COALESCE(profit_amount, 0) - COALESCE(loss_amount, 0) != 0"
+    ))
+
+    # Imported here: the ledger helpers need the models, which need the app
+    from app.utils.ledger import write_checkpoints
+
+    db = Session(bind=connection)
+    account_ids = [row[0] for row in connection.execute(text("SELECT DISTINCT account_id FROM balance_entries"))]
+    for account_id in account_ids:
+        write_checkpoints(db, account_id)
+    db.flush()
@@ -0,0 +1,11 @@
+# Version column for optimistic concurrency checks on trades
+from sqlalchemy import inspect, text
+
+revision = "0003"
+description = "Trade version column"
+
+
+def upgrade(connection):
+    # Databases created after this revision already have the column
+    if "version" not in {column["name"] for column in inspect(connection).get_columns("trades")}:
+        connection.execute(text("ALTER TABLE trades ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
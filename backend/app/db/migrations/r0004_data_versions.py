@@ -0,0 +1,17 @@
+# Seed data version rows for existing users and accounts
+from sqlalchemy import text
+
+revision = "0004"
+description = "Per-account data versions"
+
+
+def upgrade(connection):
+    # With a row in place every bump is a plain UPDATE, never a racing INSERT
+    connection.execute(text(
+        "INSERT INTO user_data_versions (user_id, version) "
+        "SELECT id, 0 FROM users WHERE id NOT IN (SELECT user_id FROM user_data_versions)"
+    ))
+    connection.execute(text(
+        "INSERT INTO account_data_versions (account_id, version) "
+        "SELECT id, 0 FROM accounts WHERE id NOT IN (SELECT account_id FROM account_data_versions)"
+    ))
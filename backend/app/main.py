@@ -5,13 +5,17 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import logging
 
-from app.routes import users, accounts, trades, deposits, trade_details, screenshots, goals, analysis
+from app.routes import users, accounts, trades, deposits, trade_details, screenshots, goals, analysis, exports, market
 from app.routes import auth_fixed as auth  # Use our fixed auth module
 from app.db.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse
 from app.auth.password import hash_password, verify_password
 from app.auth.jwt import create_access_token
+from app.utils.write_behind import write_buffer
+from app.utils.process_pool import shutdown_process_pool
+from app.utils.jobs import job_manager
+from app.utils.mark_to_market import mark_to_market
 
 # Configure logging
 logging.basicConfig(
@@ -34,6 +38,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 # Include routers
@@ -46,6 +51,32 @@ app.include_router(trade_details.router, prefix="/api/trade-details", tags=["Tra
 app.include_router(screenshots.router, prefix="/api/screenshots", tags=["Screenshots"])
 app.include_router(goals.router, prefix="/api/goals", tags=["Goals"])
 app.include_router(analysis.router, prefix="/api/analysis", tags=["Analysis"])
+app.include_router(exports.router, prefix="/api/export", tags=["Export"])
+app.include_router(market.router, prefix="/api/market", tags=["Market"])
+
+@app.on_event("startup")
+async def migrate_database():
+    # Create missing tables and apply pending schema migrations. Imported
+    # here so init_db's logging setup does not replace the one above
+    from app.db.init_db import create_tables
+    create_tables()
+
+@app.on_event("startup")
+async def start_write_behind():
+    write_buffer.start()
+
+@app.on_event("startup")
+async def start_mark_to_market():
+    # Only runs when PRICE_FEED names a tick source
+    mark_to_market.start()
+
+@app.on_event("shutdown")
+async def flush_write_behind():
+    # Write out any queued snapshots / last_login updates before exiting
+    write_buffer.stop()
+    mark_to_market.stop()
+    job_manager.stop()
+    shutdown_process_pool()
 
 # Direct register endpoint for debugging
 @app.post("/direct-register")
@@ -145,9 +176,8 @@ async def direct_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Ses
                 detail="Invalid credentials - password incorrect",
             )
         
-        # Update last login
-        db_user.last_login = datetime.utcnow()
-        db.commit()
+        # Update last login (written in the background by the write-behind buffer)
+        write_buffer.update(User, db_user.id, {"last_login": datetime.utcnow()})
         
         # Create access token
         access_token = create_access_token(data={"sub": str(db_user.id)})
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -14,6 +14,10 @@ class Account(Base):
     currency = Column(String(10), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        Index("ix_accounts_user_id", "user_id", "id"),
+    )
+    
     # Temporarily commented to fix circular dependencies
     # # user = relationship("User", back_populates="accounts")
     # # trades = relationship("Trade", back_populates="account")
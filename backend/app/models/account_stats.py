@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class AccountStats(Base):
+    __tablename__ = "account_stats"
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    total_count = Column(Integer, nullable=False, default=0)
+    win_count = Column(Integer, nullable=False, default=0)
+    loss_count = Column(Integer, nullable=False, default=0)
+    open_count = Column(Integer, nullable=False, default=0)
+    profit_sum = Column(Numeric(24, 8), nullable=False, default=0)
+    profit_amount_count = Column(Integer, nullable=False, default=0)
+    loss_sum = Column(Numeric(24, 8), nullable=False, default=0)
+    loss_amount_count = Column(Integer, nullable=False, default=0)
+    rr_sum = Column(Numeric(18, 2), nullable=False, default=0)
+    rr_count = Column(Integer, nullable=False, default=0)
+    max_profit = Column(Numeric(18, 8), nullable=True)
+    max_loss = Column(Numeric(18, 8), nullable=True)
+    first_open = Column(DateTime(timezone=True), nullable=True)
+    last_close = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -8,9 +8,14 @@ class AnalysisResult(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    name = Column(String(100), nullable=False)
+    analysis_type = Column(String(50), nullable=False)
     result_data = Column(JSON, nullable=False)
+    content_hash = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        Index("ix_analysis_results_user_type_created", "user_id", "analysis_type", "created_at"),
+    )
+    
     # Temporarily commented to fix circular dependencies
-    # # user = relationship("User", back_populates="analysis_results") 
\ No newline at end of file
+    # # user = relationship("User", back_populates="analysis_results")
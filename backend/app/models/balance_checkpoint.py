@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class BalanceCheckpoint(Base):
+    __tablename__ = "balance_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    # Sum of every ledger entry of the account with occurred_at <= as_of
+    total = Column(Numeric(24, 8), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_balance_checkpoints_account_as_of", "account_id", "as_of", unique=True),
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, CheckConstraint, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class BalanceEntry(Base):
+    __tablename__ = "balance_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    # When the change took effect (deposit date, trade close date)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    amount = Column(Numeric(18, 8), nullable=False)
+    source = Column(String(20), nullable=False)
+    # Deposit or trade id; the row may since have been edited or deleted
+    source_id = Column(Integer, nullable=True)
+    recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        CheckConstraint("source IN ('DEPOSIT', 'TRADE')"),
+        Index("ix_balance_entries_account_occurred", "account_id", "occurred_at", "id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -12,5 +12,9 @@ class Deposit(Base):
     date = Column(DateTime(timezone=True), nullable=False)
     notes = Column(Text)
     
+    __table_args__ = (
+        Index("ix_deposits_account_date", "account_id", "date", "id"),
+    )
+    
     # Relationships
     # account = relationship("Account", back_populates="deposits") 
\ No newline at end of file
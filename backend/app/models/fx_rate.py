@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    currency = Column(String(10), nullable=False)
+    # Price of one unit of `currency` in USD, valid from `as_of` onwards
+    rate = Column(Numeric(18, 8), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_fx_rates_currency_as_of", "currency", "as_of", unique=True),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, Numeric, ForeignKey, Text, CheckConstraint, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Date, Numeric, ForeignKey, Text, CheckConstraint, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -21,6 +21,7 @@ class Goal(Base):
     
     __table_args__ = (
         CheckConstraint("period_type IN ('WEEKLY', 'MONTHLY', 'YEARLY')"),
+        Index("ix_goals_user_start_date", "user_id", "start_date", "id"),
     )
     
     # Temporarily commented to fix circular dependencies
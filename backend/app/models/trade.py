@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text, CheckConstraint, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -24,14 +24,27 @@ class Trade(Base):
     profit_percentage = Column(Numeric(10, 2), nullable=True)
     loss_percentage = Column(Numeric(10, 2), nullable=True)
     balance_after = Column(Numeric(18, 8), nullable=True)
+    # Broker ticket / fill ids or a content hash, set on imported trades
+    external_id = Column(String(128), nullable=True)
+    # Optimistic concurrency: every ORM update checks and bumps it
+    version = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     __table_args__ = (
         CheckConstraint("direction IN ('LONG', 'SHORT')"),
         CheckConstraint("win_loss IN ('WIN', 'LOSS', 'OPEN')"),
+        Index("ix_trades_account_date_open", "account_id", "date_open", "id"),
+        Index("ix_trades_account_outcome_date_open", "account_id", "win_loss", "date_open", "id"),
+        Index("ix_trades_open", "account_id", "date_open", "id",
+              sqlite_where=text("date_closed IS NULL"), postgresql_where=text("date_closed IS NULL")),
+        Index("ix_trades_closed", "account_id", "date_closed",
+              sqlite_where=text("date_closed IS NOT NULL"), postgresql_where=text("date_closed IS NOT NULL")),
+        Index("ix_trades_account_external_id", "account_id", "external_id", unique=True),
     )
     
+    __mapper_args__ = {"version_id_col": version}
+    
     # Relationships
     # account = relationship("Account", back_populates="trades")
     # details = relationship("TradeDetail", back_populates="trade", uselist=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey
+from sqlalchemy import Column, Integer, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -13,5 +13,9 @@ class TradeDetail(Base):
     step_4_execution = Column(Text, nullable=True)
     comments = Column(Text, nullable=True)
     
+    __table_args__ = (
+        Index("ix_trade_details_trade_id", "trade_id"),
+    )
+    
     # Relationships
     # trade = relationship("Trade", back_populates="details") 
\ No newline at end of file
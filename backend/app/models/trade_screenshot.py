@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -14,6 +14,7 @@ class TradeScreenshot(Base):
     
     __table_args__ = (
         CheckConstraint("screenshot_type IN ('HTF', 'BEFORE', 'AFTER', 'OTHER')"),
+        Index("ix_trade_screenshots_trade_uploaded", "trade_id", "uploaded_at", "id"),
     )
     
     # Relationships
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from app.db.database import get_db
-from app.schemas.account import AccountCreate, AccountUpdate, AccountResponse
+from app.schemas.account import AccountCreate, AccountUpdate, AccountResponse, AccountBalance, BalanceEntryResponse
 from app.models.account import Account
+from app.models.account_stats import AccountStats
+from app.models.balance_entry import BalanceEntry
 from app.models.user import User
+from app.models.data_version import AccountDataVersion
 from app.auth.jwt import get_current_user
+from app.utils.data_version import bump_data_version, get_user_stamp, get_account_stamp
+from app.utils.conditional import not_modified
+from app.utils.serialization import parse_fields, list_columns, list_response
+from app.utils import account_stats
+from app.utils.ledger import delete_ledger, balance_at
+from app.utils.pagination import paginate, SortOrder, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
@@ -25,6 +35,9 @@ async def create_account(
     )
     
     db.add(db_account)
+    db.flush()
+    account_stats.init_account_stats(db, db_account.id)
+    bump_data_version(db, current_user.id, db_account.id)
     db.commit()
     db.refresh(db_account)
     
@@ -32,29 +45,108 @@ async def create_account(
 
 @router.get("/", response_model=List[AccountResponse])
 async def get_accounts(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    # Unchanged since the client's copy: 304 without loading the accounts
+    cached = not_modified(request, response, f"u{current_user.id}", get_user_stamp(db, current_user.id))
+    if cached is not None:
+        return cached
+    
     return db.query(Account).filter(Account.user_id == current_user.id).all()
 
 @router.get("/{account_id}", response_model=AccountResponse)
 async def get_account(
     account_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_account = db.query(Account).filter(
-        Account.id == account_id,
-        Account.user_id == current_user.id
-    ).first()
+    # Ownership check and validators in one query; 304 before any loading
+    stamp = get_account_stamp(db, current_user.id, account_id)
+    if stamp is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
     
-    if not db_account:
+    cached = not_modified(request, response, f"a{account_id}", stamp)
+    if cached is not None:
+        return cached
+    
+    return db.get(Account, account_id)
+
+@router.get("/{account_id}/balance", response_model=AccountBalance)
+async def get_account_balance(
+    account_id: int,
+    request: Request,
+    response: Response,
+    at: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Ownership check and validators in one query; 304 before any loading
+    stamp = get_account_stamp(db, current_user.id, account_id)
+    if stamp is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Account not found"
         )
     
-    return db_account
+    cached = not_modified(request, response, f"a{account_id}", stamp)
+    if cached is not None:
+        return cached
+    
+    db_account = db.get(Account, account_id)
+    
+    # Resolved from the nearest ledger checkpoint
+    return {"account_id": account_id, "at": at, "balance": balance_at(db, db_account, at)}
+
+@router.get("/{account_id}/ledger", response_model=List[BalanceEntryResponse])
+async def get_account_ledger(
+    account_id: int,
+    request: Request,
+    response: Response,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    order: SortOrder = SortOrder.ASC,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Ownership check and validators in one query; 304 before any loading
+    stamp = get_account_stamp(db, current_user.id, account_id)
+    if stamp is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
+    
+    cached = not_modified(request, response, f"a{account_id}", stamp)
+    if cached is not None:
+        return cached
+    
+    # Plain rows of the requested columns (plus the page keys), not ORM instances
+    selected = parse_fields(BalanceEntryResponse, fields)
+    query = db.query(*list_columns(BalanceEntry, BalanceEntryResponse, selected, ("occurred_at", "id"))).filter(
+        BalanceEntry.account_id == account_id
+    )
+    
+    # Apply filters if provided
+    if start_date:
+        query = query.filter(BalanceEntry.occurred_at >= start_date)
+    
+    if end_date:
+        query = query.filter(BalanceEntry.occurred_at <= end_date)
+    
+    # Keyset page on (occurred_at, id), served by ix_balance_entries_account_occurred
+    page = paginate(query, BalanceEntry.occurred_at, BalanceEntry.id, response, cursor, limit, order)
+    return list_response(BalanceEntryResponse, page, response, selected)
 
 @router.put("/{account_id}", response_model=AccountResponse)
 async def update_account(
@@ -81,6 +173,7 @@ async def update_account(
     if account.currency is not None:
         db_account.currency = account.currency
     
+    bump_data_version(db, current_user.id, account_id)
     db.commit()
     db.refresh(db_account)
     
@@ -110,7 +203,11 @@ async def delete_account(
             detail="Cannot delete account with existing trades or deposits"
         )
     
+    db.query(AccountStats).filter(AccountStats.account_id == account_id).delete()
+    delete_ledger(db, account_id)
+    db.query(AccountDataVersion).filter(AccountDataVersion.account_id == account_id).delete()
     db.delete(db_account)
+    bump_data_version(db, current_user.id)
     db.commit()
     
     return None 
\ No newline at end of file
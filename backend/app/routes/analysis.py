@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
-import pandas as pd
-from sqlalchemy import func, desc, and_
+from sqlalchemy import func, desc, and_, case
 
 from app.db.database import get_db
 from app.schemas.analysis import (
@@ -11,71 +11,117 @@ from app.schemas.analysis import (
     PatternAnalysis, 
     AnalysisRecommendations,
     AnalysisResponse,
-    AnalysisCreate
+    AnalysisCreate,
+    EquityCurve,
+    RollingMetrics,
+    RollingWindowType,
+    SimulationMode,
+    SimulationResult,
+    JobCreate,
+    JobResponse,
+    PortfolioAnalysis
 )
 from app.models.trade import Trade
 from app.models.account import Account
 from app.models.user import User
 from app.models.analysis_result import AnalysisResult
-from app.auth.jwt import get_current_user
+from app.auth.jwt import get_current_user, get_ops_user
+from app.utils import account_stats
+from app.utils.cache import analysis_cache
+from app.utils.data_version import get_data_version, get_user_stamp
+from app.utils.conditional import not_modified
+from app.utils.write_behind import write_buffer
+from app.utils.snapshots import queue_snapshot, decode_result
+from app.utils.simulation import run_simulation
+from app.utils.jobs import job_manager, JobLimitExceeded
+from app.utils.reports import (
+    pattern_analysis, recommendations, equity_report, rolling_report,
+    current_equity, simulation_samples, portfolio_analysis
+)
+from app.utils.fx import get_fx_table, FxRateMissing
 
 router = APIRouter()
 
 @router.get("/overview", response_model=PerformanceOverview)
 async def get_performance_overview(
+    request: Request,
+    response: Response,
     account_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Base query with user filter
-    query = db.query(Trade).join(Account).filter(Account.user_id == current_user.id)
-    
-    # Apply additional filters if provided
-    if account_id:
-        query = query.filter(Trade.account_id == account_id)
-    
-    if start_date:
-        query = query.filter(Trade.date_open >= start_date)
-    
-    if end_date:
-        query = query.filter(Trade.date_open <= end_date)
-    
-    # Execute query
-    trades = query.all()
+    # Unchanged since the client's copy: 304 before the cache or any query
+    stamp = get_user_stamp(db, current_user.id)
+    cached = not_modified(request, response, f"u{current_user.id}", stamp)
+    if cached is not None:
+        return cached
+    
+    # Serve repeat requests from the cache while the user's data is unchanged
+    data_version = stamp[0]
+    cache_key = (current_user.id, account_id, start_date, end_date, "performance_overview")
+    cached = analysis_cache.get(cache_key, data_version)
+    if cached is not None:
+        return cached
+    
+    # Unfiltered overviews come straight from the running account stats
+    stats = None
+    if not start_date and not end_date:
+        stats = account_stats.summarize_stats(db, current_user.id, account_id)
+    
+    if stats is None:
+        # Single aggregate query with user filter; the database does the counting
+        query = db.query(
+            func.count(Trade.id).label("total_trades"),
+            func.coalesce(func.sum(case((Trade.win_loss == "WIN", 1), else_=0)), 0).label("win_count"),
+            func.coalesce(func.sum(case((Trade.win_loss == "LOSS", 1), else_=0)), 0).label("loss_count"),
+            func.coalesce(func.sum(case((Trade.win_loss == "OPEN", 1), else_=0)), 0).label("open_count"),
+            func.avg(Trade.profit_amount).label("avg_profit"),
+            func.avg(Trade.loss_amount).label("avg_loss"),
+            func.avg(Trade.risk_reward).label("avg_risk_reward"),
+            func.max(Trade.profit_amount).label("largest_profit"),
+            func.max(Trade.loss_amount).label("largest_loss"),
+            func.min(Trade.date_open).label("period_start"),
+            func.max(Trade.date_closed).label("period_end"),
+        ).select_from(Trade).join(Account, Trade.account_id == Account.id).filter(Account.user_id == current_user.id)
+        
+        # Apply additional filters if provided
+        if account_id:
+            query = query.filter(Trade.account_id == account_id)
+        
+        if start_date:
+            query = query.filter(Trade.date_open >= start_date)
+        
+        if end_date:
+            query = query.filter(Trade.date_open <= end_date)
+        
+        # Execute query (always exactly one row)
+        stats = query.one()._asdict()
     
     # Basic stats
-    total_trades = len(trades)
-    win_count = sum(1 for trade in trades if trade.win_loss == "WIN")
-    loss_count = sum(1 for trade in trades if trade.win_loss == "LOSS")
-    open_count = sum(1 for trade in trades if trade.win_loss == "OPEN")
+    total_trades = stats["total_trades"]
+    win_count = int(stats["win_count"])
+    loss_count = int(stats["loss_count"])
+    open_count = int(stats["open_count"])
     
     # Calculate metrics
     win_rate = win_count / (win_count + loss_count) if (win_count + loss_count) > 0 else 0
     
-    # Profit/loss calculations
-    profit_trades = [trade for trade in trades if trade.profit_amount is not None]
-    loss_trades = [trade for trade in trades if trade.loss_amount is not None]
-    
-    avg_profit = sum(trade.profit_amount for trade in profit_trades) / len(profit_trades) if profit_trades else 0
-    avg_loss = sum(trade.loss_amount for trade in loss_trades) / len(loss_trades) if loss_trades else 0
-    
-    # Risk/reward calculations
-    trades_with_rr = [trade for trade in trades if trade.risk_reward is not None]
-    avg_risk_reward = sum(trade.risk_reward for trade in trades_with_rr) / len(trades_with_rr) if trades_with_rr else 0
-    
-    # Largest profit and loss
-    largest_profit = max((trade.profit_amount for trade in profit_trades), default=0)
-    largest_loss = max((trade.loss_amount for trade in loss_trades), default=0)
+    # AVG/MAX ignore NULL amounts and return NULL for an empty set
+    avg_profit = stats["avg_profit"] or 0
+    avg_loss = stats["avg_loss"] or 0
+    avg_risk_reward = stats["avg_risk_reward"] or 0
+    largest_profit = stats["largest_profit"] or 0
+    largest_loss = stats["largest_loss"] or 0
     
     # Trading period
     trading_period = {
-        "start": min((trade.date_open for trade in trades), default=None),
-        "end": max((trade.date_closed for trade in trades if trade.date_closed), default=None),
+        "start": stats["period_start"],
+        "end": stats["period_end"],
     }
     
-    # Save analysis to database
+    # Queue the analysis snapshot (skipped if unchanged since the last one)
     analysis_data = {
         "total_trades": total_trades,
         "win_count": win_count,
@@ -93,16 +139,9 @@ async def get_performance_overview(
         }
     }
     
-    db_analysis = AnalysisResult(
-        user_id=current_user.id,
-        analysis_type="performance_overview",
-        result_data=analysis_data
-    )
-    
-    db.add(db_analysis)
-    db.commit()
+    queue_snapshot(db, current_user.id, "performance_overview", analysis_data)
     
-    return PerformanceOverview(
+    overview = PerformanceOverview(
         total_trades=total_trades,
         win_count=win_count,
         loss_count=loss_count,
@@ -115,246 +154,325 @@ async def get_performance_overview(
         largest_loss=float(largest_loss),
         trading_period=trading_period
     )
+    analysis_cache.set(cache_key, data_version, overview)
+    
+    return overview
 
 @router.get("/patterns", response_model=PatternAnalysis)
 async def get_pattern_analysis(
+    request: Request,
+    response: Response,
     account_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Base query with user filter
-    query = db.query(Trade).join(Account).filter(Account.user_id == current_user.id)
-    
-    # Apply additional filters if provided
-    if account_id:
-        query = query.filter(Trade.account_id == account_id)
-    
-    if start_date:
-        query = query.filter(Trade.date_open >= start_date)
-    
-    if end_date:
-        query = query.filter(Trade.date_open <= end_date)
-    
-    # Execute query
-    trades = query.all()
-    
-    # Currency pair analysis
-    currency_pairs = {}
-    for trade in trades:
-        if trade.currency_pair not in currency_pairs:
-            currency_pairs[trade.currency_pair] = {
-                "total": 0,
-                "wins": 0,
-                "losses": 0,
-                "win_rate": 0,
-                "avg_profit": 0,
-                "avg_loss": 0,
-            }
-        
-        pair_data = currency_pairs[trade.currency_pair]
-        pair_data["total"] += 1
-        
-        if trade.win_loss == "WIN":
-            pair_data["wins"] += 1
-            if trade.profit_amount:
-                pair_data["avg_profit"] = (pair_data["avg_profit"] * (pair_data["wins"] - 1) + trade.profit_amount) / pair_data["wins"]
-        elif trade.win_loss == "LOSS":
-            pair_data["losses"] += 1
-            if trade.loss_amount:
-                pair_data["avg_loss"] = (pair_data["avg_loss"] * (pair_data["losses"] - 1) + trade.loss_amount) / pair_data["losses"]
-        
-        if pair_data["wins"] + pair_data["losses"] > 0:
-            pair_data["win_rate"] = pair_data["wins"] / (pair_data["wins"] + pair_data["losses"])
+    # Unchanged since the client's copy: 304 before the cache or any query
+    stamp = get_user_stamp(db, current_user.id)
+    cached = not_modified(request, response, f"u{current_user.id}", stamp)
+    if cached is not None:
+        return cached
     
-    # Direction analysis
-    direction_stats = {
-        "LONG": {"total": 0, "wins": 0, "losses": 0, "win_rate": 0},
-        "SHORT": {"total": 0, "wins": 0, "losses": 0, "win_rate": 0},
-    }
+    # Serve repeat requests from the cache while the user's data is unchanged
+    data_version = stamp[0]
+    cache_key = (current_user.id, account_id, start_date, end_date, "pattern_analysis")
+    cached = analysis_cache.get(cache_key, data_version)
+    if cached is not None:
+        return cached
     
-    for trade in trades:
-        direction = trade.direction
-        direction_stats[direction]["total"] += 1
-        
-        if trade.win_loss == "WIN":
-            direction_stats[direction]["wins"] += 1
-        elif trade.win_loss == "LOSS":
-            direction_stats[direction]["losses"] += 1
-        
-        wins = direction_stats[direction]["wins"]
-        losses = direction_stats[direction]["losses"]
-        direction_stats[direction]["win_rate"] = wins / (wins + losses) if (wins + losses) > 0 else 0
-    
-    # Time-based analysis
-    time_analysis = {
-        "by_hour": {},
-        "by_day": {},
-        "by_month": {},
-    }
+    analysis_data = await run_in_threadpool(pattern_analysis, db, current_user.id, account_id, start_date, end_date)
     
-    for trade in trades:
-        # By hour
-        hour = trade.date_open.hour
-        if hour not in time_analysis["by_hour"]:
-            time_analysis["by_hour"][hour] = {"total": 0, "wins": 0, "losses": 0, "win_rate": 0}
-        
-        time_analysis["by_hour"][hour]["total"] += 1
-        if trade.win_loss == "WIN":
-            time_analysis["by_hour"][hour]["wins"] += 1
-        elif trade.win_loss == "LOSS":
-            time_analysis["by_hour"][hour]["losses"] += 1
-        
-        wins = time_analysis["by_hour"][hour]["wins"]
-        losses = time_analysis["by_hour"][hour]["losses"]
-        time_analysis["by_hour"][hour]["win_rate"] = wins / (wins + losses) if (wins + losses) > 0 else 0
-        
-        # By day
-        day = trade.date_open.strftime("%A")
-        if day not in time_analysis["by_day"]:
-            time_analysis["by_day"][day] = {"total": 0, "wins": 0, "losses": 0, "win_rate": 0}
-        
-        time_analysis["by_day"][day]["total"] += 1
-        if trade.win_loss == "WIN":
-            time_analysis["by_day"][day]["wins"] += 1
-        elif trade.win_loss == "LOSS":
-            time_analysis["by_day"][day]["losses"] += 1
-        
-        wins = time_analysis["by_day"][day]["wins"]
-        losses = time_analysis["by_day"][day]["losses"]
-        time_analysis["by_day"][day]["win_rate"] = wins / (wins + losses) if (wins + losses) > 0 else 0
-        
-        # By month
-        month = trade.date_open.strftime("%B")
-        if month not in time_analysis["by_month"]:
-            time_analysis["by_month"][month] = {"total": 0, "wins": 0, "losses": 0, "win_rate": 0}
-        
-        time_analysis["by_month"][month]["total"] += 1
-        if trade.win_loss == "WIN":
-            time_analysis["by_month"][month]["wins"] += 1
-        elif trade.win_loss == "LOSS":
-            time_analysis["by_month"][month]["losses"] += 1
-        
-        wins = time_analysis["by_month"][month]["wins"]
-        losses = time_analysis["by_month"][month]["losses"]
-        time_analysis["by_month"][month]["win_rate"] = wins / (wins + losses) if (wins + losses) > 0 else 0
-    
-    # Prepare response
-    patterns = [
-        {"name": "Currency Pair", "data": [{"pair": pair, **stats} for pair, stats in currency_pairs.items()]},
-        {"name": "Direction", "data": [{"direction": direction, **stats} for direction, stats in direction_stats.items()]},
-    ]
-    
-    correlations = []
-    
-    # Save analysis to database
-    analysis_data = {
-        "patterns": patterns,
-        "correlations": correlations,
-        "time_analysis": time_analysis
-    }
-    
-    db_analysis = AnalysisResult(
-        user_id=current_user.id,
-        analysis_type="pattern_analysis",
-        result_data=analysis_data
-    )
+    # Queue the analysis snapshot (skipped if unchanged since the last one)
+    queue_snapshot(db, current_user.id, "pattern_analysis", analysis_data)
     
-    db.add(db_analysis)
-    db.commit()
+    result = PatternAnalysis(**analysis_data)
+    analysis_cache.set(cache_key, data_version, result)
     
-    return PatternAnalysis(
-        patterns=patterns,
-        correlations=correlations,
-        time_analysis=time_analysis
-    )
+    return result
 
 @router.get("/recommendations", response_model=AnalysisRecommendations)
 async def get_recommendations(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Get all trades for the user
-    trades = db.query(Trade).join(Account).filter(Account.user_id == current_user.id).all()
+    # Unchanged since the client's copy: 304 before the cache or any query
+    stamp = get_user_stamp(db, current_user.id)
+    cached = not_modified(request, response, f"u{current_user.id}", stamp)
+    if cached is not None:
+        return cached
     
-    # If no trades, return empty recommendations
-    if not trades:
-        return AnalysisRecommendations(recommendations=[])
+    # Serve repeat requests from the cache while the user's data is unchanged
+    data_version = stamp[0]
+    cache_key = (current_user.id, None, None, None, "recommendations")
+    cached = analysis_cache.get(cache_key, data_version)
+    if cached is not None:
+        return cached
     
-    recommendations = []
+    # Aggregated in SQL over the full history, off the event loop
+    analysis_data = await run_in_threadpool(recommendations, db, current_user.id)
     
-    # Check win rate
-    win_count = sum(1 for trade in trades if trade.win_loss == "WIN")
-    loss_count = sum(1 for trade in trades if trade.win_loss == "LOSS")
+    # Queue the analysis snapshot (skipped if unchanged since the last one)
+    queue_snapshot(db, current_user.id, "recommendations", analysis_data)
     
-    if win_count + loss_count > 0:
-        win_rate = win_count / (win_count + loss_count)
-        
-        if win_rate < 0.3:
-            recommendations.append({
-                "title": "Low Win Rate",
-                "description": "Your win rate is below 30%. Consider reviewing your trading strategy or focusing on the currency pairs with higher win rates.",
-                "confidence": 0.9,
-                "category": "Performance"
-            })
-        elif win_rate > 0.7:
-            recommendations.append({
-                "title": "Excellent Win Rate",
-                "description": "Your win rate is above 70%. Consider increasing your position sizes to maximize profits.",
-                "confidence": 0.9,
-                "category": "Performance"
-            })
-    
-    # Check risk/reward ratio
-    trades_with_rr = [trade for trade in trades if trade.risk_reward is not None]
-    if trades_with_rr:
-        avg_rr = sum(trade.risk_reward for trade in trades_with_rr) / len(trades_with_rr)
-        
-        if avg_rr < 1.0:
-            recommendations.append({
-                "title": "Low Risk/Reward Ratio",
-                "description": "Your average risk/reward ratio is below 1:1. Consider adjusting your take profit and stop loss levels to aim for at least 1:2.",
-                "confidence": 0.8,
-                "category": "Risk Management"
-            })
-    
-    # Check if they're trading too many pairs
-    currency_pairs = {trade.currency_pair for trade in trades}
-    if len(currency_pairs) > 10 and len(trades) < 50:
-        recommendations.append({
-            "title": "Too Many Currency Pairs",
-            "description": "You're trading too many different currency pairs relative to your total trade count. Consider focusing on fewer pairs to develop expertise.",
-            "confidence": 0.7,
-            "category": "Strategy"
-        })
-    
-    # Check for overtrading
-    if len(trades) > 50:
-        trade_days = {trade.date_open.date() for trade in trades}
-        if len(trades) / len(trade_days) > 5:
-            recommendations.append({
-                "title": "Potential Overtrading",
-                "description": "You're averaging more than 5 trades per trading day. Consider quality over quantity and being more selective.",
-                "confidence": 0.6,
-                "category": "Behavior"
-            })
-    
-    # Save analysis to database
-    analysis_data = {
-        "recommendations": recommendations
-    }
+    result = AnalysisRecommendations(**analysis_data)
+    analysis_cache.set(cache_key, data_version, result)
+    
+    return result
+
+@router.get("/equity", response_model=EquityCurve)
+async def get_equity_curve(
+    request: Request,
+    response: Response,
+    account_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    points: int = Query(500, ge=3, le=5000),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Unchanged since the client's copy: 304 before the cache or any query
+    stamp = get_user_stamp(db, current_user.id)
+    cached = not_modified(request, response, f"u{current_user.id}", stamp)
+    if cached is not None:
+        return cached
+    
+    # Serve repeat requests from the cache while the user's data is unchanged
+    data_version = stamp[0]
+    cache_key = (current_user.id, account_id, start_date, end_date, f"equity:{points}")
+    cached = analysis_cache.get(cache_key, data_version)
+    if cached is not None:
+        return cached
     
-    db_analysis = AnalysisResult(
-        user_id=current_user.id,
-        analysis_type="recommendations",
-        result_data=analysis_data
+    curve = await run_in_threadpool(equity_report, db, current_user.id, account_id, start_date, end_date, points)
+    
+    result = EquityCurve(**curve)
+    analysis_cache.set(cache_key, data_version, result)
+    
+    return result
+
+@router.get("/rolling", response_model=RollingMetrics)
+async def get_rolling_metrics(
+    request: Request,
+    response: Response,
+    windows: List[int] = Query([20]),
+    window_type: RollingWindowType = RollingWindowType.TRADES,
+    account_id: Optional[int] = None,
+    points: int = Query(500, ge=2, le=5000),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not windows or len(windows) > 10 or any(window < 1 for window in windows):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide between 1 and 10 windows, each at least 1"
+        )
+    
+    # Unchanged since the client's copy: 304 before the cache or any query
+    stamp = get_user_stamp(db, current_user.id)
+    cached = not_modified(request, response, f"u{current_user.id}", stamp)
+    if cached is not None:
+        return cached
+    
+    # Serve repeat requests from the cache while the user's data is unchanged
+    data_version = stamp[0]
+    cache_key = (current_user.id, account_id, tuple(windows), window_type.value, f"rolling:{points}")
+    cached = analysis_cache.get(cache_key, data_version)
+    if cached is not None:
+        return cached
+    
+    metrics = await run_in_threadpool(rolling_report, db, current_user.id, windows, window_type.value, account_id, points)
+    
+    result = RollingMetrics(**metrics)
+    analysis_cache.set(cache_key, data_version, result)
+    
+    return result
+
+@router.get("/simulation", response_model=SimulationResult)
+async def get_simulation(
+    request: Request,
+    response: Response,
+    account_id: Optional[int] = None,
+    mode: SimulationMode = SimulationMode.R_MULTIPLE,
+    paths: int = Query(10000, ge=100, le=100000),
+    horizon: int = Query(100, ge=1, le=5000),
+    risk_per_trade_pct: float = Query(1.0, gt=0, le=100),
+    drawdown_limit_pct: float = Query(20.0, gt=0, le=100),
+    ruin_pct: float = Query(50.0, gt=0, le=100),
+    seed: Optional[int] = Query(None, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Seeded runs are deterministic, so only those can be cached (here and
+    # by the client)
+    stamp = get_user_stamp(db, current_user.id)
+    if seed is not None:
+        cached = not_modified(request, response, f"u{current_user.id}", stamp)
+        if cached is not None:
+            return cached
+    
+    data_version = stamp[0]
+    cache_key = (
+        current_user.id, account_id, mode.value, paths, horizon,
+        risk_per_trade_pct, drawdown_limit_pct, ruin_pct, seed, "simulation"
+    )
+    if seed is not None:
+        cached = analysis_cache.get(cache_key, data_version)
+        if cached is not None:
+            return cached
+    
+    starting_equity = current_equity(db, current_user.id, account_id)
+    samples = simulation_samples(db, current_user.id, account_id, mode == SimulationMode.R_MULTIPLE)
+    
+    if len(samples) < 2:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least two closed trades (with a stop loss for R mode) are needed to simulate"
+        )
+    
+    simulation = await run_simulation(
+        samples,
+        paths=paths,
+        horizon=horizon,
+        starting_equity=starting_equity,
+        multiplicative=mode == SimulationMode.R_MULTIPLE,
+        risk_fraction=risk_per_trade_pct / 100,
+        drawdown_limit=drawdown_limit_pct / 100,
+        ruin_fraction=ruin_pct / 100,
+        seed=seed
     )
     
-    db.add(db_analysis)
-    db.commit()
+    result = SimulationResult(mode=mode, sample_size=len(samples), seed=seed, **simulation)
+    if seed is not None:
+        analysis_cache.set(cache_key, data_version, result)
     
-    return AnalysisRecommendations(recommendations=recommendations)
+    return result
+
+@router.get("/portfolio", response_model=PortfolioAnalysis)
+async def get_portfolio(
+    base_currency: str = Query("USD", min_length=2, max_length=10),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Rates can change without the user's data changing, so key on both
+    fx = get_fx_table(db)
+    data_version = get_data_version(db, current_user.id)
+    cache_key = (current_user.id, base_currency.upper(), start_date, end_date, fx.signature, "portfolio")
+    cached = analysis_cache.get(cache_key, data_version)
+    if cached is not None:
+        return cached
+    
+    try:
+        # Queries and pandas work off the event loop
+        portfolio = await run_in_threadpool(portfolio_analysis, db, current_user.id, fx, base_currency, start_date, end_date)
+    except FxRateMissing as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{str(e)}; available currencies: {', '.join(fx.currencies())}"
+        )
+    
+    result = PortfolioAnalysis(**portfolio)
+    analysis_cache.set(cache_key, data_version, result)
+    
+    return result
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis_job(
+    job_in: JobCreate,
+    current_user: User = Depends(get_current_user)
+):
+    # Runs in the jobs process pool; poll GET /jobs/{job_id} for progress
+    try:
+        job = job_manager.submit(current_user.id, job_in.kind.value, job_in.params)
+    except JobLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+    
+    return job.snapshot()
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def get_analysis_jobs(
+    current_user: User = Depends(get_current_user)
+):
+    return [job.snapshot() for job in job_manager.for_user(current_user.id)]
+
+@router.get("/jobs/metrics")
+async def get_job_metrics(
+    current_user: User = Depends(get_ops_user)
+):
+    return job_manager.stats()
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_analysis_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    job = job_manager.get(current_user.id, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job.snapshot()
+
+@router.get("/jobs/{job_id}/result", response_model=AnalysisResponse)
+async def get_analysis_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = job_manager.get(current_user.id, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if job.status != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job.snapshot()['status']}"
+        )
+    
+    result = db.query(AnalysisResult).filter(
+        AnalysisResult.id == job.result_id,
+        AnalysisResult.user_id == current_user.id
+    ).first()
+    
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job result has been pruned"
+        )
+    
+    return AnalysisResponse(
+        id=result.id,
+        user_id=result.user_id,
+        analysis_type=result.analysis_type,
+        result_data=decode_result(result.result_data),
+        created_at=result.created_at
+    )
+
+@router.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_analysis_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    job = job_manager.get(current_user.id, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job_manager.cancel(job).snapshot()
 
 @router.get("/history", response_model=List[AnalysisResponse])
 async def get_analysis_history(
@@ -370,4 +488,26 @@ async def get_analysis_history(
     
     query = query.order_by(desc(AnalysisResult.created_at)).limit(limit)
     
-    return query.all() 
\ No newline at end of file
+    # Large payloads are stored compressed
+    return [
+        AnalysisResponse(
+            id=result.id,
+            user_id=result.user_id,
+            analysis_type=result.analysis_type,
+            result_data=decode_result(result.result_data),
+            created_at=result.created_at
+        )
+        for result in query.all()
+    ]
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    current_user: User = Depends(get_ops_user)
+):
+    return analysis_cache.stats()
+
+@router.get("/write-behind/stats")
+async def get_write_behind_stats(
+    current_user: User = Depends(get_ops_user)
+):
+    return write_buffer.stats()
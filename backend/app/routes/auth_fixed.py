@@ -9,6 +9,7 @@ from app.schemas.user import UserCreate, UserResponse, Token
 from app.models.user import User
 from app.auth.password import hash_password, verify_password
 from app.auth.jwt import create_access_token, get_current_user
+from app.utils.write_behind import write_buffer
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -132,9 +133,8 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Update last login
-        db_user.last_login = datetime.utcnow()
-        db.commit()
+        # Update last login (written in the background by the write-behind buffer)
+        write_buffer.update(User, db_user.id, {"last_login": datetime.utcnow()})
         
         # Create access token with user ID as integer
         access_token = create_access_token(
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
-from decimal import Decimal
+from typing import List, Optional
+from datetime import datetime
 
 from app.db.database import get_db
 from app.schemas.deposit import DepositCreate, DepositUpdate, DepositResponse
@@ -9,6 +9,12 @@ from app.models.deposit import Deposit
 from app.models.account import Account
 from app.models.user import User
 from app.auth.jwt import get_current_user
+from app.utils.data_version import bump_data_version, get_account_stamp
+from app.utils.conditional import not_modified
+from app.utils.serialization import parse_fields, list_columns, list_response
+from app.utils.ledger import post_entry, comparable_time
+from app.utils.balances import recompute_balance_after
+from app.utils.pagination import paginate, SortOrder, MAX_PAGE_SIZE
 
 router = APIRouter()
 
@@ -39,10 +45,14 @@ async def create_deposit(
         notes=deposit.notes
     )
     
-    # Update account balance
-    account.current_balance += Decimal(deposit.amount)
-    
     db.add(db_deposit)
+    db.flush()
+    
+    # Update account balance; a backdated deposit shifts later balance_after values
+    post_entry(db, account, deposit.amount, db_deposit.date, "DEPOSIT", db_deposit.id)
+    recompute_balance_after(db, account, db_deposit.date)
+    
+    bump_data_version(db, current_user.id, account_id)
     db.commit()
     db.refresh(db_deposit)
     
@@ -51,22 +61,46 @@ async def create_deposit(
 @router.get("/accounts/{account_id}/deposits", response_model=List[DepositResponse])
 async def get_account_deposits(
     account_id: int,
+    request: Request,
+    response: Response,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    order: SortOrder = SortOrder.ASC,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Check if account exists and belongs to user
-    account = db.query(Account).filter(
-        Account.id == account_id,
-        Account.user_id == current_user.id
-    ).first()
-    
-    if not account:
+    # Check the account belongs to user; its version stamp is the validator
+    stamp = get_account_stamp(db, current_user.id, account_id)
+    if stamp is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Account not found"
         )
     
-    return db.query(Deposit).filter(Deposit.account_id == account_id).all()
+    # Nothing written to the account since the client's copy: skip the query
+    cached = not_modified(request, response, f"a{account_id}", stamp)
+    if cached is not None:
+        return cached
+    
+    # Plain rows of the requested columns (plus the page keys), not ORM instances
+    selected = parse_fields(DepositResponse, fields)
+    query = db.query(*list_columns(Deposit, DepositResponse, selected, ("date", "id"))).filter(
+        Deposit.account_id == account_id
+    )
+    
+    # Apply filters if provided
+    if start_date:
+        query = query.filter(Deposit.date >= start_date)
+    
+    if end_date:
+        query = query.filter(Deposit.date <= end_date)
+    
+    # Keyset page on (date, id), served by ix_deposits_account_date
+    page = paginate(query, Deposit.date, Deposit.id, response, cursor, limit, order)
+    return list_response(DepositResponse, page, response, selected)
 
 @router.get("/deposits/{deposit_id}", response_model=DepositResponse)
 async def get_deposit(
@@ -107,8 +141,9 @@ async def update_deposit(
             detail="Deposit not found"
         )
     
-    # Store original amount for balance adjustment
+    # Store original amount and date for balance adjustment
     original_amount = deposit.amount
+    original_date = deposit.date
     
     # Update deposit fields if provided
     if deposit_update.amount is not None:
@@ -120,11 +155,20 @@ async def update_deposit(
     if deposit_update.notes is not None:
         deposit.notes = deposit_update.notes
     
-    # Adjust account balance if amount changed
-    if deposit_update.amount is not None and deposit_update.amount != original_amount:
+    # Adjust account balance if amount or date changed. A moved deposit is
+    # reversed at its old date and booked again at the new one
+    if deposit.amount != original_amount or deposit.date != original_date:
         account = db.query(Account).filter(Account.id == deposit.account_id).first()
-        account.current_balance = account.current_balance - original_amount + deposit_update.amount
-    
+        if deposit.date != original_date:
+            post_entry(db, account, -original_amount, original_date, "DEPOSIT", deposit.id)
+            post_entry(db, account, deposit.amount, deposit.date, "DEPOSIT", deposit.id)
+        else:
+            post_entry(db, account, deposit.amount - original_amount, deposit.date, "DEPOSIT", deposit.id)
+        
+        # Trades closed from the earlier of the two dates on see a different balance
+        recompute_balance_after(db, account, min(original_date, deposit.date, key=comparable_time))
+    
+    bump_data_version(db, current_user.id, deposit.account_id)
     db.commit()
     db.refresh(deposit)
     
@@ -150,9 +194,11 @@ async def delete_deposit(
     
     # Adjust account balance
     account = db.query(Account).filter(Account.id == deposit.account_id).first()
-    account.current_balance -= deposit.amount
+    post_entry(db, account, -deposit.amount, deposit.date, "DEPOSIT", deposit.id)
     
     db.delete(deposit)
+    recompute_balance_after(db, account, deposit.date)
+    bump_data_version(db, current_user.id, deposit.account_id)
     db.commit()
     
     return None 
\ No newline at end of file
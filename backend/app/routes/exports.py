@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+
+from app.db.database import get_db
+from app.schemas.export import ExportFormat
+from app.models.account import Account
+from app.models.user import User
+from app.auth.jwt import get_current_user
+from app.utils.export import trades_statement, deposits_statement, stream_export, CONTENT_TYPES
+
+router = APIRouter()
+
+def check_export(db: Session, user_id: int, account_id: Optional[int], format: ExportFormat):
+    # Check if account exists and belongs to user
+    if account_id:
+        account = db.query(Account).filter(
+            Account.id == account_id,
+            Account.user_id == user_id
+        ).first()
+        
+        if not account:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Account not found"
+            )
+    
+    # Parquet needs pyarrow, which is optional
+    if format == ExportFormat.PARQUET:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Parquet export requires pyarrow to be installed"
+            )
+
+def export_response(statement, format: ExportFormat, name: str):
+    return StreamingResponse(
+        stream_export(statement, format.value),
+        media_type=CONTENT_TYPES[format.value],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format.value}"'}
+    )
+
+@router.get("/trades")
+async def export_trades(
+    format: ExportFormat = ExportFormat.CSV,
+    account_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_details: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    check_export(db, current_user.id, account_id, format)
+    
+    statement = trades_statement(current_user.id, account_id, start_date, end_date, include_details)
+    return export_response(statement, format, "trades")
+
+@router.get("/deposits")
+async def export_deposits(
+    format: ExportFormat = ExportFormat.CSV,
+    account_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    check_export(db, current_user.id, account_id, format)
+    
+    statement = deposits_statement(current_user.id, account_id, start_date, end_date)
+    return export_response(statement, format, "deposits")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
@@ -8,6 +8,9 @@ from app.schemas.goal import GoalCreate, GoalUpdate, GoalResponse, PeriodType
 from app.models.goal import Goal
 from app.models.user import User
 from app.auth.jwt import get_current_user
+from app.utils.data_version import bump_data_version, get_user_stamp
+from app.utils.conditional import not_modified
+from app.utils.pagination import paginate, SortOrder, MAX_PAGE_SIZE
 
 router = APIRouter()
 
@@ -31,6 +34,7 @@ async def create_goal(
     )
     
     db.add(db_goal)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(db_goal)
     
@@ -38,12 +42,22 @@ async def create_goal(
 
 @router.get("/", response_model=List[GoalResponse])
 async def get_goals(
+    request: Request,
+    response: Response,
     period_type: Optional[PeriodType] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    order: SortOrder = SortOrder.ASC,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    # Unchanged since the client's copy: 304 without running the query
+    cached = not_modified(request, response, f"u{current_user.id}", get_user_stamp(db, current_user.id))
+    if cached is not None:
+        return cached
+    
     query = db.query(Goal).filter(Goal.user_id == current_user.id)
     
     # Apply filters if provided
@@ -56,10 +70,8 @@ async def get_goals(
     if end_date:
         query = query.filter(Goal.end_date <= end_date)
     
-    # Order by start date (newest first)
-    query = query.order_by(Goal.start_date.desc())
-    
-    return query.all()
+    # Keyset page on (start_date, id), oldest first by default
+    return paginate(query, Goal.start_date, Goal.id, response, cursor, limit, order)
 
 @router.get("/{goal_id}", response_model=GoalResponse)
 async def get_goal(
@@ -123,6 +135,7 @@ async def update_goal(
     if goal_update.notes is not None:
         goal.notes = goal_update.notes
     
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(goal)
     
@@ -146,6 +159,7 @@ async def delete_goal(
         )
     
     db.delete(goal)
+    bump_data_version(db, current_user.id)
     db.commit()
     
     return None 
\ No newline at end of file
@@ -0,0 +1,129 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.db.database import get_db
+from app.schemas.market import AccountMarkToMarket, TriggerEvent
+from app.models.account import Account
+from app.models.user import User
+from app.auth.jwt import get_current_user, get_ops_user, verify_token
+from app.utils.mark_to_market import mark_to_market, MARK_TO_MARKET_PUSH_INTERVAL
+
+router = APIRouter()
+
+def check_running():
+    if not mark_to_market.running:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No price feed is running"
+        )
+
+@router.get("/accounts/{account_id}/unrealized", response_model=AccountMarkToMarket)
+async def get_account_unrealized(
+    account_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Check if account exists and belongs to user
+    account = db.query(Account).filter(
+        Account.id == account_id,
+        Account.user_id == current_user.id
+    ).first()
+    
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
+    
+    check_running()
+    return mark_to_market.account(account_id)
+
+@router.get("/accounts/{account_id}/triggers", response_model=List[TriggerEvent])
+async def get_account_triggers(
+    account_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Check if account exists and belongs to user
+    account = db.query(Account).filter(
+        Account.id == account_id,
+        Account.user_id == current_user.id
+    ).first()
+    
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
+    
+    # Stop-loss / take-profit levels crossed since the feed started, newest first
+    return mark_to_market.recent_triggers(account_id)
+
+@router.get("/stats")
+async def get_market_stats(
+    current_user: User = Depends(get_ops_user)
+):
+    return mark_to_market.stats()
+
+async def _until_disconnect(websocket: WebSocket):
+    # Client messages are ignored; this returns once the client goes away
+    async for _ in websocket.iter_text():
+        pass
+
+@router.websocket("/ws")
+async def stream_unrealized(
+    websocket: WebSocket,
+    token: str = Query(...),
+    account_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    # Browsers cannot set headers on a WebSocket, so the JWT comes as ?token=
+    try:
+        user_id = verify_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # The user's accounts, or the requested ones among them
+    query = db.query(Account.id).filter(Account.user_id == user_id)
+    if account_id:
+        query = query.filter(Account.id.in_(account_id))
+    account_ids = [row[0] for row in query.all()]
+    # Hand the connection back to the pool for the life of the socket
+    db.close()
+    
+    if not account_ids:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    subscription = mark_to_market.subscribe(account_ids, asyncio.get_running_loop(), asyncio.Event())
+    receiver = asyncio.create_task(_until_disconnect(websocket))
+    try:
+        await websocket.send_json({"type": "snapshot", "running": mark_to_market.running, "accounts": mark_to_market.snapshot(account_ids)})
+        
+        while True:
+            waiter = asyncio.create_task(subscription.event.wait())
+            done, _ = await asyncio.wait({waiter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                waiter.cancel()
+                break
+            
+            subscription.event.clear()
+            triggers = subscription.take_triggers()
+            if triggers:
+                await websocket.send_json({"type": "trigger", "triggers": triggers})
+            
+            changed = subscription.take()
+            if changed:
+                await websocket.send_json({"type": "update", "accounts": mark_to_market.snapshot(changed)})
+            
+            # Ticks arriving meanwhile coalesce into the next message
+            await asyncio.sleep(MARK_TO_MARKET_PUSH_INTERVAL)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        mark_to_market.unsubscribe(subscription)
+        receiver.cancel()
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import os
 import shutil
 from uuid import uuid4
@@ -14,6 +14,7 @@ from app.models.trade import Trade
 from app.models.account import Account
 from app.models.user import User
 from app.auth.jwt import get_current_user
+from app.utils.pagination import paginate, SortOrder, MAX_PAGE_SIZE
 
 router = APIRouter()
 
@@ -83,6 +84,11 @@ async def upload_screenshot(
 @router.get("/trades/{trade_id}/screenshots", response_model=List[ScreenshotResponse])
 async def get_trade_screenshots(
     trade_id: int,
+    response: Response,
+    screenshot_type: Optional[ScreenshotType] = None,
+    order: SortOrder = SortOrder.ASC,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -98,7 +104,13 @@ async def get_trade_screenshots(
             detail="Trade not found"
         )
     
-    return db.query(TradeScreenshot).filter(TradeScreenshot.trade_id == trade_id).all()
+    query = db.query(TradeScreenshot).filter(TradeScreenshot.trade_id == trade_id)
+    
+    if screenshot_type:
+        query = query.filter(TradeScreenshot.screenshot_type == screenshot_type.value)
+    
+    # Keyset page on (uploaded_at, id), served by ix_trade_screenshots_trade_uploaded
+    return paginate(query, TradeScreenshot.uploaded_at, TradeScreenshot.id, response, cursor, limit, order)
 
 @router.get("/screenshots/{screenshot_id}")
 async def get_screenshot(
@@ -1,32 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from decimal import Decimal
+from datetime import datetime
 
 from app.db.database import get_db
-from app.schemas.trade import TradeCreate, TradeUpdate, TradeResponse, TradeClose
+from app.schemas.trade import (
+    TradeCreate, TradeUpdate, TradeResponse, TradeClose, Direction, WinLoss,
+    ImportFormat, TradeImportResult, TradeCloseBatch, TradeUpdateBatch
+)
 from app.models.trade import Trade
 from app.models.account import Account
 from app.models.user import User
 from app.auth.jwt import get_current_user
+from app.utils.data_version import bump_data_version, get_account_stamp
+from app.utils.conditional import not_modified
+from app.utils.serialization import parse_fields, list_columns, list_response
+from app.utils import account_stats
+from app.utils.ledger import post_entry
+from app.utils.trade_calc import calculate_risk_reward
+from app.utils.trade_import import READERS, import_trades
+from app.utils.trade_close import TradeConflict, commit_trades, apply_trade_close, close_trades
+from app.utils.pagination import paginate, SortOrder, MAX_PAGE_SIZE
 
 router = APIRouter()
 
-def calculate_risk_reward(direction, entry_price, stop_loss, take_profit):
-    if not stop_loss or not take_profit:
-        return None
+def conflict_error(e: TradeConflict) -> HTTPException:
+    # The trade changed under the request; the client can reload and retry
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=str(e)
+    )
+
+def apply_trade_update(trade: Trade, trade_update: TradeUpdate):
+    # Update trade fields if provided
+    if trade_update.date_open is not None:
+        trade.date_open = trade_update.date_open
+    
+    if trade_update.currency_pair is not None:
+        trade.currency_pair = trade_update.currency_pair
+    
+    if trade_update.position_size is not None:
+        trade.position_size = trade_update.position_size
+    
+    if trade_update.direction is not None:
+        trade.direction = trade_update.direction.value
+    
+    if trade_update.entry_price is not None:
+        trade.entry_price = trade_update.entry_price
     
-    if direction == "LONG":
-        risk = entry_price - stop_loss
-        reward = take_profit - entry_price
-    else:  # SHORT
-        risk = stop_loss - entry_price
-        reward = entry_price - take_profit
+    if trade_update.stop_loss is not None:
+        trade.stop_loss = trade_update.stop_loss
     
-    if risk <= 0:
-        return None
+    if trade_update.take_profit is not None:
+        trade.take_profit = trade_update.take_profit
     
-    return round(reward / risk, 2)
+    # Recalculate risk/reward ratio if relevant fields changed
+    if (trade_update.direction is not None or 
+        trade_update.entry_price is not None or 
+        trade_update.stop_loss is not None or 
+        trade_update.take_profit is not None):
+        
+        trade.risk_reward = calculate_risk_reward(
+            trade.direction,
+            trade.entry_price,
+            trade.stop_loss,
+            trade.take_profit
+        )
 
 @router.post("/accounts/{account_id}/trades", response_model=TradeResponse, status_code=status.HTTP_201_CREATED)
 async def create_trade(
@@ -70,14 +110,18 @@ async def create_trade(
     )
     
     db.add(db_trade)
+    account_stats.add_trade(db, db_trade)
+    bump_data_version(db, current_user.id, account_id)
     db.commit()
     db.refresh(db_trade)
     
     return db_trade
 
-@router.get("/accounts/{account_id}/trades", response_model=List[TradeResponse])
-async def get_account_trades(
+@router.post("/accounts/{account_id}/trades/import", response_model=TradeImportResult)
+async def import_account_trades(
     account_id: int,
+    file: UploadFile = File(...),
+    format: Optional[ImportFormat] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -93,7 +137,165 @@ async def get_account_trades(
             detail="Account not found"
         )
     
-    return db.query(Trade).filter(Trade.account_id == account_id).all()
+    # Fall back to the file extension when no format is given
+    if format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        if extension == "csv":
+            format = ImportFormat.CSV
+        elif extension in ("ndjson", "jsonl"):
+            format = ImportFormat.NDJSON
+        elif extension in ("htm", "html"):
+            format = ImportFormat.MT4
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown file type; pass format as one of: {', '.join(f.value for f in ImportFormat)}"
+            )
+    
+    # The upload is parsed row by row from its spooled file, off the event loop
+    records = READERS[format.value](file.file)
+    return await run_in_threadpool(import_trades, db, account, records)
+
+@router.get("/accounts/{account_id}/trades", response_model=List[TradeResponse])
+async def get_account_trades(
+    account_id: int,
+    request: Request,
+    response: Response,
+    currency_pair: Optional[str] = None,
+    direction: Optional[Direction] = None,
+    outcome: Optional[WinLoss] = None,
+    closed: Optional[bool] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    order: SortOrder = SortOrder.ASC,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Check the account belongs to user; its version stamp is the validator
+    stamp = get_account_stamp(db, current_user.id, account_id)
+    if stamp is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
+    
+    # Nothing written to the account since the client's copy: skip the query
+    cached = not_modified(request, response, f"a{account_id}", stamp)
+    if cached is not None:
+        return cached
+    
+    # Plain rows of the requested columns (plus the page keys), not ORM instances
+    selected = parse_fields(TradeResponse, fields)
+    query = db.query(*list_columns(Trade, TradeResponse, selected, ("date_open", "id"))).filter(
+        Trade.account_id == account_id
+    )
+    
+    # Apply filters if provided
+    if currency_pair:
+        query = query.filter(Trade.currency_pair == currency_pair)
+    
+    if direction:
+        query = query.filter(Trade.direction == direction.value)
+    
+    if outcome:
+        query = query.filter(Trade.win_loss == outcome.value)
+    
+    if closed is not None:
+        query = query.filter(Trade.date_closed.isnot(None) if closed else Trade.date_closed.is_(None))
+    
+    if start_date:
+        query = query.filter(Trade.date_open >= start_date)
+    
+    if end_date:
+        query = query.filter(Trade.date_open <= end_date)
+    
+    # Keyset page on (date_open, id), served by ix_trades_account_date_open
+    page = paginate(query, Trade.date_open, Trade.id, response, cursor, limit, order)
+    return list_response(TradeResponse, page, response, selected)
+
+def get_user_trades(db: Session, user_id: int, trade_ids) -> dict:
+    """
+    Load the user's trades with the given ids in one query. Raises 400
+    for repeated ids and 404 naming any id that is missing or not the
+    user's.
+    """
+    if len(set(trade_ids)) != len(trade_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each trade can appear only once per batch"
+        )
+    
+    trades = {
+        trade.id: trade
+        for trade in db.query(Trade).join(Account).filter(
+            Trade.id.in_(trade_ids),
+            Account.user_id == user_id
+        ).all()
+    }
+    
+    missing = [trade_id for trade_id in trade_ids if trade_id not in trades]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trades not found: {', '.join(map(str, missing))}"
+        )
+    
+    return trades
+
+def reload_trades(db: Session, trade_ids):
+    # Fetch the committed rows in one query, in request order
+    trades = {trade.id: trade for trade in db.query(Trade).filter(Trade.id.in_(trade_ids)).all()}
+    return [trades[trade_id] for trade_id in trade_ids]
+
+@router.patch("/trades/close-batch", response_model=List[TradeResponse])
+async def close_trades_batch(
+    batch: TradeCloseBatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    trade_ids = [item.trade_id for item in batch.trades]
+    trades = get_user_trades(db, current_user.id, trade_ids)
+    
+    # Check if any trade is already closed
+    closed = [trade_id for trade_id in trade_ids if trades[trade_id].date_closed]
+    if closed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trades already closed: {', '.join(map(str, closed))}"
+        )
+    
+    try:
+        close_trades(db, current_user.id, trades, batch.trades)
+    except TradeConflict as e:
+        raise conflict_error(e)
+    
+    return reload_trades(db, trade_ids)
+
+@router.patch("/trades/update-batch", response_model=List[TradeResponse])
+async def update_trades_batch(
+    batch: TradeUpdateBatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    trade_ids = [item.trade_id for item in batch.trades]
+    trades = get_user_trades(db, current_user.id, trade_ids)
+    
+    for item in batch.trades:
+        trade = trades[item.trade_id]
+        account_stats.remove_trade(db, trade)
+        apply_trade_update(trade, item)
+        account_stats.add_trade(db, trade)
+    
+    bump_data_version(db, current_user.id, *(trade.account_id for trade in trades.values()))
+    try:
+        commit_trades(db)
+    except TradeConflict as e:
+        raise conflict_error(e)
+    
+    return reload_trades(db, trade_ids)
 
 @router.get("/trades/{trade_id}", response_model=TradeResponse)
 async def get_trade(
@@ -134,42 +336,18 @@ async def update_trade(
             detail="Trade not found"
         )
     
-    # Update trade fields if provided
-    if trade_update.date_open is not None:
-        trade.date_open = trade_update.date_open
+    # Take the old values out of the running account stats
+    account_stats.remove_trade(db, trade)
     
-    if trade_update.currency_pair is not None:
-        trade.currency_pair = trade_update.currency_pair
+    apply_trade_update(trade, trade_update)
     
-    if trade_update.position_size is not None:
-        trade.position_size = trade_update.position_size
+    account_stats.add_trade(db, trade)
     
-    if trade_update.direction is not None:
-        trade.direction = trade_update.direction.value
-    
-    if trade_update.entry_price is not None:
-        trade.entry_price = trade_update.entry_price
-    
-    if trade_update.stop_loss is not None:
-        trade.stop_loss = trade_update.stop_loss
-    
-    if trade_update.take_profit is not None:
-        trade.take_profit = trade_update.take_profit
-    
-    # Recalculate risk/reward ratio if relevant fields changed
-    if (trade_update.direction is not None or 
-        trade_update.entry_price is not None or 
-        trade_update.stop_loss is not None or 
-        trade_update.take_profit is not None):
-        
-        trade.risk_reward = calculate_risk_reward(
-            trade.direction,
-            trade.entry_price,
-            trade.stop_loss,
-            trade.take_profit
-        )
-    
-    db.commit()
+    bump_data_version(db, current_user.id, trade.account_id)
+    try:
+        commit_trades(db)
+    except TradeConflict as e:
+        raise conflict_error(e)
     db.refresh(trade)
     
     return trade
@@ -200,44 +378,23 @@ async def close_trade(
             detail="Trade is already closed"
         )
     
-    # Update trade with closing data
-    trade.date_closed = trade_close.date_closed
-    trade.exit_price = trade_close.exit_price
-    trade.win_loss = trade_close.win_loss.value
+    # Take the open trade out of the running account stats
+    account_stats.remove_trade(db, trade)
     
-    # Calculate profit/loss
     account = db.query(Account).filter(Account.id == trade.account_id).first()
-    position_size = Decimal(trade.position_size)
-    entry_price = Decimal(trade.entry_price)
-    exit_price = Decimal(trade_close.exit_price)
-    
-    if trade.direction == "LONG":
-        if exit_price > entry_price:  # Profit
-            profit_amount = position_size * (exit_price - entry_price)
-            trade.profit_amount = profit_amount
-            trade.profit_percentage = (exit_price / entry_price - 1) * 100
-            account.current_balance += profit_amount
-        else:  # Loss
-            loss_amount = position_size * (entry_price - exit_price)
-            trade.loss_amount = loss_amount
-            trade.loss_percentage = (1 - exit_price / entry_price) * 100
-            account.current_balance -= loss_amount
-    else:  # SHORT
-        if exit_price < entry_price:  # Profit
-            profit_amount = position_size * (entry_price - exit_price)
-            trade.profit_amount = profit_amount
-            trade.profit_percentage = (1 - exit_price / entry_price) * 100
-            account.current_balance += profit_amount
-        else:  # Loss
-            loss_amount = position_size * (exit_price - entry_price)
-            trade.loss_amount = loss_amount
-            trade.loss_percentage = (exit_price / entry_price - 1) * 100
-            account.current_balance -= loss_amount
+    net = apply_trade_close(trade, trade_close)
     
     # Update balance after trade
-    trade.balance_after = account.current_balance
+    trade.balance_after = post_entry(db, account, net, trade.date_closed, "TRADE", trade.id)
     
-    db.commit()
+    account_stats.add_trade(db, trade)
+    
+    bump_data_version(db, current_user.id, trade.account_id)
+    # A backdated close shifts the balance_after of later trades
+    try:
+        commit_trades(db, [(account, trade.date_closed)])
+    except TradeConflict as e:
+        raise conflict_error(e)
     db.refresh(trade)
     
     return trade
@@ -260,17 +417,23 @@ async def delete_trade(
             detail="Trade not found"
         )
     
-    # If trade was closed and had profit/loss, adjust account balance back
+    # If trade was closed, reverse its profit/loss in the ledger at the close
+    # date and fix the balance_after of every later trade
+    rebalance = []
     if trade.date_closed:
         account = db.query(Account).filter(Account.id == trade.account_id).first()
-        
-        if trade.profit_amount:
-            account.current_balance -= trade.profit_amount
-        elif trade.loss_amount:
-            account.current_balance += trade.loss_amount
+        net = (trade.profit_amount or 0) - (trade.loss_amount or 0)
+        post_entry(db, account, -net, trade.date_closed, "TRADE", trade.id)
+        rebalance.append((account, trade.date_closed))
+    
+    account_stats.remove_trade(db, trade)
     
     # Delete related records (done automatically with cascade delete in DB)
     db.delete(trade)
-    db.commit()
+    bump_data_version(db, current_user.id, trade.account_id)
+    try:
+        commit_trades(db, rebalance)
+    except TradeConflict as e:
+        raise conflict_error(e)
     
     return None 
\ No newline at end of file
@@ -26,4 +26,21 @@ class AccountResponse(AccountBase):
     created_at: datetime
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class AccountBalance(BaseModel):
+    account_id: int
+    at: Optional[datetime] = None
+    balance: Decimal
+
+class BalanceEntryResponse(BaseModel):
+    id: int
+    account_id: int
+    occurred_at: datetime
+    amount: Decimal
+    source: str
+    source_id: Optional[int] = None
+    recorded_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from enum import Enum
 
 class AnalysisBase(BaseModel):
     analysis_type: str
@@ -42,4 +43,184 @@ class Recommendation(BaseModel):
     category: str
 
 class AnalysisRecommendations(BaseModel):
-    recommendations: List[Recommendation] 
\ No newline at end of file
+    recommendations: List[Recommendation] 
+class EquityPoint(BaseModel):
+    timestamp: datetime
+    balance: float
+    drawdown: float
+    drawdown_pct: float
+
+class EquityCurve(BaseModel):
+    starting_balance: float
+    ending_balance: float
+    peak_balance: float
+    max_drawdown: float
+    max_drawdown_pct: float
+    max_drawdown_duration_days: float
+    total_points: int
+    points: List[EquityPoint]
+
+class RollingWindowType(str, Enum):
+    TRADES = "trades"
+    DAYS = "days"
+
+class RollingSeries(BaseModel):
+    window: int
+    win_rate: List[Optional[float]]
+    expectancy: List[Optional[float]]
+    avg_r: List[Optional[float]]
+
+class RollingMetrics(BaseModel):
+    window_type: RollingWindowType
+    total_trades: int
+    timestamps: List[datetime]
+    series: List[RollingSeries]
+
+class SimulationMode(str, Enum):
+    R_MULTIPLE = "r"
+    PNL = "pnl"
+
+class SimulationResult(BaseModel):
+    mode: SimulationMode
+    sample_size: int
+    paths: int
+    horizon: int
+    chunks: int
+    seed: Optional[int] = None
+    starting_equity: float
+    mean_final_equity: float
+    final_equity_percentiles: Dict[str, float]
+    max_drawdown_pct_percentiles: Dict[str, float]
+    probability_of_profit: float
+    probability_drawdown_limit: float
+    risk_of_ruin: float
+
+class JobKind(str, Enum):
+    PATTERN_ANALYSIS = "pattern_analysis"
+    SIMULATION = "simulation"
+    RECOMMENDATIONS = "recommendations"
+    EQUITY = "equity"
+    ROLLING = "rolling"
+    PORTFOLIO = "portfolio"
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    CANCELLING = "cancelling"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class PatternJobParams(BaseModel):
+    account_id: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class SimulationJobParams(BaseModel):
+    account_id: Optional[int] = None
+    mode: SimulationMode = SimulationMode.R_MULTIPLE
+    paths: int = Field(10000, ge=100, le=1000000)
+    horizon: int = Field(100, ge=1, le=5000)
+    risk_per_trade_pct: float = Field(1.0, gt=0, le=100)
+    drawdown_limit_pct: float = Field(20.0, gt=0, le=100)
+    ruin_pct: float = Field(50.0, gt=0, le=100)
+    seed: Optional[int] = Field(None, ge=0)
+
+class RecommendationsJobParams(BaseModel):
+    pass
+
+class EquityJobParams(BaseModel):
+    account_id: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    points: int = Field(500, ge=3, le=5000)
+
+class RollingJobParams(BaseModel):
+    account_id: Optional[int] = None
+    windows: List[int] = [20]
+    window_type: RollingWindowType = RollingWindowType.TRADES
+    points: int = Field(500, ge=2, le=5000)
+    
+    @validator('windows')
+    def validate_windows(cls, v):
+        if not v or len(v) > 10 or any(window < 1 for window in v):
+            raise ValueError("Provide between 1 and 10 windows, each at least 1")
+        return v
+
+class PortfolioJobParams(BaseModel):
+    base_currency: str = Field("USD", min_length=2, max_length=10)
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+JOB_PARAMS = {
+    JobKind.PATTERN_ANALYSIS: PatternJobParams,
+    JobKind.SIMULATION: SimulationJobParams,
+    JobKind.RECOMMENDATIONS: RecommendationsJobParams,
+    JobKind.EQUITY: EquityJobParams,
+    JobKind.ROLLING: RollingJobParams,
+    JobKind.PORTFOLIO: PortfolioJobParams,
+}
+
+class JobCreate(BaseModel):
+    kind: JobKind
+    params: Dict[str, Any] = {}
+    
+    @validator('params')
+    def validate_params(cls, v, values):
+        if 'kind' not in values:
+            return v
+        # Defaults filled in, so workers can index the params directly
+        return JOB_PARAMS[values['kind']](**v).model_dump()
+
+class JobResponse(BaseModel):
+    id: str
+    kind: JobKind
+    status: JobStatus
+    params: Dict[str, Any]
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_ms: Optional[float] = None
+    run_ms: Optional[float] = None
+    result_id: Optional[int] = None
+    error: Optional[str] = None
+
+class PortfolioAccount(BaseModel):
+    account_id: int
+    name: str
+    currency: str
+    fx_rate: float
+    total_trades: int
+    win_count: int
+    loss_count: int
+    open_count: int
+    net_pnl: float
+    deposits: float
+    balance: float
+    gross_profit: float
+    gross_loss: float
+    net_pnl_base: float
+    deposits_base: float
+    balance_base: float
+    largest_profit: float
+    largest_loss: float
+
+class PortfolioTotals(BaseModel):
+    total_trades: int
+    win_count: int
+    loss_count: int
+    open_count: int
+    win_rate: float
+    gross_profit: float
+    gross_loss: float
+    net_pnl_base: float
+    deposits_base: float
+    balance_base: float
+    largest_profit: float
+    largest_loss: float
+
+class PortfolioAnalysis(BaseModel):
+    base_currency: str
+    as_of: datetime
+    accounts: List[PortfolioAccount]
+    totals: PortfolioTotals
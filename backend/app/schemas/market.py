@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from enum import Enum
+from typing import Optional, List
+from datetime import datetime
+
+from app.schemas.trade import Direction
+
+class TriggerType(str, Enum):
+    STOP_LOSS = "STOP_LOSS"
+    TAKE_PROFIT = "TAKE_PROFIT"
+
+class OpenPositionValue(BaseModel):
+    trade_id: int
+    instrument: str
+    direction: Direction
+    position_size: float
+    entry_price: float
+    price: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+
+class AccountMarkToMarket(BaseModel):
+    account_id: int
+    unrealized_pnl: float
+    equity: Optional[float] = None
+    open_positions: int
+    as_of: Optional[datetime] = None
+    positions: List[OpenPositionValue] = []
+
+class TriggerEvent(BaseModel):
+    trade_id: int
+    account_id: int
+    instrument: str
+    direction: Direction
+    trigger: TriggerType
+    level: float
+    price: float
+    at: Optional[datetime] = None
@@ -56,6 +56,18 @@ class TradeClose(BaseModel):
     def validate_exit_price(cls, v):
         return round(v, 8)
 
+class TradeCloseBatchItem(TradeClose):
+    trade_id: int
+
+class TradeCloseBatch(BaseModel):
+    trades: List[TradeCloseBatchItem] = Field(..., min_length=1, max_length=1000)
+
+class TradeUpdateBatchItem(TradeUpdate):
+    trade_id: int
+
+class TradeUpdateBatch(BaseModel):
+    trades: List[TradeUpdateBatchItem] = Field(..., min_length=1, max_length=1000)
+
 class TradeResponse(TradeBase):
     id: int
     account_id: int
@@ -69,8 +81,30 @@ class TradeResponse(TradeBase):
     profit_percentage: Optional[Decimal] = None
     loss_percentage: Optional[Decimal] = None
     balance_after: Optional[Decimal] = None
+    external_id: Optional[str] = None
+    version: int = 0
     created_at: datetime
     updated_at: datetime
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    MT4 = "mt4"
+    MT5 = "mt5"
+    FILLS = "fills"
+
+class TradeImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class TradeImportResult(BaseModel):
+    total_rows: int
+    imported: int
+    updated: int
+    duplicates: int
+    failed: int
+    errors: List[TradeImportError]
+    errors_truncated: bool
@@ -0,0 +1,253 @@
+# Incrementally maintained per-account trade statistics
+from datetime import timezone
+from decimal import Decimal
+
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from app.models.trade import Trade
+from app.models.account import Account
+from app.models.account_stats import AccountStats
+
+OUTCOME_COUNTERS = {
+    "WIN": "win_count",
+    "LOSS": "loss_count",
+    "OPEN": "open_count",
+}
+
+
+def _comparable(value):
+    # Aware and naive datetimes cannot be compared; normalise to naive UTC
+    if getattr(value, "tzinfo", None) is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _aggregate_query(db: Session):
+    return db.query(
+        Trade.account_id,
+        func.count(Trade.id).label("total_count"),
+        func.coalesce(func.sum(case((Trade.win_loss == "WIN", 1), else_=0)), 0).label("win_count"),
+        func.coalesce(func.sum(case((Trade.win_loss == "LOSS", 1), else_=0)), 0).label("loss_count"),
+        func.coalesce(func.sum(case((Trade.win_loss == "OPEN", 1), else_=0)), 0).label("open_count"),
+        func.coalesce(func.sum(Trade.profit_amount), 0).label("profit_sum"),
+        func.count(Trade.profit_amount).label("profit_amount_count"),
+        func.coalesce(func.sum(Trade.loss_amount), 0).label("loss_sum"),
+        func.count(Trade.loss_amount).label("loss_amount_count"),
+        func.coalesce(func.sum(Trade.risk_reward), 0).label("rr_sum"),
+        func.count(Trade.risk_reward).label("rr_count"),
+        func.max(Trade.profit_amount).label("max_profit"),
+        func.max(Trade.loss_amount).label("max_loss"),
+        func.min(Trade.date_open).label("first_open"),
+        func.max(Trade.date_closed).label("last_close"),
+    ).group_by(Trade.account_id)
+
+
+def _apply_row(stats: AccountStats, row):
+    stats.total_count = row.total_count if row else 0
+    stats.win_count = int(row.win_count) if row else 0
+    stats.loss_count = int(row.loss_count) if row else 0
+    stats.open_count = int(row.open_count) if row else 0
+    stats.profit_sum = Decimal(row.profit_sum) if row else Decimal(0)
+    stats.profit_amount_count = row.profit_amount_count if row else 0
+    stats.loss_sum = Decimal(row.loss_sum) if row else Decimal(0)
+    stats.loss_amount_count = row.loss_amount_count if row else 0
+    stats.rr_sum = Decimal(row.rr_sum) if row else Decimal(0)
+    stats.rr_count = row.rr_count if row else 0
+    stats.max_profit = row.max_profit if row else None
+    stats.max_loss = row.max_loss if row else None
+    stats.first_open = row.first_open if row else None
+    stats.last_close = row.last_close if row else None
+
+
+def rebuild_account_stats(db: Session, account_id: int) -> AccountStats:
+    """
+    Recompute one account's stats row from the raw trades (does not commit).
+    """
+    row = _aggregate_query(db).filter(Trade.account_id == account_id).first()
+
+    stats = db.get(AccountStats, account_id)
+    if stats is None:
+        stats = AccountStats(account_id=account_id)
+        _apply_row(stats, row)
+        db.add(stats)
+        # Make the new row visible to later db.get() calls in this request
+        db.flush()
+        return stats
+
+    _apply_row(stats, row)
+    return stats
+
+
+def rebuild_all_account_stats(db: Session, account_ids=None) -> int:
+    """
+    Repair the account_stats table from the raw trades with one grouped
+    query. Every account gets a row, including accounts without trades.
+    Returns the number of rows written (does not commit).
+    """
+    query = _aggregate_query(db)
+    accounts = db.query(Account.id)
+    existing = db.query(AccountStats)
+
+    if account_ids is not None:
+        query = query.filter(Trade.account_id.in_(account_ids))
+        accounts = accounts.filter(Account.id.in_(account_ids))
+        existing = existing.filter(AccountStats.account_id.in_(account_ids))
+
+    rows = {row.account_id: row for row in query.all()}
+    existing = {stats.account_id: stats for stats in existing.all()}
+
+    written = 0
+    for (account_id,) in accounts.all():
+        stats = existing.get(account_id)
+        if stats is None:
+            stats = AccountStats(account_id=account_id)
+            db.add(stats)
+
+        _apply_row(stats, rows.get(account_id))
+        written += 1
+
+    return written
+
+
+def init_account_stats(db: Session, account_id: int):
+    """
+    Create the empty stats row for a newly created account.
+    """
+    stats = AccountStats(account_id=account_id)
+    _apply_row(stats, None)
+    db.add(stats)
+
+
+def summarize_stats(db: Session, user_id: int, account_id=None):
+    """
+    Combine the user's account stats rows into the performance overview
+    figures. Returns None if any account has no stats row yet, so the
+    caller can fall back to aggregating the trades table.
+    """
+    query = db.query(Account.id, AccountStats).outerjoin(
+        AccountStats, AccountStats.account_id == Account.id
+    ).filter(Account.user_id == user_id)
+
+    if account_id:
+        query = query.filter(Account.id == account_id)
+
+    rows = [stats for _, stats in query.all()]
+    if any(stats is None for stats in rows):
+        return None
+
+    def total(name):
+        return sum(getattr(stats, name) for stats in rows)
+
+    def extreme(name, pick):
+        values = [getattr(stats, name) for stats in rows if getattr(stats, name) is not None]
+        return pick(values, key=_comparable) if values else None
+
+    profit_count = total("profit_amount_count")
+    loss_count = total("loss_amount_count")
+    rr_count = total("rr_count")
+
+    return {
+        "total_trades": total("total_count"),
+        "win_count": total("win_count"),
+        "loss_count": total("loss_count"),
+        "open_count": total("open_count"),
+        "avg_profit": total("profit_sum") / profit_count if profit_count else None,
+        "avg_loss": total("loss_sum") / loss_count if loss_count else None,
+        "avg_risk_reward": total("rr_sum") / rr_count if rr_count else None,
+        "largest_profit": extreme("max_profit", max),
+        "largest_loss": extreme("max_loss", max),
+        "period_start": extreme("first_open", min),
+        "period_end": extreme("last_close", max),
+    }
+
+
+def _get_stats(db: Session, account_id: int) -> AccountStats:
+    stats = db.get(AccountStats, account_id)
+    if stats is None:
+        # First mutation since the table was introduced: seed from raw trades
+        stats = rebuild_account_stats(db, account_id)
+    return stats
+
+
+def add_trade(db: Session, trade: Trade):
+    """
+    Add a trade's current values to its account's running stats.
+    Call after the trade has been created or modified, before commit.
+    """
+    stats = _get_stats(db, trade.account_id)
+
+    stats.total_count += 1
+    if trade.win_loss in OUTCOME_COUNTERS:
+        counter = OUTCOME_COUNTERS[trade.win_loss]
+        setattr(stats, counter, getattr(stats, counter) + 1)
+
+    if trade.profit_amount is not None:
+        stats.profit_sum += Decimal(trade.profit_amount)
+        stats.profit_amount_count += 1
+        if stats.max_profit is None or trade.profit_amount > stats.max_profit:
+            stats.max_profit = trade.profit_amount
+
+    if trade.loss_amount is not None:
+        stats.loss_sum += Decimal(trade.loss_amount)
+        stats.loss_amount_count += 1
+        if stats.max_loss is None or trade.loss_amount > stats.max_loss:
+            stats.max_loss = trade.loss_amount
+
+    if trade.risk_reward is not None:
+        stats.rr_sum += Decimal(trade.risk_reward)
+        stats.rr_count += 1
+
+    if trade.date_open is not None and (
+        stats.first_open is None or _comparable(trade.date_open) < _comparable(stats.first_open)
+    ):
+        stats.first_open = trade.date_open
+
+    if trade.date_closed is not None and (
+        stats.last_close is None or _comparable(trade.date_closed) > _comparable(stats.last_close)
+    ):
+        stats.last_close = trade.date_closed
+
+
+def remove_trade(db: Session, trade: Trade):
+    """
+    Subtract a trade's current values from its account's running stats.
+    Call before the trade is modified or deleted, before commit.
+    """
+    stats = _get_stats(db, trade.account_id)
+
+    stats.total_count -= 1
+    if trade.win_loss in OUTCOME_COUNTERS:
+        counter = OUTCOME_COUNTERS[trade.win_loss]
+        setattr(stats, counter, getattr(stats, counter) - 1)
+
+    if trade.profit_amount is not None:
+        stats.profit_sum -= Decimal(trade.profit_amount)
+        stats.profit_amount_count -= 1
+
+    if trade.loss_amount is not None:
+        stats.loss_sum -= Decimal(trade.loss_amount)
+        stats.loss_amount_count -= 1
+
+    if trade.risk_reward is not None:
+        stats.rr_sum -= Decimal(trade.risk_reward)
+        stats.rr_count -= 1
+
+    # Extremes cannot be decremented; if this trade held one, re-read them
+    # from the account's other trades
+    holds_extreme = (
+        (trade.profit_amount is not None and trade.profit_amount == stats.max_profit)
+        or (trade.loss_amount is not None and trade.loss_amount == stats.max_loss)
+        or (trade.date_open is not None and _comparable(trade.date_open) == _comparable(stats.first_open))
+        or (trade.date_closed is not None and _comparable(trade.date_closed) == _comparable(stats.last_close))
+    )
+
+    if holds_extreme:
+        extremes = db.query(
+            func.max(Trade.profit_amount),
+            func.max(Trade.loss_amount),
+            func.min(Trade.date_open),
+            func.max(Trade.date_closed),
+        ).filter(Trade.account_id == trade.account_id, Trade.id != trade.id).one()
+
+        stats.max_profit, stats.max_loss, stats.first_open, stats.last_close = extremes
@@ -0,0 +1,337 @@
+# Columnar helpers for the analysis endpoints
+import calendar
+
+import numpy as np
+import pandas as pd
+
+OUTCOME_COLUMNS = ["total", "wins", "losses", "win_rate"]
+
+
+def trades_frame(rows, columns):
+    """
+    Build a DataFrame from query rows (tuples) and derive the boolean
+    outcome columns used by every grouping.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+
+    if "win_loss" in frame:
+        frame["is_win"] = (frame["win_loss"] == "WIN").astype(np.int64)
+        frame["is_loss"] = (frame["win_loss"] == "LOSS").astype(np.int64)
+
+    if "date_open" in frame:
+        frame["date_open"] = pd.to_datetime(frame["date_open"], utc=True).dt.tz_localize(None)
+
+    return frame
+
+
+def outcome_stats(frame, key, extra=None):
+    """
+    Count trades, wins and losses per value of `key` in one grouped
+    reduction. `extra` maps output column -> (source column, aggregation).
+    Returns a DataFrame indexed by the group key.
+    """
+    aggregations = {
+        "total": ("is_win", "size"),
+        "wins": ("is_win", "sum"),
+        "losses": ("is_loss", "sum"),
+    }
+    aggregations.update(extra or {})
+
+    stats = frame.groupby(key, sort=True).agg(**aggregations)
+    decided = stats["wins"] + stats["losses"]
+    stats["win_rate"] = (stats["wins"] / decided.where(decided > 0)).fillna(0.0)
+
+    return stats
+
+
+def stats_records(stats, label):
+    # Plain python types so the result can be stored in a JSON column
+    return [
+        {label: key, **row}
+        for key, row in zip(stats.index.tolist(), stats.to_dict("records"))
+    ]
+
+
+def stats_mapping(stats, names=None):
+    keys = stats.index.tolist()
+    if names is not None:
+        keys = [names[key] for key in keys]
+
+    return dict(zip(keys, stats[OUTCOME_COLUMNS].to_dict("records")))
+
+
+def time_breakdown(frame):
+    """
+    Win/loss stats by hour of day, weekday and month of `date_open`.
+    """
+    opened = frame["date_open"].dt
+
+    return {
+        "by_hour": stats_mapping(outcome_stats(frame, opened.hour)),
+        "by_day": stats_mapping(outcome_stats(frame, opened.dayofweek), calendar.day_name),
+        "by_month": stats_mapping(outcome_stats(frame, opened.month), calendar.month_name),
+    }
+
+
+def event_frame(trade_rows, deposit_rows):
+    """
+    Merge closed-trade P&L (date_closed, profit, loss) and deposit cash
+    flows (date, amount) into one time-ordered frame of balance deltas.
+    """
+    trades = pd.DataFrame.from_records(trade_rows, columns=["timestamp", "profit", "loss"])
+    trades["delta"] = trades["profit"].fillna(0.0) - trades["loss"].fillna(0.0)
+    trades["source"] = "trade"
+
+    deposits = pd.DataFrame.from_records(deposit_rows, columns=["timestamp", "delta"])
+    deposits["source"] = "deposit"
+
+    events = pd.concat(
+        [trades[["timestamp", "delta", "source"]], deposits[["timestamp", "delta", "source"]]],
+        ignore_index=True
+    )
+    events["timestamp"] = pd.to_datetime(events["timestamp"], utc=True).dt.tz_localize(None)
+    events["delta"] = events["delta"].astype(float)
+
+    return events.sort_values("timestamp", kind="mergesort", ignore_index=True)
+
+
+def equity_curve(events, starting_balance: float):
+    """
+    Cumulative balance, running peak and drawdown for a frame from
+    `event_frame`. Returns a dict of numpy arrays plus summary figures.
+    """
+    times = events["timestamp"].to_numpy()
+    balance = starting_balance + np.cumsum(events["delta"].to_numpy())
+    peak = np.maximum.accumulate(np.concatenate(([starting_balance], balance)))[1:]
+    drawdown = balance - peak
+    drawdown_pct = np.divide(drawdown, peak, out=np.zeros_like(drawdown), where=peak > 0) * 100
+
+    curve = {
+        "timestamps": times,
+        "balance": balance,
+        "drawdown": drawdown,
+        "drawdown_pct": drawdown_pct,
+        "ending_balance": float(starting_balance),
+        "peak_balance": float(starting_balance),
+        "max_drawdown": 0.0,
+        "max_drawdown_pct": 0.0,
+        "max_drawdown_duration_days": 0.0,
+    }
+
+    if not len(balance):
+        return curve
+
+    # Longest time spent below the last peak (recovered or not)
+    positions = np.arange(len(balance))
+    last_peak = np.maximum.accumulate(np.where(balance >= peak, positions, 0))
+    underwater = times - times[last_peak]
+
+    curve.update({
+        "ending_balance": float(balance[-1]),
+        "peak_balance": float(max(peak.max(), starting_balance)),
+        "max_drawdown": float(-drawdown.min()),
+        "max_drawdown_pct": float(-drawdown_pct.min()),
+        "max_drawdown_duration_days": float(underwater.max() / np.timedelta64(1, "D")),
+    })
+
+    return curve
+
+
+def lttb(x, y, threshold: int):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of
+    the (at most) `threshold` points that best preserve the shape of y(x).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    anchor = 0
+    for i in range(threshold - 2):
+        bucket_start = int(i * every) + 1
+        bucket_end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        avg_x = x[bucket_end:next_end].mean()
+        avg_y = y[bucket_end:next_end].mean()
+
+        # Twice the triangle area formed with the previous pick and the next bucket's mean
+        area = np.abs(
+            (x[anchor] - avg_x) * (y[bucket_start:bucket_end] - y[anchor])
+            - (x[anchor] - x[bucket_start:bucket_end]) * (avg_y - y[anchor])
+        )
+        anchor = bucket_start + int(area.argmax())
+        selected[i + 1] = anchor
+
+    return selected
+
+
+def _window_starts(times, positions, window: int, by_days: bool):
+    # Index of the first element inside each position's trailing window
+    if not by_days:
+        return np.maximum(positions - window + 1, 0)
+    return np.searchsorted(times, times[positions] - np.timedelta64(window, "D"), side="right")
+
+
+def rolling_metrics(closed, windows, by_days: bool = False, at=None):
+    """
+    Rolling win rate, expectancy (mean P&L) and average realized R for
+    every closed trade, over the trailing window of each size in
+    `windows` (trades, or days if `by_days`). `closed` must be sorted by
+    timestamp. Prefix sums are built once and shared by all windows, so
+    each window costs O(n) regardless of its size. `at` optionally limits
+    the output to those row positions (e.g. a downsampled subset).
+    Returns {window: {"win_rate": ..., "expectancy": ..., "avg_r": ...}}.
+    """
+    times = closed["timestamp"].to_numpy()
+    pnl = closed["pnl"].to_numpy(dtype=float)
+    r_multiple = closed["r_multiple"].to_numpy(dtype=float)
+    has_r = ~np.isnan(r_multiple)
+
+    def prefix(values):
+        return np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+
+    wins = prefix(closed["is_win"].to_numpy())
+    losses = prefix(closed["is_loss"].to_numpy())
+    pnl_sum = prefix(pnl)
+    r_sum = prefix(np.where(has_r, r_multiple, 0.0))
+    r_count = prefix(has_r)
+    positions = np.arange(len(times)) if at is None else np.asarray(at, dtype=np.int64)
+    ends = positions + 1
+
+    results = {}
+    for window in windows:
+        starts = _window_starts(times, positions, window, by_days)
+        count = ends - starts
+
+        window_wins = wins[ends] - wins[starts]
+        decided = window_wins + losses[ends] - losses[starts]
+        r_trades = r_count[ends] - r_count[starts]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            win_rate = np.where(decided > 0, window_wins / decided, np.nan)
+            expectancy = (pnl_sum[ends] - pnl_sum[starts]) / count
+            avg_r = np.where(r_trades > 0, (r_sum[ends] - r_sum[starts]) / r_trades, np.nan)
+
+        # Trade-count windows are only reported once they are full
+        if not by_days:
+            partial = count < window
+            win_rate[partial] = np.nan
+            expectancy[partial] = np.nan
+            avg_r[partial] = np.nan
+
+        results[window] = {"win_rate": win_rate, "expectancy": expectancy, "avg_r": avg_r}
+
+    return results
+
+
+def closed_trades_frame(rows):
+    """
+    Frame of closed trades from rows of (date_closed, win_loss, profit,
+    loss, position_size, entry_price, stop_loss), sorted by close time,
+    with realized P&L and R multiple (P&L over the initial risk).
+    """
+    frame = pd.DataFrame.from_records(
+        rows,
+        columns=["timestamp", "win_loss", "profit", "loss", "position_size", "entry_price", "stop_loss"]
+    )
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], utc=True).dt.tz_localize(None)
+    frame = frame.sort_values("timestamp", kind="mergesort", ignore_index=True)
+
+    frame["pnl"] = frame["profit"].fillna(0.0).astype(float) - frame["loss"].fillna(0.0).astype(float)
+    risk = (frame["entry_price"].astype(float) - frame["stop_loss"].astype(float)).abs() * frame["position_size"].astype(float)
+    frame["r_multiple"] = (frame["pnl"] / risk.where(risk > 0)).astype(float)
+    frame["is_win"] = (frame["win_loss"] == "WIN").astype(np.int64)
+    frame["is_loss"] = (frame["win_loss"] == "LOSS").astype(np.int64)
+
+    return frame
+
+
+def sample_indices(length: int, points: int):
+    # Evenly spaced indices, always keeping the last element
+    if length <= points:
+        return np.arange(length)
+    return np.unique(np.linspace(0, length - 1, points).round().astype(np.int64))
+
+
+def nan_to_none(values):
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def _correlation_or_none(value):
+    return None if pd.isna(value) else float(value)
+
+
+def pair_correlations(frame):
+    """
+    Correlation of daily realized P&L between every pair of traded
+    instruments, from a date x instrument pivot. Days on which an
+    instrument had no closed trade count as zero P&L for it.
+    """
+    closed = frame[frame["date_closed"].notna()]
+    if closed.empty:
+        return []
+
+    daily = pd.DataFrame({
+        "day": pd.to_datetime(closed["date_closed"], utc=True).dt.tz_localize(None).dt.normalize(),
+        "pair": closed["currency_pair"],
+        "pnl": closed["profit_amount"].fillna(0.0) - closed["loss_amount"].fillna(0.0),
+    }).pivot_table(index="day", columns="pair", values="pnl", aggfunc="sum", fill_value=0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = daily.corr()
+    active = (daily != 0).to_numpy()
+    overlap = active.T.astype(np.int64) @ active.astype(np.int64)
+
+    pairs = list(matrix.columns)
+    upper_x, upper_y = np.triu_indices(len(pairs), k=1)
+
+    return [
+        {
+            "type": "pair",
+            "x": pairs[i],
+            "y": pairs[j],
+            "correlation": _correlation_or_none(matrix.iat[i, j]),
+            "common_days": int(overlap[i, j]),
+        }
+        for i, j in zip(upper_x, upper_y)
+    ]
+
+
+def feature_correlations(frame):
+    """
+    Correlation between the outcome of decided trades (1 = win,
+    0 = loss) and hour, weekday, direction (1 = long) and risk/reward.
+    """
+    decided = frame[(frame["is_win"] == 1) | (frame["is_loss"] == 1)]
+    if decided.empty:
+        return []
+
+    features = pd.DataFrame({
+        "hour": decided["date_open"].dt.hour,
+        "weekday": decided["date_open"].dt.dayofweek,
+        "direction": (decided["direction"] == "LONG").astype(np.int64),
+        "risk_reward": decided["risk_reward"],
+    })
+    outcome = decided["is_win"]
+
+    # Constant features have no defined correlation and come back as None
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return [
+            {
+                "type": "feature",
+                "feature": name,
+                "target": "outcome",
+                "correlation": _correlation_or_none(features[name].corr(outcome)),
+                "samples": int(features[name].notna().sum()),
+            }
+            for name in features.columns
+        ]
@@ -0,0 +1,123 @@
+# Account balance maintenance
+import heapq
+from decimal import Decimal
+
+from sqlalchemy import func, select, update, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.trade import Trade
+from app.models.account import Account
+from app.models.deposit import Deposit
+from app.utils.ledger import balance_at, comparable_time
+
+# Balances are stored as floats by SQLite; smaller differences are noise
+BALANCE_TOLERANCE = Decimal("0.000001")
+
+
+def recompute_balance(db: Session, account: Account) -> Decimal:
+    """
+    Set current_balance to initial balance + deposits + realized P&L in
+    one UPDATE whose aggregate subqueries run under the write lock, so
+    a concurrent close cannot slip in between read and write (does not
+    commit).
+    """
+    deposits = select(func.coalesce(func.sum(Deposit.amount), 0)).where(
+        Deposit.account_id == account.id
+    ).scalar_subquery()
+    
+    pnl = select(
+        func.coalesce(func.sum(Trade.profit_amount), 0) - func.coalesce(func.sum(Trade.loss_amount), 0)
+    ).where(Trade.account_id == account.id, Trade.date_closed.isnot(None)).scalar_subquery()
+    
+    balance = db.execute(
+        update(Account)
+        .where(Account.id == account.id)
+        .values(current_balance=Account.initial_balance + deposits + pnl)
+        .returning(Account.current_balance)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    set_committed_value(account, "current_balance", balance)
+    return balance
+
+
+def recompute_balance_after(db: Session, account: Account, since=None) -> int:
+    """
+    Rewrite balance_after for the account's trades closed at or after
+    `since` (all trades if None), after an edit or delete dated `since`.
+    The balance just before `since` comes from the ledger; trades and
+    deposits from `since` on are merged in time order (deposits first on
+    ties) and prefix-summed. Only changed values are written, with one
+    executemany UPDATE (does not commit). Returns the number of trades
+    rewritten.
+    """
+    db.flush()
+    
+    if since is None:
+        running = Decimal(account.initial_balance)
+    else:
+        running = balance_at(db, account, since, inclusive=False)
+    
+    trades = db.query(
+        Trade.date_closed, Trade.id, Trade.profit_amount, Trade.loss_amount, Trade.balance_after
+    ).filter(Trade.account_id == account.id, Trade.date_closed.isnot(None))
+    deposits = db.query(Deposit.date, Deposit.id, Deposit.amount).filter(Deposit.account_id == account.id)
+    
+    if since is not None:
+        trades = trades.filter(Trade.date_closed >= since)
+        deposits = deposits.filter(Deposit.date >= since)
+    
+    # Both queries come back sorted from their (account, date) indexes
+    events = heapq.merge(
+        ((comparable_time(date), 0, deposit_id, Decimal(amount), None) for date, deposit_id, amount in
+         deposits.order_by(Deposit.date, Deposit.id)),
+        ((comparable_time(date_closed), 1, trade_id, Decimal(profit or 0) - Decimal(loss or 0), balance_after)
+         for date_closed, trade_id, profit, loss, balance_after in trades.order_by(Trade.date_closed, Trade.id)),
+    )
+    
+    changes = []
+    for _, kind, row_id, amount, balance_after in events:
+        running += amount
+        if kind == 1 and (balance_after is None or abs(Decimal(balance_after) - running) > BALANCE_TOLERANCE):
+            changes.append({"trade_id": row_id, "balance": running})
+    
+    # Derived data: written with Core so the trade versions are not bumped
+    if changes:
+        trades_table = Trade.__table__
+        db.execute(
+            update(trades_table).where(trades_table.c.id == bindparam("trade_id")).values(balance_after=bindparam("balance")),
+            changes
+        )
+    return len(changes)
+
+
+def balance_discrepancies(db: Session, account_ids=None):
+    """
+    Compare each account's current_balance with initial balance +
+    deposits + realized P&L, using one aggregate query. Returns
+    (account_id, current_balance, expected) for every account that is
+    off by more than BALANCE_TOLERANCE.
+    """
+    deposits = select(
+        Deposit.account_id, func.sum(Deposit.amount).label("total")
+    ).group_by(Deposit.account_id).subquery()
+    
+    pnl = select(
+        Trade.account_id,
+        func.sum(func.coalesce(Trade.profit_amount, 0) - func.coalesce(Trade.loss_amount, 0)).label("total")
+    ).where(Trade.date_closed.isnot(None)).group_by(Trade.account_id).subquery()
+    
+    query = db.query(
+        Account.id,
+        Account.current_balance,
+        Account.initial_balance + func.coalesce(deposits.c.total, 0) + func.coalesce(pnl.c.total, 0),
+    ).outerjoin(deposits, deposits.c.account_id == Account.id).outerjoin(pnl, pnl.c.account_id == Account.id)
+    
+    if account_ids is not None:
+        query = query.filter(Account.id.in_(account_ids))
+    
+    return [
+        (account_id, Decimal(current), Decimal(expected))
+        for account_id, current, expected in query.order_by(Account.id).all()
+        if abs(Decimal(current) - Decimal(expected)) > BALANCE_TOLERANCE
+    ]
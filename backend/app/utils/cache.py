@@ -0,0 +1,67 @@
+# In-memory LRU + TTL cache for analysis results
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """
+    LRU cache whose entries expire after `ttl` seconds and are only
+    returned while the caller's data version matches the stored one.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                # Stale version or expired
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+            }
+
+
+analysis_cache = VersionedCache(
+    max_size=int(os.getenv("ANALYSIS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "300")),
+)
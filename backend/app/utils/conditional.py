@@ -0,0 +1,69 @@
+# Conditional GET: ETag / Last-Modified validators derived from the
+# per-user and per-account data versions
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+# Browsers keep the response but revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def _utc(value):
+    # SQLite hands back naive UTC timestamps
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def make_etag(scope: str, version: int, updated_at=None) -> str:
+    """
+    Strong ETag for data at `version` of `scope` ("u<user id>" or
+    "a<account id>"). The timestamp tells apart an account id reused
+    after a delete, whose version starts over.
+    """
+    stamp = int(_utc(updated_at).timestamp()) if updated_at is not None else 0
+    return f'"{scope}.{version}.{stamp:x}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return _utc(last_modified).replace(microsecond=0) <= since
+
+
+def not_modified(request: Request, response: Response, scope: str, stamp):
+    """
+    Put the validators for `stamp`, a (version, updated_at) pair, on
+    `response`. Returns a 304 response to send instead when the client's
+    copy is current (If-None-Match, or else If-Modified-Since), None
+    when the endpoint should go on and build the body.
+    """
+    version, updated_at = stamp
+    headers = {"ETag": make_etag(scope, version, updated_at), "Cache-Control": CACHE_CONTROL}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(_utc(updated_at).replace(microsecond=0), usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _matches(if_none_match, headers["ETag"])
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = bool(if_modified_since) and updated_at is not None and _not_modified_since(if_modified_since, updated_at)
+
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
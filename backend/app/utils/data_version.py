@@ -0,0 +1,61 @@
+# Per-user and per-account data versions, bumped by every write that can
+# change analysis results or what the read endpoints return
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.account import Account
+from app.models.data_version import UserDataVersion, AccountDataVersion
+
+
+def get_data_version(db: Session, user_id: int) -> int:
+    version = db.query(UserDataVersion.version).filter(UserDataVersion.user_id == user_id).scalar()
+    return version or 0
+
+
+def get_user_stamp(db: Session, user_id: int):
+    """
+    (version, updated_at) of the user's data; (0, None) before the first
+    write.
+    """
+    row = db.query(UserDataVersion.version, UserDataVersion.updated_at).filter(
+        UserDataVersion.user_id == user_id
+    ).first()
+    return (row.version, row.updated_at) if row is not None else (0, None)
+
+
+def get_account_stamp(db: Session, user_id: int, account_id: int):
+    """
+    (version, updated_at) of the account's data, or None if the account
+    does not exist or is not the user's. Also serves as the ownership
+    check, so a conditional GET costs one query.
+    """
+    row = db.query(AccountDataVersion.version, AccountDataVersion.updated_at).select_from(Account).outerjoin(
+        AccountDataVersion, AccountDataVersion.account_id == Account.id
+    ).filter(
+        Account.id == account_id,
+        Account.user_id == user_id
+    ).first()
+
+    if row is None:
+        return None
+    return (row.version or 0, row.updated_at)
+
+
+def _bump(db: Session, model, key, value):
+    updated = db.query(model).filter(key == value).update(
+        {model.version: model.version + 1, model.updated_at: func.now()},
+        synchronize_session=False
+    )
+
+    if not updated:
+        db.add(model(**{key.key: value, "version": 1}))
+
+
+def bump_data_version(db: Session, user_id: int, *account_ids: int):
+    """
+    Increment the user's data version, and that of each given account,
+    in the caller's transaction (does not commit).
+    """
+    _bump(db, UserDataVersion, UserDataVersion.user_id, user_id)
+    for account_id in sorted(set(account_ids)):
+        _bump(db, AccountDataVersion, AccountDataVersion.account_id, account_id)
@@ -0,0 +1,203 @@
+# Streaming exports of trades and deposits (CSV, NDJSON, Parquet)
+import io
+import os
+import csv
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.db.database import SessionLocal
+from app.models.trade import Trade
+from app.models.account import Account
+from app.models.deposit import Deposit
+from app.models.trade_detail import TradeDetail
+
+# Rows fetched from the cursor, and written, per chunk / Parquet row group
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+TRADE_COLUMNS = [
+    Trade.id, Trade.account_id, Trade.currency_pair, Trade.direction, Trade.position_size,
+    Trade.entry_price, Trade.stop_loss, Trade.take_profit, Trade.exit_price, Trade.risk_reward,
+    Trade.win_loss, Trade.profit_amount, Trade.loss_amount, Trade.profit_percentage,
+    Trade.loss_percentage, Trade.balance_after, Trade.date_open, Trade.date_closed,
+    Trade.external_id, Trade.created_at, Trade.updated_at,
+]
+
+DETAIL_COLUMNS = [
+    TradeDetail.step_1_conditions, TradeDetail.step_2_bias, TradeDetail.step_3_narrative,
+    TradeDetail.step_4_execution, TradeDetail.comments,
+]
+
+DEPOSIT_COLUMNS = [Deposit.id, Deposit.account_id, Deposit.amount, Deposit.date, Deposit.notes]
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def trades_statement(user_id: int, account_id=None, start_date=None, end_date=None, include_details: bool = False):
+    columns = TRADE_COLUMNS + (DETAIL_COLUMNS if include_details else [])
+    statement = select(*columns).join(Account, Trade.account_id == Account.id).where(Account.user_id == user_id)
+
+    if include_details:
+        statement = statement.outerjoin(TradeDetail, TradeDetail.trade_id == Trade.id)
+
+    if account_id:
+        statement = statement.where(Trade.account_id == account_id)
+
+    if start_date:
+        statement = statement.where(Trade.date_open >= start_date)
+
+    if end_date:
+        statement = statement.where(Trade.date_open <= end_date)
+
+    # Account by account (in the accounts index order), so rows stream from
+    # ix_trades_account_date_open instead of the whole result being sorted
+    # before the first one goes out
+    return statement.order_by(Account.id, Trade.date_open, Trade.id)
+
+
+def deposits_statement(user_id: int, account_id=None, start_date=None, end_date=None):
+    statement = select(*DEPOSIT_COLUMNS).join(Account, Deposit.account_id == Account.id).where(Account.user_id == user_id)
+
+    if account_id:
+        statement = statement.where(Deposit.account_id == account_id)
+
+    if start_date:
+        statement = statement.where(Deposit.date >= start_date)
+
+    if end_date:
+        statement = statement.where(Deposit.date <= end_date)
+
+    # Account by account, from ix_deposits_account_date
+    return statement.order_by(Account.id, Deposit.date, Deposit.id)
+
+
+def column_names(statement):
+    return [column.key for column in statement.selected_columns]
+
+
+def iter_partitions(statement, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Yield lists of up to `batch_size` rows from a server-side cursor.
+    Opens its own session, since the response body is produced after
+    the request's session has been released.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_value(value):
+    # Decimals stay strings so no precision is lost, as in the API responses
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def csv_chunks(names, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # The header goes out before the query has produced a row
+    writer.writerow(names)
+    yield buffer.getvalue().encode()
+
+    for partition in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_text(value) for value in row] for row in partition)
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(names, partitions):
+    for partition in partitions:
+        yield "".join(
+            json.dumps(dict(zip(names, map(_json_value, row))), separators=(",", ":")) + "\n"
+            for row in partition
+        ).encode()
+
+
+class _Drain(io.RawIOBase):
+    # Write-only sink whose contents are taken after every row group
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def parquet_chunks(statement, partitions):
+    """
+    One Parquet row group per partition, each sent as soon as it is
+    written. Numeric columns are written as float64.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = []
+    for column in statement.selected_columns:
+        python_type = column.type.python_type
+        if python_type is int:
+            arrow_type = pa.int64()
+        elif python_type in (Decimal, float):
+            arrow_type = pa.float64()
+        elif python_type is datetime:
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type))
+    schema = pa.schema(fields)
+
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema)
+    for partition in partitions:
+        columns = list(zip(*partition))
+        arrays = [
+            pa.array([float(value) if isinstance(value, Decimal) else value for value in values], type=field.type)
+            for values, field in zip(columns, schema)
+        ]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def stream_export(statement, format: str):
+    partitions = iter_partitions(statement)
+    if format == "csv":
+        return csv_chunks(column_names(statement), partitions)
+    if format == "ndjson":
+        return ndjson_chunks(column_names(statement), partitions)
+    return parquet_chunks(statement, partitions)
@@ -0,0 +1,106 @@
+# FX rate table with as-of lookups, cached in memory
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, cast, Float
+from sqlalchemy.orm import Session
+
+from app.models.fx_rate import FxRate
+
+# Currency every stored rate is quoted in
+PIVOT_CURRENCY = "USD"
+
+
+class FxRateMissing(Exception):
+    def __init__(self, currency: str):
+        super().__init__(f"No FX rate for {currency}")
+        self.currency = currency
+
+
+def normalize_currency(currency: str) -> str:
+    return (currency or "").strip().upper()
+
+
+def _as_times(values):
+    # Naive UTC datetime64 array, the same form used by the analytics frames
+    return pd.to_datetime(pd.Series(values), utc=True).dt.tz_localize(None).to_numpy()
+
+
+class FxTable:
+    """
+    Rates per currency as sorted (time, rate) arrays. Lookups are as-of:
+    the latest rate at or before each time, found by binary search.
+    Times before a currency's first rate use that first rate.
+    """
+
+    def __init__(self, rows, signature=None):
+        self.signature = signature
+        self._series = {}
+
+        frame = pd.DataFrame.from_records(rows, columns=["currency", "as_of", "rate"])
+        if frame.empty:
+            return
+
+        frame["currency"] = frame["currency"].map(normalize_currency)
+        frame["as_of"] = _as_times(frame["as_of"])
+        frame = frame.sort_values(["currency", "as_of"], kind="mergesort")
+
+        for currency, group in frame.groupby("currency", sort=False):
+            self._series[currency] = (group["as_of"].to_numpy(), group["rate"].to_numpy(dtype=float))
+
+    def currencies(self):
+        return sorted(set(self._series) | {PIVOT_CURRENCY})
+
+    def _pivot_rates(self, currency: str, times):
+        if currency == PIVOT_CURRENCY:
+            return np.ones(len(times))
+
+        series = self._series.get(currency)
+        if series is None:
+            raise FxRateMissing(currency)
+
+        as_of, rates = series
+        positions = np.searchsorted(as_of, times, side="right") - 1
+        return rates[np.maximum(positions, 0)]
+
+    def rates(self, currency: str, base: str, times):
+        """
+        Rate converting `currency` into `base` at each of `times`.
+        """
+        currency = normalize_currency(currency)
+        base = normalize_currency(base)
+        times = _as_times(times)
+
+        if currency == base:
+            return np.ones(len(times))
+
+        return self._pivot_rates(currency, times) / self._pivot_rates(base, times)
+
+    def convert(self, amounts, currency: str, base: str, times):
+        return np.asarray(amounts, dtype=float) * self.rates(currency, base, times)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_fx_table(db: Session) -> FxTable:
+    """
+    Return the cached FxTable, reloading it only when the fx_rates table
+    has changed (row count or newest id differ).
+    """
+    global _table
+
+    signature = tuple(db.query(func.count(FxRate.id), func.max(FxRate.id)).one())
+
+    with _table_lock:
+        if _table is not None and _table.signature == signature:
+            return _table
+
+    rows = db.query(FxRate.currency, FxRate.as_of, cast(FxRate.rate, Float)).all()
+    table = FxTable(rows, signature)
+
+    with _table_lock:
+        _table = table
+    return table
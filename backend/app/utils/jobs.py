@@ -0,0 +1,360 @@
+# Background analysis jobs run in a dedicated process pool
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from app.db.database import SessionLocal
+from app.models.analysis_result import AnalysisResult
+from app.utils.process_pool import get_process_pool, POOL_SIZES
+from app.utils.snapshots import encode_result, remember_hash, prune_snapshots
+
+logger = logging.getLogger(__name__)
+
+MAX_JOBS_PER_USER = int(os.getenv("MAX_JOBS_PER_USER", "2"))
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "100"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+def _run_report(db, kind: str, user_id: int, params: dict) -> dict:
+    # Imported here so the parent process only pays for them on first use
+    from app.utils.reports import (
+        pattern_analysis, current_equity, simulation_samples, recommendations,
+        equity_report, rolling_report, portfolio_analysis
+    )
+    from app.utils.simulation import simulate
+    from app.utils.fx import get_fx_table
+
+    if kind == "pattern_analysis":
+        return pattern_analysis(db, user_id, params["account_id"], params["start_date"], params["end_date"])
+
+    if kind == "recommendations":
+        return recommendations(db, user_id)
+
+    if kind == "equity":
+        return equity_report(db, user_id, params["account_id"], params["start_date"], params["end_date"], params["points"])
+
+    if kind == "rolling":
+        return rolling_report(db, user_id, params["windows"], params["window_type"], params["account_id"], params["points"])
+
+    if kind == "portfolio":
+        return portfolio_analysis(
+            db, user_id, get_fx_table(db), params["base_currency"], params["start_date"], params["end_date"]
+        )
+
+    if kind == "simulation":
+        use_r_multiples = params["mode"] == "r"
+        samples = simulation_samples(db, user_id, params["account_id"], use_r_multiples)
+        if len(samples) < 2:
+            raise ValueError("At least two closed trades (with a stop loss for R mode) are needed to simulate")
+
+        simulation = simulate(
+            samples,
+            paths=params["paths"],
+            horizon=params["horizon"],
+            starting_equity=current_equity(db, user_id, params["account_id"]),
+            multiplicative=use_r_multiples,
+            risk_fraction=params["risk_per_trade_pct"] / 100,
+            drawdown_limit=params["drawdown_limit_pct"] / 100,
+            ruin_fraction=params["ruin_pct"] / 100,
+            seed=params["seed"]
+        )
+        return {"mode": params["mode"], "sample_size": len(samples), "seed": params["seed"], **simulation}
+
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+def execute_job(kind: str, user_id: int, params: dict) -> dict:
+    """
+    Worker entry point: compute the report and store it as an
+    AnalysisResult. Returns the stored row id and wall-clock timings.
+    """
+    started_at = time.time()
+    db = SessionLocal()
+    try:
+        data = _run_report(db, kind, user_id, params)
+        stored, content_hash = encode_result(data)
+
+        result = AnalysisResult(
+            user_id=user_id,
+            analysis_type=kind,
+            result_data=stored,
+            content_hash=content_hash
+        )
+        db.add(result)
+        db.flush()
+        prune_snapshots(db, user_id, kind)
+        db.commit()
+
+        return {
+            "result_id": result.id,
+            "content_hash": content_hash,
+            "started_at": started_at,
+            "finished_at": time.time(),
+        }
+    finally:
+        db.close()
+
+
+class Job:
+    def __init__(self, user_id: int, kind: str, params: dict):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.future = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result_id = None
+        self.error = None
+
+    def snapshot(self) -> dict:
+        def timestamp(value):
+            return datetime.utcfromtimestamp(value) if value is not None else None
+
+        queue_ms = run_ms = None
+        if self.started_at is not None:
+            queue_ms = (self.started_at - self.submitted_at) * 1000
+            if self.finished_at is not None:
+                run_ms = (self.finished_at - self.started_at) * 1000
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "submitted_at": timestamp(self.submitted_at),
+            "started_at": timestamp(self.started_at),
+            "finished_at": timestamp(self.finished_at),
+            "queue_ms": queue_ms,
+            "run_ms": run_ms,
+            "result_id": self.result_id,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    In-memory registry of analysis jobs for this server process. Jobs
+    wait in the manager's own queue and are handed to the "jobs" process
+    pool only when a worker is free: the pool reports a future as running
+    as soon as it is in its call queue, before any worker has it, so a job
+    left there could no longer be cancelled. Finished jobs are forgotten
+    after `retention` seconds, their results stay in analysis_results.
+    """
+
+    def __init__(self, max_per_user: int = 2, max_pending: int = 100, retention: int = 3600,
+                 workers: int = POOL_SIZES["jobs"]):
+        self.max_per_user = max_per_user
+        self.max_pending = max_pending
+        self.retention = retention
+        self.workers = workers
+
+        self._jobs = OrderedDict()
+        self._pending = deque()
+        self._in_flight = 0
+        self._stopped = False
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.timed = 0
+        self.total_queue_ms = 0.0
+        self.total_run_ms = 0.0
+        self.max_run_ms = 0.0
+
+    def submit(self, user_id: int, kind: str, params: dict) -> Job:
+        """
+        Queue a job. Raises JobLimitExceeded if the user already has
+        `max_per_user` unfinished jobs or the pool backlog is full.
+        """
+        with self._lock:
+            self._prune()
+            active = [job for job in self._jobs.values() if job.status in ACTIVE_STATUSES]
+            if sum(1 for job in active if job.user_id == user_id) >= self.max_per_user:
+                raise JobLimitExceeded(f"At most {self.max_per_user} analysis jobs can run at once")
+            if len(active) >= self.max_pending:
+                raise JobLimitExceeded("The analysis job queue is full")
+
+            job = Job(user_id, kind, params)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self.submitted += 1
+
+        self._dispatch()
+        return job
+
+    def _dispatch(self):
+        # Start queued jobs while workers are free; submitted outside the
+        # lock since a done callback can run in the submitting thread
+        while True:
+            with self._lock:
+                if self._stopped or self._in_flight >= self.workers or not self._pending:
+                    return
+                job = self._pending.popleft()
+                job.status = "running"
+                job.started_at = time.time()
+                self._in_flight += 1
+
+            try:
+                job.future = get_process_pool("jobs").submit(execute_job, job.kind, job.user_id, job.params)
+            except Exception as e:
+                # Pool shut down or broken
+                with self._lock:
+                    self._in_flight -= 1
+                    job.status = "failed"
+                    job.error = str(e)
+                    job.finished_at = time.time()
+                    self.failed += 1
+                continue
+
+            job.future.add_done_callback(lambda future, job=job: self._finished(job, future))
+
+    def get(self, user_id: int, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None and job.user_id == user_id else None
+
+    def for_user(self, user_id: int):
+        with self._lock:
+            return [job for job in self._jobs.values() if job.user_id == user_id]
+
+    def cancel(self, job: Job) -> Job:
+        """
+        Cancel a job. A queued job is dropped before it reaches a worker;
+        a running one is left to finish and its result is discarded.
+        """
+        with self._lock:
+            if job.status == "queued":
+                self._pending.remove(job)
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                self.cancelled += 1
+            elif job.status == "running":
+                job.status = "cancelling"
+        return job
+
+    def _finished(self, job: Job, future):
+        try:
+            self._record(job, future)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._dispatch()
+
+    def _record(self, job: Job, future):
+        discard_id = None
+
+        with self._lock:
+            if future.cancelled():
+                # Dropped by the pool shutting down
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                self.cancelled += 1
+                return
+
+            error = future.exception()
+            if error is not None:
+                job.status = "failed"
+                job.error = str(error)
+                job.finished_at = time.time()
+                self.failed += 1
+                return
+
+            outcome = future.result()
+            job.started_at = outcome["started_at"]
+            job.finished_at = outcome["finished_at"]
+            queue_ms = (job.started_at - job.submitted_at) * 1000
+            run_ms = (job.finished_at - job.started_at) * 1000
+            self.timed += 1
+            self.total_queue_ms += queue_ms
+            self.total_run_ms += run_ms
+            self.max_run_ms = max(self.max_run_ms, run_ms)
+
+            if job.status == "cancelling":
+                job.status = "cancelled"
+                self.cancelled += 1
+                discard_id = outcome["result_id"]
+            else:
+                job.status = "done"
+                job.result_id = outcome["result_id"]
+                self.completed += 1
+
+        if discard_id is not None:
+            self._discard_result(discard_id)
+        else:
+            # Keep snapshot dedup in step with the row the worker inserted
+            remember_hash(job.user_id, job.kind, outcome["content_hash"])
+
+    def stop(self):
+        """
+        Cancel the queued jobs and start no more; called before the
+        process pools shut down.
+        """
+        with self._lock:
+            self._stopped = True
+            while self._pending:
+                job = self._pending.popleft()
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                self.cancelled += 1
+
+    def _discard_result(self, result_id: int):
+        db = SessionLocal()
+        try:
+            db.query(AnalysisResult).filter(AnalysisResult.id == result_id).delete()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to discard result of cancelled job: {str(e)}")
+        finally:
+            db.close()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status not in ACTIVE_STATUSES and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+
+            return {
+                "workers": self.workers,
+                "max_per_user": self.max_per_user,
+                "max_pending": self.max_pending,
+                "tracked": statuses,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "avg_queue_ms": self.total_queue_ms / self.timed if self.timed else 0,
+                "avg_run_ms": self.total_run_ms / self.timed if self.timed else 0,
+                "max_run_ms": self.max_run_ms,
+            }
+
+
+job_manager = JobManager(
+    max_per_user=MAX_JOBS_PER_USER,
+    max_pending=MAX_PENDING_JOBS,
+    retention=JOB_RETENTION_SECONDS,
+)
@@ -0,0 +1,219 @@
+# Append-only balance ledger with periodic checkpoints
+import os
+from datetime import timezone
+from decimal import Decimal
+
+from sqlalchemy import event, func, insert, update, select, literal
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.db.database import SessionLocal
+from app.models.trade import Trade
+from app.models.account import Account
+from app.models.balance_entry import BalanceEntry
+from app.models.balance_checkpoint import BalanceCheckpoint
+
+# Ledger entries between two checkpoints of an account
+LEDGER_CHECKPOINT_INTERVAL = int(os.getenv("LEDGER_CHECKPOINT_INTERVAL", "256"))
+
+DIRTY_KEY = "ledger_dirty"
+
+
+def comparable_time(value):
+    # Aware and naive datetimes cannot be compared; normalise to naive UTC
+    if getattr(value, "tzinfo", None) is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def mark_dirty(db: Session, account_id: int, occurred_at):
+    """
+    Note that the account got entries dated `occurred_at` or later, so
+    its checkpoints are brought up to date before the next commit.
+    """
+    dirty = db.info.setdefault(DIRTY_KEY, {})
+    earliest = dirty.get(account_id)
+    if earliest is None or comparable_time(occurred_at) < comparable_time(earliest):
+        dirty[account_id] = occurred_at
+
+
+def add_to_balance(db: Session, account: Account, amount) -> Decimal:
+    """
+    Atomically add `amount` to the account's current_balance with a
+    single UPDATE ... RETURNING, so concurrent writers never lose an
+    update, and load the new value into `account` without marking it
+    changed. Returns the new balance.
+    """
+    balance = db.execute(
+        update(Account)
+        .where(Account.id == account.id)
+        .values(current_balance=Account.current_balance + amount)
+        .returning(Account.current_balance)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    set_committed_value(account, "current_balance", balance)
+    return balance
+
+
+def post_entries(db: Session, account: Account, entries):
+    """
+    Append balance changes, (amount, occurred_at, source, source_id)
+    tuples, to the ledger and apply their sum to the account's
+    current_balance with one atomic UPDATE (does not commit). Zero
+    amounts are not recorded. Returns the balance after each entry.
+    """
+    entries = [(Decimal(amount), occurred_at, source, source_id) for amount, occurred_at, source, source_id in entries]
+    total = sum((amount for amount, _, _, _ in entries), Decimal(0))
+
+    for amount, occurred_at, source, source_id in entries:
+        if amount == 0:
+            continue
+        db.add(BalanceEntry(
+            account_id=account.id,
+            occurred_at=occurred_at,
+            amount=amount,
+            source=source,
+            source_id=source_id
+        ))
+        mark_dirty(db, account.id, occurred_at)
+
+    balance = add_to_balance(db, account, total) if total != 0 else Decimal(account.current_balance)
+
+    # Replay the entries from the balance before them
+    running = balance - total
+    balances = []
+    for amount, _, _, _ in entries:
+        running += amount
+        balances.append(running)
+    return balances
+
+
+def post_entry(db: Session, account: Account, amount, occurred_at, source: str, source_id=None) -> Decimal:
+    """
+    Post a single balance change (see post_entries). Returns the new
+    balance.
+    """
+    return post_entries(db, account, [(amount, occurred_at, source, source_id)])[0]
+
+
+def post_closed_trades(db: Session, account_id: int, external_ids):
+    """
+    Append ledger entries for the closed trades of the account with the
+    given external ids in one INSERT ... SELECT, for bulk imports. Does
+    not touch current_balance; the importer recomputes it afterwards.
+    Returns the earliest close date among the trades, or None.
+    """
+    trades = select(
+        Trade.account_id,
+        Trade.date_closed,
+        func.coalesce(Trade.profit_amount, 0) - func.coalesce(Trade.loss_amount, 0),
+        literal("TRADE"),
+        Trade.id,
+    ).where(
+        Trade.account_id == account_id,
+        Trade.external_id.in_(external_ids),
+        Trade.date_closed.isnot(None)
+    )
+    db.execute(insert(BalanceEntry).from_select(
+        ["account_id", "occurred_at", "amount", "source", "source_id"], trades
+    ))
+
+    earliest = db.query(func.min(Trade.date_closed)).filter(
+        Trade.account_id == account_id,
+        Trade.external_id.in_(external_ids)
+    ).scalar()
+    if earliest is not None:
+        mark_dirty(db, account_id, earliest)
+    return earliest
+
+
+def _latest_checkpoint(db: Session, account_id: int, at=None, inclusive: bool = True):
+    query = db.query(BalanceCheckpoint).filter(BalanceCheckpoint.account_id == account_id)
+    if at is not None:
+        query = query.filter(BalanceCheckpoint.as_of <= at if inclusive else BalanceCheckpoint.as_of < at)
+    return query.order_by(BalanceCheckpoint.as_of.desc()).first()
+
+
+def write_checkpoints(db: Session, account_id: int, interval: int = LEDGER_CHECKPOINT_INTERVAL) -> int:
+    """
+    Add checkpoints every `interval` entries after the account's latest
+    checkpoint. A checkpoint is only placed where the next entry is
+    later, so it covers every entry at its timestamp. Returns the
+    number written.
+    """
+    last = _latest_checkpoint(db, account_id)
+    query = db.query(BalanceEntry.occurred_at, BalanceEntry.amount).filter(BalanceEntry.account_id == account_id)
+    if last is not None:
+        query = query.filter(BalanceEntry.occurred_at > last.as_of)
+
+    # Bounded count: nothing to do until a full interval has accumulated
+    pending = db.query(func.count()).select_from(query.limit(interval).subquery()).scalar()
+    if pending < interval:
+        return 0
+
+    rows = query.order_by(BalanceEntry.occurred_at, BalanceEntry.id).all()
+    total = Decimal(last.total) if last is not None else Decimal(0)
+    since = 0
+    written = 0
+    for position, (occurred_at, amount) in enumerate(rows):
+        total += Decimal(amount)
+        since += 1
+        following = rows[position + 1][0] if position + 1 < len(rows) else None
+        if since >= interval and following != occurred_at:
+            db.add(BalanceCheckpoint(account_id=account_id, as_of=occurred_at, total=total))
+            since = 0
+            written += 1
+    return written
+
+
+def sync_checkpoints(db: Session):
+    """
+    Drop the checkpoints made stale by backdated entries and add new
+    ones for every account posted to in this transaction.
+    """
+    dirty = db.info.pop(DIRTY_KEY, None)
+    if not dirty:
+        return
+
+    db.flush()
+    for account_id, earliest in dirty.items():
+        db.query(BalanceCheckpoint).filter(
+            BalanceCheckpoint.account_id == account_id,
+            BalanceCheckpoint.as_of >= earliest
+        ).delete(synchronize_session=False)
+        write_checkpoints(db, account_id)
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _sync_before_commit(session):
+    sync_checkpoints(session)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop(DIRTY_KEY, None)
+
+
+def balance_at(db: Session, account: Account, at=None, inclusive: bool = True) -> Decimal:
+    """
+    Balance of the account at time `at` (now if None): the initial
+    balance, plus the latest checkpoint at or before `at` (one indexed
+    seek), plus the at most LEDGER_CHECKPOINT_INTERVAL entries after it.
+    With inclusive=False, changes dated exactly `at` are left out.
+    """
+    checkpoint = _latest_checkpoint(db, account.id, at, inclusive)
+
+    query = db.query(func.coalesce(func.sum(BalanceEntry.amount), 0)).filter(BalanceEntry.account_id == account.id)
+    if checkpoint is not None:
+        query = query.filter(BalanceEntry.occurred_at > checkpoint.as_of)
+    if at is not None:
+        query = query.filter(BalanceEntry.occurred_at <= at if inclusive else BalanceEntry.occurred_at < at)
+
+    base = Decimal(checkpoint.total) if checkpoint is not None else Decimal(0)
+    return Decimal(account.initial_balance) + base + Decimal(query.scalar())
+
+
+def delete_ledger(db: Session, account_id: int):
+    # Only for deleting the account itself; the ledger is otherwise append-only
+    db.query(BalanceCheckpoint).filter(BalanceCheckpoint.account_id == account_id).delete(synchronize_session=False)
+    db.query(BalanceEntry).filter(BalanceEntry.account_id == account_id).delete(synchronize_session=False)
@@ -0,0 +1,501 @@
+# Live mark-to-market of open trades: positions kept in per-instrument
+# NumPy arrays, unrealized P&L per account recomputed on every tick batch
+# and pushed to subscribers, along with stop-loss / take-profit triggers
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import cast, Float
+
+from app.db.database import SessionLocal
+from app.models.trade import Trade
+from app.models.account import Account
+from app.models.data_version import AccountDataVersion
+from app.utils.price_feed import source_from_url
+from app.utils.triggers import TriggerIndex, close_triggered, TRIGGER_ACTION
+
+logger = logging.getLogger(__name__)
+
+# Tick source (see price_feed.source_from_url); empty leaves the feed off
+PRICE_FEED = os.getenv("PRICE_FEED", "")
+
+# Seconds between checks for accounts whose open trades changed
+MARK_TO_MARKET_REFRESH_INTERVAL = float(os.getenv("MARK_TO_MARKET_REFRESH_INTERVAL", "1.0"))
+
+# Least seconds between two pushes to one client; updates in between coalesce
+MARK_TO_MARKET_PUSH_INTERVAL = float(os.getenv("MARK_TO_MARKET_PUSH_INTERVAL", "0.1"))
+
+
+class _Positions:
+    # Open positions in one instrument, as parallel arrays
+    __slots__ = ("trade_ids", "account_ids", "slots", "quantity", "entry", "pnl")
+
+    def __init__(self, trade_ids, account_ids, slots, quantity, entry):
+        self.trade_ids = trade_ids
+        self.account_ids = account_ids
+        self.slots = slots
+        self.quantity = quantity
+        self.entry = entry
+        self.pnl = np.zeros(len(trade_ids))
+
+    def take(self, mask):
+        return _Positions(self.trade_ids[mask], self.account_ids[mask], self.slots[mask],
+                          self.quantity[mask], self.entry[mask])
+
+    def extend(self, other):
+        return _Positions(*(np.concatenate((getattr(self, name), getattr(other, name)))
+                            for name in ("trade_ids", "account_ids", "slots", "quantity", "entry")))
+
+
+class PositionBook:
+    """
+    Open positions grouped by instrument into parallel NumPy arrays, and
+    the unrealized P&L of every account. Shorts have negative quantities,
+    so each position's P&L is quantity * (price - entry), as in
+    calculate_pnl. Positions count as 0 until their instrument's first
+    tick. Callers serialize access.
+    """
+
+    def __init__(self):
+        self.instruments = {}
+        self.prices = {}
+        self.slots = {}
+        self.account_ids = []
+        self.unrealized = np.zeros(0)
+        self.open_positions = np.zeros(0, dtype=np.int64)
+        self.balances = np.zeros(0)
+
+    def _slot(self, account_id: int) -> int:
+        # Accounts keep their index into the per-account arrays for good
+        slot = self.slots.get(account_id)
+        if slot is None:
+            slot = self.slots[account_id] = len(self.account_ids)
+            self.account_ids.append(account_id)
+            self.balances = np.append(self.balances, 0.0)
+        return slot
+
+    def replace(self, balances: dict, rows):
+        """
+        Replace the positions of the accounts in `balances` (account id ->
+        current balance, None once the account is deleted) by `rows` of
+        (trade id, account id, instrument, direction, size, entry price,
+        ...); further columns are ignored.
+        """
+        replaced = np.fromiter(balances, dtype=np.int64, count=len(balances))
+        for instrument, positions in list(self.instruments.items()):
+            keep = ~np.isin(positions.account_ids, replaced)
+            if not keep.all():
+                self.instruments[instrument] = positions.take(keep)
+
+        for account_id, balance in balances.items():
+            if balance is None:
+                slot = self.slots.pop(account_id, None)
+                if slot is not None:
+                    self.account_ids[slot] = None
+                    self.balances[slot] = 0.0
+            else:
+                slot = self._slot(account_id)
+                self.balances[slot] = balance
+
+        grouped = {}
+        for trade_id, account_id, instrument, direction, size, entry, *_ in rows:
+            quantity = size if direction == "LONG" else -size
+            grouped.setdefault(instrument.upper(), []).append((trade_id, account_id, self.slots[account_id], quantity, entry))
+
+        for instrument, group in grouped.items():
+            trade_ids, account_ids, slots, quantity, entry = zip(*group)
+            added = _Positions(np.array(trade_ids, dtype=np.int64), np.array(account_ids, dtype=np.int64),
+                               np.array(slots, dtype=np.int64), np.array(quantity), np.array(entry))
+            existing = self.instruments.get(instrument)
+            self.instruments[instrument] = added if existing is None else existing.extend(added)
+
+        self.instruments = {instrument: positions for instrument, positions in self.instruments.items() if len(positions.trade_ids)}
+        self.recompute()
+
+    def recompute(self):
+        # Full pass; also clears any drift from the per-tick deltas
+        count = len(self.account_ids)
+        self.unrealized = np.zeros(count)
+        self.open_positions = np.zeros(count, dtype=np.int64)
+        for instrument, positions in self.instruments.items():
+            price = self.prices.get(instrument)
+            positions.pnl = positions.quantity * (price - positions.entry) if price is not None else np.zeros(len(positions.entry))
+            self.unrealized += np.bincount(positions.slots, positions.pnl, minlength=count)
+            self.open_positions += np.bincount(positions.slots, minlength=count)
+
+    def apply(self, prices: dict):
+        """
+        Take the latest price of each instrument and update the P&L of its
+        positions and their accounts. Returns the slots of the accounts
+        whose unrealized P&L changed.
+        """
+        count = len(self.account_ids)
+        touched = []
+        for instrument, price in prices.items():
+            self.prices[instrument] = price
+            positions = self.instruments.get(instrument)
+            if positions is None:
+                continue
+
+            pnl = positions.quantity * (price - positions.entry)
+            self.unrealized += np.bincount(positions.slots, pnl - positions.pnl, minlength=count)
+            positions.pnl = pnl
+            touched.append(positions.slots)
+
+        if not touched:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(touched))
+
+    def totals(self, slot: int, as_of=None) -> dict:
+        unrealized = float(self.unrealized[slot]) if slot < len(self.unrealized) else 0.0
+        return {
+            "account_id": self.account_ids[slot],
+            "unrealized_pnl": round(unrealized, 8),
+            "equity": round(float(self.balances[slot]) + unrealized, 8),
+            "open_positions": int(self.open_positions[slot]) if slot < len(self.open_positions) else 0,
+            "as_of": as_of,
+        }
+
+    def positions(self, account_id: int):
+        """Per-trade values of the account's open positions"""
+        found = []
+        for instrument, positions in self.instruments.items():
+            price = self.prices.get(instrument)
+            for index in np.flatnonzero(positions.account_ids == account_id):
+                quantity = float(positions.quantity[index])
+                found.append({
+                    "trade_id": int(positions.trade_ids[index]),
+                    "instrument": instrument,
+                    "direction": "LONG" if quantity > 0 else "SHORT",
+                    "position_size": abs(quantity),
+                    "entry_price": float(positions.entry[index]),
+                    "price": price,
+                    "unrealized_pnl": round(float(positions.pnl[index]), 8) if price is not None else None,
+                })
+        return sorted(found, key=lambda position: position["trade_id"])
+
+
+class Subscription:
+    """
+    One client's accounts with changes not yet sent. Only the account ids
+    are kept and the sender reads the current totals when it sends, so a
+    slow client costs no more than a fast one. Fired triggers are kept as
+    they are, up to the last `max_triggers`. `event` is set on the
+    client's event loop when accounts change or triggers fire.
+    """
+
+    def __init__(self, account_ids, loop, event, max_triggers: int = 1000):
+        self.account_ids = set(account_ids)
+        self.loop = loop
+        self.event = event
+        self._changed = set()
+        self._triggers = deque(maxlen=max_triggers)
+        self._lock = threading.Lock()
+
+    def mark(self, account_ids):
+        with self._lock:
+            wake = not self._changed and not self._triggers
+            self._changed.update(account_ids)
+        if wake:
+            self._wake()
+
+    def notify(self, triggers):
+        with self._lock:
+            wake = not self._changed and not self._triggers
+            self._triggers.extend(triggers)
+        if wake:
+            self._wake()
+
+    def _wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # The client's loop has shut down
+            pass
+
+    def take(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return sorted(changed)
+
+    def take_triggers(self):
+        with self._lock:
+            triggers = list(self._triggers)
+            self._triggers.clear()
+        return triggers
+
+
+class MarkToMarket:
+    """
+    Applies tick batches from a price source to a PositionBook on a feed
+    thread and pushes the changed account totals to subscribers. A
+    refresh thread reloads the open trades of every account whose data
+    version moved, so any write to trades, deposits or accounts shows up
+    within `refresh_interval` seconds.
+
+    Each batch is also checked against a TriggerIndex of the trades'
+    stop-loss and take-profit levels. Fired triggers are pushed to
+    subscribers and kept for `recent_triggers`; with `trigger_action`
+    "close" a closer thread also closes the trades, off the feed thread.
+    """
+
+    def __init__(self, session_factory=SessionLocal, refresh_interval: float = MARK_TO_MARKET_REFRESH_INTERVAL,
+                 trigger_action: str = TRIGGER_ACTION):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.trigger_action = trigger_action
+        self.book = PositionBook()
+        self.triggers = TriggerIndex()
+        self.source = None
+        self.as_of = None
+
+        self._versions = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._subscribers_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+
+        self.ticks = 0
+        self.batches = 0
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self.max_batch_ms = 0.0
+        self._batch_ms = deque(maxlen=1000)
+        self._recent_triggers = deque(maxlen=1000)
+        self._to_close = queue.Queue()
+        self.auto_closed = 0
+        self.failed_closes = 0
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def refresh(self) -> int:
+        """
+        Reload the balance and open trades of accounts whose data version
+        changed since they were loaded (all of them the first time), and
+        drop deleted accounts. Returns the number of accounts reloaded.
+        """
+        db = self.session_factory()
+        try:
+            accounts = db.query(Account.id, cast(Account.current_balance, Float), AccountDataVersion.version).outerjoin(
+                AccountDataVersion, AccountDataVersion.account_id == Account.id
+            ).all()
+            versions = {account_id: version or 0 for account_id, _, version in accounts}
+
+            changed = {account_id: balance for account_id, balance, _ in accounts if self._versions.get(account_id) != versions[account_id]}
+            changed.update({account_id: None for account_id in self._versions if account_id not in versions})
+            if not changed:
+                return 0
+
+            query = db.query(
+                Trade.id, Trade.account_id, Trade.currency_pair, Trade.direction,
+                cast(Trade.position_size, Float), cast(Trade.entry_price, Float),
+                cast(Trade.stop_loss, Float), cast(Trade.take_profit, Float)
+            ).filter(Trade.win_loss == "OPEN")
+            # Narrow by account unless most of them changed (e.g. the first load)
+            if len(changed) * 2 < len(versions):
+                query = query.filter(Trade.account_id.in_(list(changed)))
+            rows = [row for row in query.all() if changed.get(row[1]) is not None]
+        finally:
+            db.close()
+
+        with self._lock:
+            self.book.replace(changed, rows)
+            self.triggers.replace(changed, rows)
+            self._versions = versions
+            self._publish([self.book.slots[account_id] for account_id, balance in changed.items() if balance is not None])
+
+        self.refreshes += 1
+        return len(changed)
+
+    def ingest(self, batch):
+        """
+        Apply a batch of (instrument, price) ticks; the last price per
+        instrument wins, while triggers see every tick.
+        """
+        started = time.perf_counter()
+        prices = dict(batch)
+
+        with self._lock:
+            slots = self.book.apply(prices)
+            self.as_of = datetime.utcnow()
+            fired = self.triggers.check(batch, self.as_of)
+            self._recent_triggers.extend(fired)
+            self._publish(slots)
+
+        if fired:
+            self._fire(fired)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.ticks += len(batch)
+        self.batches += 1
+        self.max_batch_ms = max(self.max_batch_ms, elapsed_ms)
+        self._batch_ms.append(elapsed_ms)
+
+    def _publish(self, slots):
+        # Only flag the accounts; totals are read when the update is sent
+        changed = {}
+        with self._subscribers_lock:
+            if not self._subscribers:
+                return
+            for slot in np.asarray(slots).tolist():
+                account_id = self.book.account_ids[slot]
+                for subscription in self._subscribers.get(account_id, ()):
+                    changed.setdefault(subscription, []).append(account_id)
+
+        for subscription, account_ids in changed.items():
+            subscription.mark(account_ids)
+
+    def _fire(self, fired):
+        if self.trigger_action == "close":
+            self._to_close.put(fired)
+
+        notified = {}
+        with self._subscribers_lock:
+            for trigger in fired:
+                for subscription in self._subscribers.get(trigger["account_id"], ()):
+                    notified.setdefault(subscription, []).append(trigger)
+
+        for subscription, triggers in notified.items():
+            subscription.notify(triggers)
+
+    def recent_triggers(self, account_id: int):
+        """The account's triggers among the last ones fired, newest first"""
+        with self._lock:
+            return [trigger for trigger in reversed(self._recent_triggers) if trigger["account_id"] == account_id]
+
+    def snapshot(self, account_ids):
+        """Current totals of the given accounts"""
+        with self._lock:
+            as_of = self.as_of.isoformat() if self.as_of else None
+            return [
+                self.book.totals(self.book.slots[account_id], as_of) if account_id in self.book.slots
+                else {"account_id": account_id, "unrealized_pnl": 0.0, "equity": None, "open_positions": 0, "as_of": as_of}
+                for account_id in account_ids
+            ]
+
+    def account(self, account_id: int) -> dict:
+        """Totals and per-trade values of one account"""
+        totals = self.snapshot([account_id])[0]
+        with self._lock:
+            totals["positions"] = self.book.positions(account_id)
+        return totals
+
+    def subscribe(self, account_ids, loop, event) -> Subscription:
+        subscription = Subscription(account_ids, loop, event)
+        with self._subscribers_lock:
+            for account_id in subscription.account_ids:
+                self._subscribers.setdefault(account_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._subscribers_lock:
+            for account_id in subscription.account_ids:
+                subscribers = self._subscribers.get(account_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[account_id]
+
+    def _feed(self):
+        while not self._stopping.is_set():
+            try:
+                for batch in self.source.batches(self._stopping):
+                    self.ingest(batch)
+                return
+            except Exception as e:
+                logger.error(f"Price feed failed: {str(e)}")
+                self._stopping.wait(1.0)
+
+    def _close_loop(self):
+        while not self._stopping.is_set():
+            try:
+                fired = self._to_close.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Close everything fired meanwhile in one go
+            while True:
+                try:
+                    fired.extend(self._to_close.get_nowait())
+                except queue.Empty:
+                    break
+
+            db = self.session_factory()
+            try:
+                self.auto_closed += len(close_triggered(db, fired))
+            except Exception as e:
+                self.failed_closes += len(fired)
+                logger.error(f"Closing triggered trades failed: {str(e)}")
+            finally:
+                db.close()
+
+    def _refresh_loop(self):
+        while not self._stopping.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failed_refreshes += 1
+                logger.error(f"Mark-to-market refresh failed: {str(e)}")
+
+    def start(self, source=None):
+        """Load the open trades and start consuming `source` (PRICE_FEED if None)."""
+        if self.running:
+            return
+
+        self.source = source or source_from_url(PRICE_FEED)
+        if self.source is None:
+            logger.info("No price feed configured; mark-to-market is off")
+            return
+
+        self._stopping.clear()
+        self.refresh()
+        self._threads = [
+            threading.Thread(target=self._refresh_loop, name="mark-to-market-refresh", daemon=True),
+            threading.Thread(target=self._feed, name="mark-to-market-feed", daemon=True),
+        ]
+        if self.trigger_action == "close":
+            self._threads.append(threading.Thread(target=self._close_loop, name="mark-to-market-close", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        latencies = np.array(self._batch_ms) if self._batch_ms else np.zeros(1)
+        with self._subscribers_lock:
+            subscriptions = len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
+        with self._lock:
+            resting_levels = len(self.triggers)
+        return {
+            "running": self.running,
+            "ticks": self.ticks,
+            "batches": self.batches,
+            "instruments": len(self.book.instruments),
+            "open_positions": int(self.book.open_positions.sum()),
+            "subscriptions": subscriptions,
+            "trigger_action": self.trigger_action,
+            "resting_levels": resting_levels,
+            "triggers_fired": self.triggers.fired,
+            "auto_closed": self.auto_closed,
+            "failed_closes": self.failed_closes,
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+            "p50_batch_ms": float(np.percentile(latencies, 50)),
+            "p99_batch_ms": float(np.percentile(latencies, 99)),
+            "max_batch_ms": self.max_batch_ms,
+        }
+
+
+mark_to_market = MarkToMarket()
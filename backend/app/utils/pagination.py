@@ -0,0 +1,102 @@
+# Keyset (cursor) pagination shared by the list endpoints
+import json
+import base64
+from enum import Enum
+from datetime import date, datetime
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# The cursor for the next page is returned in this header, so list
+# responses stay plain JSON arrays
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    if isinstance(value, dict) and "d" in value:
+        return date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(key: str, order: SortOrder, value, row_id: int) -> str:
+    payload = json.dumps({"k": key, "o": order.value, "v": _dump_value(value), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str, order: SortOrder):
+    """
+    Return (value, id) of the last row of the previous page. The cursor
+    must come from the same endpoint, sort key and order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != key or payload["o"] != order.value:
+            raise ValueError("cursor does not match the requested ordering")
+        return _load_value(payload["v"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {str(e)}"
+        )
+
+
+def paginate(query, key_column, id_column, response: Response, cursor=None, limit: int = DEFAULT_PAGE_SIZE,
+             order: SortOrder = SortOrder.ASC):
+    """
+    Return one page of `query` ordered by (key_column, id_column). The
+    page starts after the row the cursor points at, so with an index on
+    (scope, key, id) every page costs the same as the first. Sets the
+    next-page cursor header when more rows remain.
+
+    With neither `limit` nor `cursor` (limit None), every row is returned
+    unpaged, as the list endpoints did before paging; a cursor without a
+    limit gets DEFAULT_PAGE_SIZE rows.
+    """
+    key = key_column.key
+    descending = order == SortOrder.DESC
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, key, order)
+        position = tuple_(key_column, id_column)
+        if descending:
+            query = query.filter(position < tuple_(value, row_id))
+        else:
+            query = query.filter(position > tuple_(value, row_id))
+
+    if descending:
+        query = query.order_by(key_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(key_column.asc(), id_column.asc())
+
+    if limit is None and not cursor:
+        return query.all()
+    limit = limit or DEFAULT_PAGE_SIZE
+
+    # One extra row tells us whether there is a next page
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+
+    if len(rows) > limit:
+        last = page[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key, order, getattr(last, key), last.id)
+
+    return page
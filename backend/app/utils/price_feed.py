@@ -0,0 +1,146 @@
+# Pluggable price sources for the mark-to-market engine. A source has a
+# `batches(stop)` generator yielding lists of (instrument, price) ticks
+# until the `stop` event is set.
+import os
+import time
+import socket
+import logging
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Most ticks handed to the engine at once
+TICK_BATCH_SIZE = int(os.getenv("TICK_BATCH_SIZE", "1000"))
+
+# A paced replay never holds ticks back longer than this (seconds)
+MAX_BATCH_DELAY = 0.05
+
+
+def parse_tick(line: str):
+    """
+    (instrument, price) from an "EURUSD,1.0845" line; further columns,
+    e.g. a timestamp, are ignored. None for blank, header or malformed
+    lines.
+    """
+    parts = line.split(",")
+    if len(parts) < 2:
+        return None
+
+    try:
+        price = float(parts[1])
+    except ValueError:
+        return None
+
+    # Also rejects NaN
+    if not price > 0:
+        return None
+
+    return parts[0].strip().upper(), price
+
+
+class FileReplaySource:
+    """
+    Replays a CSV of instrument,price[,...] lines, at up to `rate` ticks
+    per second (as fast as possible if None), from the top again when
+    `loop` is set. For testing and demos.
+    """
+
+    def __init__(self, path: str, rate=None, batch_size: int = TICK_BATCH_SIZE, loop: bool = False):
+        self.path = path
+        self.rate = rate
+        self.loop = loop
+        self.batch_size = batch_size
+        if rate:
+            self.batch_size = max(1, min(batch_size, int(rate * MAX_BATCH_DELAY)))
+
+    def batches(self, stop):
+        while not stop.is_set():
+            started = time.monotonic()
+            sent = 0
+            batch = []
+
+            with open(self.path) as ticks:
+                for line in ticks:
+                    tick = parse_tick(line)
+                    if tick is None:
+                        continue
+
+                    batch.append(tick)
+                    if len(batch) < self.batch_size:
+                        continue
+
+                    yield batch
+                    sent += len(batch)
+                    batch = []
+
+                    # Sleep off any lead over the target rate
+                    if self.rate and stop.wait(max(0.0, sent / self.rate - (time.monotonic() - started))):
+                        return
+
+            if batch:
+                yield batch
+
+            if not self.loop:
+                return
+
+
+class SocketSource:
+    """
+    Reads newline-separated instrument,price ticks from a TCP server,
+    reconnecting after `reconnect_delay` seconds when the connection
+    drops. Each batch is whatever arrived since the last read, so a burst
+    is taken in at once instead of tick by tick.
+    """
+
+    def __init__(self, host: str, port: int, reconnect_delay: float = 1.0):
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+
+    def batches(self, stop):
+        while not stop.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=1.0) as connection:
+                    logger.info(f"Price feed connected to {self.host}:{self.port}")
+                    pending = b""
+                    while not stop.is_set():
+                        try:
+                            data = connection.recv(65536)
+                        except socket.timeout:
+                            continue
+                        if not data:
+                            break
+
+                        lines = (pending + data).split(b"\n")
+                        pending = lines.pop()
+                        batch = [tick for tick in (parse_tick(line.decode(errors="replace")) for line in lines) if tick]
+                        if batch:
+                            yield batch
+            except OSError as e:
+                logger.warning(f"Price feed {self.host}:{self.port} unavailable: {str(e)}")
+
+            stop.wait(self.reconnect_delay)
+
+
+def source_from_url(url: str):
+    """
+    Build a source from a PRICE_FEED setting:
+    "file:ticks.csv?rate=500&loop=1" or "tcp://host:port". None if unset.
+    """
+    if not url:
+        return None
+
+    parsed = urlparse(url)
+    options = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+    if parsed.scheme == "file":
+        return FileReplaySource(
+            parsed.netloc + parsed.path,
+            rate=float(options["rate"]) if "rate" in options else None,
+            loop=options.get("loop", "0").lower() in ("1", "true", "yes")
+        )
+
+    if parsed.scheme == "tcp":
+        return SocketSource(parsed.hostname, parsed.port)
+
+    raise ValueError(f"Unsupported price feed {url!r}; use file:<path> or tcp://<host>:<port>")
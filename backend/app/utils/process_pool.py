@@ -0,0 +1,39 @@
+# Shared process pools for CPU-heavy analysis work
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+MAX_WORKERS = int(os.getenv("ANALYSIS_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "2"))
+
+# "analysis" runs chunks awaited by a request; "jobs" runs background
+# analysis jobs, so long jobs never queue in front of request work
+POOL_SIZES = {
+    "analysis": MAX_WORKERS,
+    "jobs": JOB_WORKERS,
+}
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(name: str = "analysis") -> ProcessPoolExecutor:
+    """
+    Lazily start the named pool. Workers are spawned rather than forked
+    so they never inherit the server's threads or database connections.
+    """
+    with _pool_lock:
+        if name not in _pools:
+            _pools[name] = ProcessPoolExecutor(
+                max_workers=POOL_SIZES[name],
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pools[name]
+
+
+def shutdown_process_pool():
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+        _pools.clear()
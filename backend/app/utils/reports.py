@@ -0,0 +1,400 @@
+# Analysis computations shared by the analysis routes and background jobs
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, cast, case, distinct, Float
+from sqlalchemy.orm import Session
+
+from app.models.trade import Trade
+from app.models.account import Account
+from app.models.deposit import Deposit
+from app.utils.analytics import (
+    trades_frame, outcome_stats, stats_records, time_breakdown,
+    closed_trades_frame, pair_correlations, feature_correlations,
+    event_frame, equity_curve, lttb, rolling_metrics, sample_indices, nan_to_none
+)
+from app.utils.fx import normalize_currency
+from app.utils.ledger import comparable_time
+
+PORTFOLIO_SUM_KEYS = [
+    "total_trades", "win_count", "loss_count", "open_count", "gross_profit",
+    "gross_loss", "net_pnl_base", "deposits_base", "balance_base",
+]
+
+
+def pattern_analysis(db: Session, user_id: int, account_id=None, start_date=None, end_date=None) -> dict:
+    """
+    Pattern analysis payload (patterns, correlations, time_analysis)
+    for the user's trades, optionally filtered by account and open date.
+    """
+    # Base query with user filter, selecting only the columns we group on
+    query = db.query(
+        Trade.currency_pair,
+        Trade.direction,
+        Trade.win_loss,
+        cast(Trade.profit_amount, Float),
+        cast(Trade.loss_amount, Float),
+        cast(Trade.risk_reward, Float),
+        Trade.date_open,
+        Trade.date_closed,
+    ).join(Account, Trade.account_id == Account.id).filter(Account.user_id == user_id)
+
+    # Apply additional filters if provided
+    if account_id:
+        query = query.filter(Trade.account_id == account_id)
+
+    if start_date:
+        query = query.filter(Trade.date_open >= start_date)
+
+    if end_date:
+        query = query.filter(Trade.date_open <= end_date)
+
+    # Execute query into a columnar frame
+    trades = trades_frame(
+        query.all(),
+        ["currency_pair", "direction", "win_loss", "profit_amount", "loss_amount", "risk_reward", "date_open", "date_closed"]
+    )
+
+    # Currency pair analysis (average profit over wins, average loss over losses)
+    trades["profit_on_win"] = trades["profit_amount"].where(trades["is_win"] == 1)
+    trades["loss_on_loss"] = trades["loss_amount"].where(trades["is_loss"] == 1)
+    currency_pairs = outcome_stats(trades, "currency_pair", {
+        "avg_profit": ("profit_on_win", "mean"),
+        "avg_loss": ("loss_on_loss", "mean"),
+    }).fillna(0.0)
+
+    # Direction analysis (both directions are always reported)
+    direction_stats = outcome_stats(trades, "direction").reindex(["LONG", "SHORT"], fill_value=0)
+
+    patterns = [
+        {"name": "Currency Pair", "data": stats_records(currency_pairs, "pair")},
+        {"name": "Direction", "data": stats_records(direction_stats, "direction")},
+    ]
+
+    # Daily P&L correlation between instruments, and outcome vs trade features
+    correlations = pair_correlations(trades) + feature_correlations(trades)
+
+    return {
+        "patterns": patterns,
+        "correlations": correlations,
+        "time_analysis": time_breakdown(trades),
+    }
+
+
+def closed_trades(db: Session, user_id: int, account_id=None):
+    """
+    Closed trades of the user (or one account) as a frame from
+    `closed_trades_frame`, sorted by close time.
+    """
+    query = db.query(
+        Trade.date_closed,
+        Trade.win_loss,
+        cast(Trade.profit_amount, Float),
+        cast(Trade.loss_amount, Float),
+        cast(Trade.position_size, Float),
+        cast(Trade.entry_price, Float),
+        cast(Trade.stop_loss, Float),
+    ).join(Account, Trade.account_id == Account.id).filter(
+        Account.user_id == user_id,
+        Trade.date_closed.isnot(None)
+    )
+
+    if account_id:
+        query = query.filter(Trade.account_id == account_id)
+
+    return closed_trades_frame(query.all())
+
+
+def current_equity(db: Session, user_id: int, account_id=None) -> float:
+    # Current balance of the accounts in scope
+    query = db.query(func.coalesce(func.sum(cast(Account.current_balance, Float)), 0.0)).filter(
+        Account.user_id == user_id
+    )
+    if account_id:
+        query = query.filter(Account.id == account_id)
+
+    return float(query.scalar())
+
+
+def simulation_samples(db: Session, user_id: int, account_id=None, use_r_multiples: bool = True):
+    """
+    Realized outcomes to bootstrap from: R multiples (trades with a stop
+    loss) or P&L amounts of the closed trades.
+    """
+    closed = closed_trades(db, user_id, account_id)
+    column = "r_multiple" if use_r_multiples else "pnl"
+    return closed[column].dropna().to_numpy(dtype=float)
+
+
+def _account_partial(account, trades, deposits, fx, base_currency: str, now: datetime) -> dict:
+    # One account's figures in its own currency and converted into base_currency
+    currency = normalize_currency(account.currency)
+    closed = trades[trades["date_closed"].notna()]
+
+    # Realized P&L converted at the rate in force when the trade closed
+    rates = fx.rates(currency, base_currency, closed["date_closed"])
+    profit = closed["profit"].fillna(0.0).to_numpy(dtype=float)
+    loss = closed["loss"].fillna(0.0).to_numpy(dtype=float)
+    profit_base = profit * rates
+    loss_base = loss * rates
+
+    deposits_base = fx.convert(deposits["amount"], currency, base_currency, deposits["date"])
+    current_rate = float(fx.rates(currency, base_currency, [now])[0])
+    balance = float(account.current_balance)
+
+    return {
+        "account_id": account.id,
+        "name": account.name,
+        "currency": currency,
+        "fx_rate": current_rate,
+        "total_trades": len(trades),
+        "win_count": int((trades["win_loss"] == "WIN").sum()),
+        "loss_count": int((trades["win_loss"] == "LOSS").sum()),
+        "open_count": int((trades["win_loss"] == "OPEN").sum()),
+        "net_pnl": float(profit.sum() - loss.sum()),
+        "deposits": float(deposits["amount"].sum()),
+        "balance": balance,
+        "gross_profit": float(profit_base.sum()),
+        "gross_loss": float(loss_base.sum()),
+        "net_pnl_base": float(profit_base.sum() - loss_base.sum()),
+        "deposits_base": float(deposits_base.sum()),
+        "balance_base": balance * current_rate,
+        "largest_profit": float(profit_base.max()) if len(profit_base) else 0.0,
+        "largest_loss": float(loss_base.max()) if len(loss_base) else 0.0,
+    }
+
+
+def _merge_partials(partials) -> dict:
+    totals = {key: sum(partial[key] for partial in partials) for key in PORTFOLIO_SUM_KEYS}
+    decided = totals["win_count"] + totals["loss_count"]
+
+    totals.update({
+        "win_rate": totals["win_count"] / decided if decided else 0.0,
+        "largest_profit": max((partial["largest_profit"] for partial in partials), default=0.0),
+        "largest_loss": max((partial["largest_loss"] for partial in partials), default=0.0),
+    })
+    return totals
+
+
+def portfolio_analysis(db: Session, user_id: int, fx, base_currency: str, start_date=None, end_date=None) -> dict:
+    """
+    All of the user's accounts aggregated into base_currency using the
+    FxTable `fx`. Trades and deposits are loaded with one query each
+    and grouped by account once; the per-account partials are merged.
+    Raises FxRateMissing if an account currency has no rate.
+    """
+    base_currency = normalize_currency(base_currency)
+    accounts = db.query(Account).filter(Account.user_id == user_id).order_by(Account.id).all()
+
+    trade_query = db.query(
+        Trade.account_id,
+        Trade.win_loss,
+        cast(Trade.profit_amount, Float),
+        cast(Trade.loss_amount, Float),
+        Trade.date_closed,
+    ).join(Account, Trade.account_id == Account.id).filter(Account.user_id == user_id)
+
+    deposit_query = db.query(
+        Deposit.account_id,
+        cast(Deposit.amount, Float),
+        Deposit.date,
+    ).join(Account, Deposit.account_id == Account.id).filter(Account.user_id == user_id)
+
+    if start_date:
+        trade_query = trade_query.filter(Trade.date_open >= start_date)
+        deposit_query = deposit_query.filter(Deposit.date >= start_date)
+
+    if end_date:
+        trade_query = trade_query.filter(Trade.date_open <= end_date)
+        deposit_query = deposit_query.filter(Deposit.date <= end_date)
+
+    trades = pd.DataFrame.from_records(
+        trade_query.all(), columns=["account_id", "win_loss", "profit", "loss", "date_closed"]
+    )
+    deposits = pd.DataFrame.from_records(deposit_query.all(), columns=["account_id", "amount", "date"])
+
+    trades_by_account = dict(tuple(trades.groupby("account_id")))
+    deposits_by_account = dict(tuple(deposits.groupby("account_id")))
+    now = datetime.utcnow()
+
+    partials = [
+        _account_partial(
+            account,
+            trades_by_account.get(account.id, trades.iloc[:0]),
+            deposits_by_account.get(account.id, deposits.iloc[:0]),
+            fx,
+            base_currency,
+            now
+        )
+        for account in accounts
+    ]
+
+    return {
+        "base_currency": base_currency,
+        "as_of": now,
+        "accounts": partials,
+        "totals": _merge_partials(partials),
+    }
+
+
+def recommendations(db: Session, user_id: int) -> dict:
+    """
+    Rule-based recommendations over the user's full trade history. The
+    figures the rules need are aggregated in SQL rather than loaded row
+    by row.
+    """
+    total, wins, losses, avg_rr, pairs, days = db.query(
+        func.count(Trade.id),
+        func.coalesce(func.sum(case((Trade.win_loss == "WIN", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Trade.win_loss == "LOSS", 1), else_=0)), 0),
+        func.avg(cast(Trade.risk_reward, Float)),
+        func.count(distinct(Trade.currency_pair)),
+        func.count(distinct(func.date(Trade.date_open))),
+    ).join(Account, Trade.account_id == Account.id).filter(Account.user_id == user_id).one()
+
+    found = []
+
+    # Check win rate
+    if wins + losses > 0:
+        win_rate = wins / (wins + losses)
+
+        if win_rate < 0.3:
+            found.append({
+                "title": "Low Win Rate",
+                "description": "Your win rate is below 30%. Consider reviewing your trading strategy or focusing on the currency pairs with higher win rates.",
+                "confidence": 0.9,
+                "category": "Performance"
+            })
+        elif win_rate > 0.7:
+            found.append({
+                "title": "Excellent Win Rate",
+                "description": "Your win rate is above 70%. Consider increasing your position sizes to maximize profits.",
+                "confidence": 0.9,
+                "category": "Performance"
+            })
+
+    # Check risk/reward ratio (averaged over trades that have one)
+    if avg_rr is not None and avg_rr < 1.0:
+        found.append({
+            "title": "Low Risk/Reward Ratio",
+            "description": "Your average risk/reward ratio is below 1:1. Consider adjusting your take profit and stop loss levels to aim for at least 1:2.",
+            "confidence": 0.8,
+            "category": "Risk Management"
+        })
+
+    # Check if they're trading too many pairs
+    if pairs > 10 and total < 50:
+        found.append({
+            "title": "Too Many Currency Pairs",
+            "description": "You're trading too many different currency pairs relative to your total trade count. Consider focusing on fewer pairs to develop expertise.",
+            "confidence": 0.7,
+            "category": "Strategy"
+        })
+
+    # Check for overtrading
+    if total > 50 and total / days > 5:
+        found.append({
+            "title": "Potential Overtrading",
+            "description": "You're averaging more than 5 trades per trading day. Consider quality over quantity and being more selective.",
+            "confidence": 0.6,
+            "category": "Behavior"
+        })
+
+    return {"recommendations": found}
+
+
+def equity_report(db: Session, user_id: int, account_id=None, start_date=None, end_date=None, points: int = 500) -> dict:
+    """
+    Equity curve payload (summary figures and at most `points` points)
+    of the user's accounts or one account, between start_date and
+    end_date.
+    """
+    # Accounts in scope and their combined starting balance
+    accounts = db.query(Account.id, cast(Account.initial_balance, Float)).filter(Account.user_id == user_id)
+    if account_id:
+        accounts = accounts.filter(Account.id == account_id)
+    accounts = accounts.all()
+
+    account_ids = [row[0] for row in accounts]
+    starting_balance = sum(row[1] for row in accounts)
+
+    # Closed-trade P&L and deposits, up to end_date; earlier events still
+    # count towards the balance at start_date
+    trade_query = db.query(
+        Trade.date_closed,
+        cast(Trade.profit_amount, Float),
+        cast(Trade.loss_amount, Float),
+    ).filter(Trade.account_id.in_(account_ids), Trade.date_closed.isnot(None))
+
+    deposit_query = db.query(
+        Deposit.date,
+        cast(Deposit.amount, Float),
+    ).filter(Deposit.account_id.in_(account_ids))
+
+    if end_date:
+        trade_query = trade_query.filter(Trade.date_closed <= end_date)
+        deposit_query = deposit_query.filter(Deposit.date <= end_date)
+
+    events = event_frame(trade_query.all(), deposit_query.all())
+
+    # Events before start_date only set the balance the window opens with;
+    # the summary figures cover the window alone
+    if start_date:
+        before = (events["timestamp"] < np.datetime64(comparable_time(start_date))).to_numpy()
+        starting_balance += float(events["delta"].to_numpy()[before].sum())
+        events = events[~before].reset_index(drop=True)
+
+    curve = equity_curve(events, starting_balance)
+    timestamps = curve["timestamps"]
+    balance = curve["balance"]
+
+    # Downsample to the requested point budget
+    keep = lttb(timestamps.astype("datetime64[s]").astype(np.int64), balance, points)
+
+    return {
+        "starting_balance": starting_balance,
+        "ending_balance": curve["ending_balance"],
+        "peak_balance": curve["peak_balance"],
+        "max_drawdown": curve["max_drawdown"],
+        "max_drawdown_pct": curve["max_drawdown_pct"],
+        "max_drawdown_duration_days": curve["max_drawdown_duration_days"],
+        "total_points": len(balance),
+        "points": [
+            {
+                "timestamp": timestamps[i].astype("datetime64[us]").item(),
+                "balance": float(balance[i]),
+                "drawdown": float(curve["drawdown"][i]),
+                "drawdown_pct": float(curve["drawdown_pct"][i]),
+            }
+            for i in keep
+        ],
+    }
+
+
+def rolling_report(db: Session, user_id: int, windows, window_type: str = "trades", account_id=None, points: int = 500) -> dict:
+    """
+    Rolling win rate, expectancy and average R over each trailing window
+    (trades, or days for window_type "days"), at most `points` samples.
+    """
+    closed = closed_trades(db, user_id, account_id)
+    keep = sample_indices(len(closed), points)
+
+    # One set of prefix sums serves every requested window; only the
+    # sampled positions are evaluated
+    series = [
+        {
+            "window": window,
+            "win_rate": nan_to_none(metrics["win_rate"]),
+            "expectancy": nan_to_none(metrics["expectancy"]),
+            "avg_r": nan_to_none(metrics["avg_r"]),
+        }
+        for window, metrics in rolling_metrics(closed, windows, window_type == "days", at=keep).items()
+    ]
+
+    return {
+        "window_type": window_type,
+        "total_trades": len(closed),
+        "timestamps": closed["timestamp"].iloc[keep].dt.to_pydatetime().tolist(),
+        "series": series,
+    }
@@ -0,0 +1,64 @@
+# Fast path for large list responses: plain column rows instead of ORM
+# instances, validated in one call and encoded to JSON by pydantic-core
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import HTTPException, Response, status
+from pydantic import TypeAdapter, create_model
+
+
+def parse_fields(model, fields: Optional[str]):
+    """
+    Field names of a `?fields=a,b` sparse fieldset in the model's own
+    order, or None for every field. Raises 400 naming unknown fields.
+    """
+    if not fields:
+        return None
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(model.model_fields))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}; available: {', '.join(model.model_fields)}"
+        )
+
+    return tuple(name for name in model.model_fields if name in requested)
+
+
+@lru_cache(maxsize=128)
+def list_adapter(model, fields=None) -> TypeAdapter:
+    """
+    TypeAdapter for a list of `model`, or of a model with only `fields`
+    of it (types and constraints kept), built once per fieldset.
+    """
+    if fields is not None:
+        model = create_model(
+            f"{model.__name__}Fields",
+            **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+        )
+    return TypeAdapter(List[model])
+
+
+def list_columns(entity, model, fields=None, required=("id",)):
+    """
+    Columns of `entity` to select for the model's fields (or just
+    `fields`), plus the `required` ones, e.g. the pagination keys.
+    """
+    names = dict.fromkeys((*(fields or model.model_fields), *required))
+    return [getattr(entity, name) for name in names]
+
+
+def list_response(model, rows, response: Response, fields=None) -> Response:
+    """
+    Validate the rows in one call and encode them straight to JSON bytes,
+    keeping the headers already set on `response` (next-page cursor,
+    validators). Columns outside the fieldset are left out.
+    """
+    adapter = list_adapter(model, fields)
+
+    # Dicts validate several times faster than attribute lookups on rows
+    records = [dict(zip(row._fields, row)) for row in rows]
+    body = adapter.dump_json(adapter.validate_python(records))
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(content=body, media_type="application/json", headers=headers)
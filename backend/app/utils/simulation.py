@@ -0,0 +1,127 @@
+# Monte Carlo bootstrap of realized trade outcomes
+import asyncio
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from app.utils.process_pool import get_process_pool
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+# Below this many simulated steps, a pool round trip costs more than it saves
+INLINE_MAX_STEPS = 2_000_000
+
+
+def _simulate_chunk(samples, paths, horizon, starting_equity, multiplicative, risk_fraction, ruin_level, seed):
+    """
+    Simulate `paths` equity paths of `horizon` trades each by drawing
+    outcomes from `samples` with replacement. Returns per-path final
+    equity, max drawdown (fraction of peak) and whether ruin was hit.
+    Top-level so it can run in a worker process.
+    """
+    rng = np.random.default_rng(seed)
+    draws = samples[rng.integers(0, len(samples), size=(paths, horizon))]
+
+    if multiplicative:
+        # R multiples compounded at a fixed fraction of equity risked per trade
+        growth = np.maximum(1.0 + risk_fraction * draws, 0.0)
+        equity = starting_equity * np.cumprod(growth, axis=1)
+    else:
+        equity = starting_equity + np.cumsum(draws, axis=1)
+
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), starting_equity)
+    drawdown = np.divide(peak - equity, peak, out=np.zeros_like(equity), where=peak > 0)
+
+    return (
+        equity[:, -1],
+        drawdown.max(axis=1),
+        (equity <= ruin_level).any(axis=1),
+    )
+
+
+def chunk_plan(paths: int, horizon: int, memory_budget_mb: float):
+    # Roughly four float64 (paths x horizon) arrays are alive per chunk
+    per_path_bytes = horizon * 8 * 4
+    chunk_paths = max(1, int(memory_budget_mb * 1024 * 1024 // per_path_bytes))
+    return [min(chunk_paths, paths - start) for start in range(0, paths, chunk_paths)]
+
+
+def _prepare(samples, paths, horizon, starting_equity, multiplicative, risk_fraction, ruin_fraction, seed, memory_budget_mb):
+    samples = np.asarray(samples, dtype=float)
+    chunks = chunk_plan(paths, horizon, memory_budget_mb)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    ruin_level = starting_equity * (1 - ruin_fraction)
+    args = (horizon, starting_equity, multiplicative, risk_fraction, ruin_level)
+    return [(samples, size, *args, child) for size, child in zip(chunks, seeds)]
+
+
+def _summarize(results, paths, horizon, starting_equity, drawdown_limit):
+    final_equity = np.concatenate([result[0] for result in results])
+    max_drawdown = np.concatenate([result[1] for result in results])
+    ruined = np.concatenate([result[2] for result in results])
+
+    return {
+        "paths": paths,
+        "horizon": horizon,
+        "chunks": len(results),
+        "starting_equity": starting_equity,
+        "mean_final_equity": float(final_equity.mean()),
+        "final_equity_percentiles": dict(zip(map(str, PERCENTILES), np.percentile(final_equity, PERCENTILES).tolist())),
+        "max_drawdown_pct_percentiles": dict(zip(map(str, PERCENTILES), (np.percentile(max_drawdown, PERCENTILES) * 100).tolist())),
+        "probability_of_profit": float((final_equity > starting_equity).mean()),
+        "probability_drawdown_limit": float((max_drawdown >= drawdown_limit).mean()),
+        "risk_of_ruin": float(ruined.mean()),
+    }
+
+
+def simulate(
+    samples,
+    paths: int,
+    horizon: int,
+    starting_equity: float,
+    multiplicative: bool = False,
+    risk_fraction: float = 0.01,
+    drawdown_limit: float = 0.2,
+    ruin_fraction: float = 0.5,
+    seed=None,
+    memory_budget_mb: float = 64,
+):
+    """
+    Run every chunk in the current process. Gives the same result as
+    `run_simulation` for the same seed; used inside background jobs.
+    """
+    tasks = _prepare(samples, paths, horizon, starting_equity, multiplicative, risk_fraction, ruin_fraction, seed, memory_budget_mb)
+    results = [_simulate_chunk(*task) for task in tasks]
+    return _summarize(results, paths, horizon, starting_equity, drawdown_limit)
+
+
+async def run_simulation(
+    samples,
+    paths: int,
+    horizon: int,
+    starting_equity: float,
+    multiplicative: bool = False,
+    risk_fraction: float = 0.01,
+    drawdown_limit: float = 0.2,
+    ruin_fraction: float = 0.5,
+    seed=None,
+    memory_budget_mb: float = 64,
+):
+    """
+    Bootstrap `paths` equity paths from `samples`. Work is split into
+    chunks that fit `memory_budget_mb`; each chunk gets its own child
+    seed, so a seeded run gives the same result however many workers
+    execute it.
+    """
+    tasks = _prepare(samples, paths, horizon, starting_equity, multiplicative, risk_fraction, ruin_fraction, seed, memory_budget_mb)
+
+    if paths * horizon <= INLINE_MAX_STEPS:
+        # Still up to a second of NumPy work; keep it off the event loop
+        results = await run_in_threadpool(lambda: [_simulate_chunk(*task) for task in tasks])
+    else:
+        pool = get_process_pool()
+        results = await asyncio.gather(*[
+            asyncio.wrap_future(pool.submit(_simulate_chunk, *task)) for task in tasks
+        ])
+
+    return _summarize(results, paths, horizon, starting_equity, drawdown_limit)
@@ -0,0 +1,166 @@
+# Analysis snapshot storage: dedup, compression and retention
+import os
+import json
+import zlib
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models.analysis_result import AnalysisResult
+from app.utils.write_behind import write_buffer
+
+# Payloads whose JSON is larger than this are stored zlib-compressed
+COMPRESS_MIN_BYTES = int(os.getenv("ANALYSIS_COMPRESS_MIN_BYTES", "4096"))
+
+# Per analysis_type retention; max_age_days / max_rows apply per user
+DEFAULT_RETENTION = {"max_age_days": 90, "max_rows": 100}
+RETENTION_POLICIES = {
+    "performance_overview": {"max_age_days": 90, "max_rows": 100},
+    "pattern_analysis": {"max_age_days": 30, "max_rows": 50},
+    "recommendations": {"max_age_days": 90, "max_rows": 50},
+}
+
+COMPRESSED_MARKER = "_compressed"
+
+_last_hashes = OrderedDict()
+_last_hashes_lock = threading.Lock()
+_LAST_HASHES_MAX = 10000
+
+
+def retention_policy(analysis_type: str) -> dict:
+    return RETENTION_POLICIES.get(analysis_type, DEFAULT_RETENTION)
+
+
+def encode_result(data: dict):
+    """
+    Return (stored_value, content_hash) for an analysis payload.
+    """
+    serialized = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    content_hash = hashlib.sha256(serialized.encode()).hexdigest()
+
+    if len(serialized) < COMPRESS_MIN_BYTES:
+        # The JSON form, so datetimes are stored as the strings hashed
+        return json.loads(serialized), content_hash
+
+    packed = base64.b64encode(zlib.compress(serialized.encode(), 6)).decode()
+    return {COMPRESSED_MARKER: "zlib", "data": packed}, content_hash
+
+
+def decode_result(stored: dict) -> dict:
+    if isinstance(stored, dict) and stored.get(COMPRESSED_MARKER) == "zlib":
+        return json.loads(zlib.decompress(base64.b64decode(stored["data"])))
+    return stored
+
+
+def _previous_hash(db: Session, user_id: int, analysis_type: str):
+    key = (user_id, analysis_type)
+    with _last_hashes_lock:
+        if key in _last_hashes:
+            _last_hashes.move_to_end(key)
+            return _last_hashes[key]
+
+    # Served by ix_analysis_results_user_type_created
+    return db.query(AnalysisResult.content_hash).filter(
+        AnalysisResult.user_id == user_id,
+        AnalysisResult.analysis_type == analysis_type
+    ).order_by(AnalysisResult.created_at.desc()).limit(1).scalar()
+
+
+def remember_hash(user_id: int, analysis_type: str, content_hash: str):
+    with _last_hashes_lock:
+        _last_hashes[(user_id, analysis_type)] = content_hash
+        _last_hashes.move_to_end((user_id, analysis_type))
+        while len(_last_hashes) > _LAST_HASHES_MAX:
+            _last_hashes.popitem(last=False)
+
+
+def forget_hash(user_id: int, analysis_type: str, content_hash: str):
+    # Only if no newer snapshot was remembered since
+    with _last_hashes_lock:
+        if _last_hashes.get((user_id, analysis_type)) == content_hash:
+            del _last_hashes[(user_id, analysis_type)]
+
+
+def queue_snapshot(db: Session, user_id: int, analysis_type: str, data: dict) -> bool:
+    """
+    Queue an AnalysisResult insert unless it is identical to the user's
+    previous snapshot of the same type. Returns True if queued.
+    """
+    stored, content_hash = encode_result(data)
+
+    if _previous_hash(db, user_id, analysis_type) == content_hash:
+        return False
+
+    # Remembered now so identical snapshots queued before the flush are
+    # skipped too; forgotten again if the flush drops the row
+    remember_hash(user_id, analysis_type, content_hash)
+    write_buffer.add(AnalysisResult, {
+        "user_id": user_id,
+        "analysis_type": analysis_type,
+        "result_data": stored,
+        "content_hash": content_hash,
+        "created_at": datetime.utcnow(),
+    })
+    return True
+
+
+def prune_snapshots(db: Session, user_id: int, analysis_type: str, now=None) -> int:
+    """
+    Apply the retention policy for one user and analysis type
+    (does not commit). Returns the number of rows deleted.
+    """
+    policy = retention_policy(analysis_type)
+    now = now or datetime.utcnow()
+    scope = (
+        AnalysisResult.user_id == user_id,
+        AnalysisResult.analysis_type == analysis_type,
+    )
+
+    deleted = 0
+    if policy.get("max_age_days") is not None:
+        cutoff = now - timedelta(days=policy["max_age_days"])
+        deleted += db.query(AnalysisResult).filter(
+            *scope, AnalysisResult.created_at < cutoff
+        ).delete(synchronize_session=False)
+
+    if policy.get("max_rows") is not None:
+        # created_at of the oldest row we keep; everything older goes
+        oldest_kept = db.query(AnalysisResult.created_at).filter(*scope).order_by(
+            AnalysisResult.created_at.desc()
+        ).offset(policy["max_rows"] - 1).limit(1).scalar()
+
+        if oldest_kept is not None:
+            deleted += db.query(AnalysisResult).filter(
+                *scope, AnalysisResult.created_at < oldest_kept
+            ).delete(synchronize_session=False)
+
+    return deleted
+
+
+def prune_all_snapshots(db: Session) -> int:
+    """
+    Apply the retention policies to every user (does not commit).
+    """
+    pairs = db.query(AnalysisResult.user_id, AnalysisResult.analysis_type).distinct().all()
+    return sum(prune_snapshots(db, user_id, analysis_type) for user_id, analysis_type in pairs)
+
+
+def _prune_after_flush(db: Session, inserts: dict):
+    # Only the (user, type) pairs that just grew can have exceeded max_rows
+    pairs = {(row["user_id"], row["analysis_type"]) for row in inserts.get(AnalysisResult, [])}
+    for user_id, analysis_type in pairs:
+        prune_snapshots(db, user_id, analysis_type)
+
+
+def _forget_dropped(inserts: dict):
+    # The rows never reached the table, so their hashes must not dedup later snapshots
+    for row in inserts.get(AnalysisResult, []):
+        forget_hash(row["user_id"], row["analysis_type"], row["content_hash"])
+
+
+write_buffer.register_flush_hook(_prune_after_flush)
+write_buffer.register_failure_hook(_forget_dropped)
@@ -0,0 +1,362 @@
+# Streaming parsers for broker statements (MT4/MT5 reports, exchange fills)
+import io
+import re
+import csv
+import hashlib
+from collections import deque
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 64 * 1024
+
+_NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+
+
+def parse_number(value):
+    """
+    Decimal from a statement cell: tolerates thousands separators
+    ("1 234.50", "1,234.50") and unit suffixes ("0.5BTC").
+    """
+    if value is None:
+        return None
+    text = str(value).replace("\xa0", "").replace(" ", "")
+    if "," in text and "." in text:
+        text = text.replace(",", "")
+    match = _NUMBER.search(text.replace(",", "."))
+    if not match:
+        return None
+    try:
+        return Decimal(match.group())
+    except InvalidOperation:
+        return None
+
+
+def _mt_time(value):
+    # MetaTrader prints "2024.01.02 10:00:00"
+    value = (value or "").strip()
+    return value.replace(".", "-", 2).replace(" ", "T", 1) if value else None
+
+
+def _time_key(value: str):
+    # Order fill timestamps: epoch numbers, ISO strings, anything else as text
+    value = value.strip()
+    number = parse_number(value)
+    if number is not None and str(number) == value:
+        return (0, number, "")
+    try:
+        return (1, 0, datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None).isoformat())
+    except ValueError:
+        return (2, 0, value)
+
+
+def _outcome(pnl: Decimal) -> str:
+    return "WIN" if pnl > 0 else "LOSS"
+
+
+class _TableRows(HTMLParser):
+    # Collects the text cells of every completed <tr>
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = deque()
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._cell is not None:
+                self._row.append(" ".join("".join(self._cell).split()))
+                self._cell = None
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def iter_html_rows(stream):
+    """
+    Yield the cells of each table row of an HTML document, feeding the
+    parser CHUNK_SIZE bytes at a time so memory stays constant.
+    """
+    parser = _TableRows()
+    text = io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+    while True:
+        chunk = text.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        while parser.rows:
+            yield parser.rows.popleft()
+    parser.close()
+    while parser.rows:
+        yield parser.rows.popleft()
+
+
+def _mt_columns(cells):
+    """
+    Column positions of an MT4 "Closed Transactions"/"Open Trades" or an
+    MT5 "Positions" header row, or None for any other row. Time and
+    Price appear twice; the second occurrence is the close.
+    """
+    names = [cell.strip().lower() for cell in cells]
+    if not (("ticket" in names and "item" in names) or ("position" in names and "symbol" in names)):
+        return None
+
+    columns = {"width": len(names)}
+    for position, name in enumerate(names):
+        if name in ("ticket", "position"):
+            columns.setdefault("ticket", position)
+        elif name in ("item", "symbol"):
+            columns.setdefault("symbol", position)
+        elif name in ("size", "volume"):
+            columns.setdefault("size", position)
+        elif name == "type":
+            columns.setdefault("type", position)
+        elif name in ("open time", "time"):
+            columns["close_time" if "open_time" in columns else "open_time"] = position
+        elif name == "close time":
+            columns["close_time"] = position
+        elif name == "price":
+            columns["close_price" if "open_price" in columns else "open_price"] = position
+        elif name == "s / l":
+            columns["stop_loss"] = position
+        elif name == "t / p":
+            columns["take_profit"] = position
+        elif name in ("commission", "taxes", "swap", "profit"):
+            columns[name] = position
+    return columns
+
+
+def read_mt_statement(stream):
+    """
+    Yield (row_number, record, error) for the positions of a MetaTrader
+    4 or 5 HTML statement. Balance, credit and pending-order rows are
+    skipped. Closed positions carry the broker's net P&L (profit plus
+    commission, taxes and swap) in "pnl".
+    """
+    columns = None
+    for row_number, cells in enumerate(iter_html_rows(stream), start=1):
+        header = _mt_columns(cells)
+        if header is not None:
+            columns = header
+            continue
+
+        # Section titles and summary rows end the current table
+        if columns is None or len(cells) != columns["width"]:
+            if len(cells) <= 2:
+                columns = None
+            continue
+
+        kind = cells[columns["type"]].strip().lower()
+        if kind not in ("buy", "sell"):
+            continue
+
+        def cell(name):
+            position = columns.get(name)
+            value = cells[position].strip() if position is not None else ""
+            return value or None
+
+        record = {
+            "external_id": f"mt:{cell('ticket')}",
+            "currency_pair": (cell("symbol") or "").upper(),
+            "direction": "LONG" if kind == "buy" else "SHORT",
+            "position_size": cell("size"),
+            "entry_price": cell("open_price"),
+            "stop_loss": cell("stop_loss"),
+            "take_profit": cell("take_profit"),
+            "date_open": _mt_time(cell("open_time")),
+        }
+
+        # Unset stop/target levels are printed as 0
+        for level in ("stop_loss", "take_profit"):
+            if parse_number(record[level]) in (None, 0):
+                record[level] = None
+
+        close_time = _mt_time(cell("close_time"))
+        if close_time and cell("close_price"):
+            pnl = sum(
+                (parse_number(cell(name)) or Decimal(0) for name in ("commission", "taxes", "swap", "profit")),
+                Decimal(0)
+            )
+            record.update({
+                "date_closed": close_time,
+                "exit_price": cell("close_price"),
+                "win_loss": _outcome(pnl),
+                "pnl": pnl,
+            })
+
+        yield row_number, record, None
+
+
+FILL_COLUMNS = {
+    "time": ("date(utc)", "date", "time", "timestamp", "created_at"),
+    "symbol": ("pair", "symbol", "market", "instrument"),
+    "side": ("side", "type"),
+    "price": ("price", "avg price", "fill price"),
+    "quantity": ("executed", "quantity", "qty", "amount", "size", "filled"),
+    "fill_id": ("trade id", "tradeid", "trade_id", "id", "fill id", "exec id"),
+}
+
+
+def _fill_columns(header):
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, candidates in FILL_COLUMNS.items():
+        for candidate in candidates:
+            if candidate in names:
+                columns[field] = names.index(candidate)
+                break
+    missing = {"time", "symbol", "side", "price", "quantity"} - set(columns)
+    return columns, missing
+
+
+def _read_lines_reversed(stream, block_size: int = CHUNK_SIZE):
+    # Lines of a seekable binary stream from last to first, one block in memory
+    stream.seek(0, io.SEEK_END)
+    position = stream.tell()
+    remainder = b""
+    while position > 0:
+        read = min(block_size, position)
+        position -= read
+        stream.seek(position)
+        lines = (stream.read(read) + remainder).split(b"\n")
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            yield line
+    yield remainder
+
+
+def _fill_lines(stream):
+    """
+    Yield (row_number, cells) of a fills CSV in chronological order.
+    Exchanges often export newest first; such files are read backwards
+    rather than loaded and sorted.
+    """
+    stream.seek(0)
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    yield 0, header
+
+    first = next(reader, None)
+    if first is None:
+        return
+
+    columns, missing = _fill_columns(header)
+    last_line = b""
+    for line in _read_lines_reversed(stream):
+        if line.strip():
+            last_line = line
+            break
+    last = next(csv.reader([last_line.decode("utf-8-sig").strip("\r")]), [])
+
+    newest_first = (
+        not missing and len(first) == len(header) and len(last) == len(header)
+        and _time_key(first[columns["time"]]) > _time_key(last[columns["time"]])
+    )
+    text.detach()
+
+    if not newest_first:
+        stream.seek(0)
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        for row_number, cells in enumerate(csv.reader(text)):
+            if row_number:
+                yield row_number, cells
+        return
+
+    # Count data rows once so reversed rows keep their file row numbers
+    stream.seek(0)
+    row_count = sum(1 for line in stream if line.strip()) - 1
+    row_number = row_count + 1
+    for line in _read_lines_reversed(stream):
+        line = line.decode("utf-8-sig").strip("\r")
+        if not line.strip():
+            continue
+        row_number -= 1
+        if row_number == 0:
+            break
+        yield row_number, next(csv.reader([line]))
+
+
+def read_fills(stream):
+    """
+    Yield (row_number, record, error) for round-trip trades built from
+    an exchange fills CSV. Fills are matched FIFO per symbol; only the
+    open lots are kept in memory. Each trade's external_id combines the
+    ids (or content hashes) of its opening and closing fill, so
+    re-importing an overlapping export yields the same ids. Positions
+    still open at the end of the file are not imported.
+    """
+    lots = {}
+    columns = None
+
+    for row_number, cells in _fill_lines(stream):
+        if row_number == 0:
+            columns, missing = _fill_columns(cells)
+            if missing:
+                yield 1, None, f"Missing fill columns: {', '.join(sorted(missing))}"
+                return
+            width = len(cells)
+            continue
+
+        if not any(cell.strip() for cell in cells):
+            continue
+        if len(cells) != width:
+            yield row_number, None, f"Expected {width} columns, got {len(cells)}"
+            continue
+
+        side = cells[columns["side"]].strip().upper()
+        price = parse_number(cells[columns["price"]])
+        quantity = parse_number(cells[columns["quantity"]])
+        if side not in ("BUY", "SELL") or not price or not quantity:
+            yield row_number, None, "Fill needs a BUY/SELL side, a price and a quantity"
+            continue
+
+        if "fill_id" in columns and cells[columns["fill_id"]].strip():
+            fill_key = cells[columns["fill_id"]].strip()[:48]
+        else:
+            fill_key = hashlib.sha256(",".join(cells).encode()).hexdigest()[:16]
+
+        symbol = cells[columns["symbol"]].strip().upper().replace("/", "").replace("-", "")
+        time = cells[columns["time"]].strip()
+        sign = 1 if side == "BUY" else -1
+        queue = lots.setdefault(symbol, deque())
+
+        # Close opposite lots first, oldest first
+        while quantity > 0 and queue and queue[0]["sign"] == -sign:
+            lot = queue[0]
+            matched = min(quantity, lot["quantity"])
+            pnl = (price - lot["price"]) * matched * lot["sign"]
+
+            yield row_number, {
+                "external_id": f"fill:{lot['key']}:{fill_key}",
+                "currency_pair": symbol,
+                "direction": "LONG" if lot["sign"] == 1 else "SHORT",
+                "position_size": str(matched),
+                "entry_price": str(lot["price"]),
+                "date_open": lot["time"],
+                "date_closed": time,
+                "exit_price": str(price),
+                "win_loss": _outcome(pnl),
+            }, None
+
+            lot["quantity"] -= matched
+            quantity -= matched
+            if lot["quantity"] == 0:
+                queue.popleft()
+
+        if quantity > 0:
+            queue.append({"sign": sign, "quantity": quantity, "price": price, "time": time, "key": fill_key})
@@ -0,0 +1,57 @@
+# Trade calculations shared by the trade routes and importers
+from decimal import Decimal
+
+
+def calculate_risk_reward(direction, entry_price, stop_loss, take_profit):
+    if not stop_loss or not take_profit:
+        return None
+    
+    if direction == "LONG":
+        risk = entry_price - stop_loss
+        reward = take_profit - entry_price
+    else:  # SHORT
+        risk = stop_loss - entry_price
+        reward = entry_price - take_profit
+    
+    if risk <= 0:
+        return None
+    
+    return round(reward / risk, 2)
+
+
+def calculate_pnl(direction, position_size, entry_price, exit_price) -> dict:
+    """
+    Profit or loss of closing a position at exit_price. Exactly one of
+    the amount/percentage pairs is set, the other is None.
+    """
+    position_size = Decimal(position_size)
+    entry_price = Decimal(entry_price)
+    exit_price = Decimal(exit_price)
+    
+    pnl = {
+        "profit_amount": None,
+        "loss_amount": None,
+        "profit_percentage": None,
+        "loss_percentage": None,
+    }
+    
+    if direction == "LONG":
+        if exit_price > entry_price:  # Profit
+            pnl["profit_amount"] = position_size * (exit_price - entry_price)
+            pnl["profit_percentage"] = (exit_price / entry_price - 1) * 100
+        else:  # Loss
+            pnl["loss_amount"] = position_size * (entry_price - exit_price)
+            pnl["loss_percentage"] = (1 - exit_price / entry_price) * 100
+    else:  # SHORT
+        if exit_price < entry_price:  # Profit
+            pnl["profit_amount"] = position_size * (entry_price - exit_price)
+            pnl["profit_percentage"] = (1 - exit_price / entry_price) * 100
+        else:  # Loss
+            pnl["loss_amount"] = position_size * (exit_price - entry_price)
+            pnl["loss_percentage"] = (exit_price / entry_price - 1) * 100
+    
+    return pnl
+
+
+def net_pnl(pnl: dict) -> Decimal:
+    return (pnl["profit_amount"] or Decimal(0)) - (pnl["loss_amount"] or Decimal(0))
@@ -0,0 +1,94 @@
+# Closing trades and committing trade changes, shared by the trade
+# routes and the stop-loss / take-profit triggers
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models.trade import Trade
+from app.models.account import Account
+from app.schemas.trade import TradeClose
+from app.utils import account_stats
+from app.utils.data_version import bump_data_version
+from app.utils.ledger import post_entries, comparable_time
+from app.utils.balances import recompute_balance_after
+from app.utils.trade_calc import calculate_pnl, net_pnl
+
+
+class TradeConflict(Exception):
+    def __init__(self):
+        super().__init__("Trade was modified by another request; reload it and try again")
+
+
+def commit_trades(db: Session, rebalance=()):
+    """
+    Commit trade changes. `rebalance` lists (account, since) pairs whose
+    balance_after values from `since` on are rewritten first. A trade
+    changed by another request since it was loaded fails the version
+    check; nothing is written and TradeConflict is raised, so the
+    caller can reload and retry.
+    """
+    try:
+        for account, since in rebalance:
+            recompute_balance_after(db, account, since)
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise TradeConflict()
+
+
+def apply_trade_close(trade: Trade, trade_close: TradeClose):
+    """
+    Set the closing fields and profit/loss of a trade. Returns its net
+    P&L; the caller posts it to the account balance.
+    """
+    # Update trade with closing data; stored as naive UTC like the ledger
+    trade.date_closed = comparable_time(trade_close.date_closed)
+    trade.exit_price = trade_close.exit_price
+    trade.win_loss = trade_close.win_loss.value
+
+    # Calculate profit/loss
+    pnl = calculate_pnl(trade.direction, trade.position_size, trade.entry_price, trade_close.exit_price)
+
+    trade.profit_amount = pnl["profit_amount"]
+    trade.loss_amount = pnl["loss_amount"]
+    trade.profit_percentage = pnl["profit_percentage"]
+    trade.loss_percentage = pnl["loss_percentage"]
+    return net_pnl(pnl)
+
+
+def close_trades(db: Session, user_id: int, trades: dict, items):
+    """
+    Close open `trades` (id -> Trade, all the user's) with TradeClose
+    `items` carrying a trade_id, and commit: running stats, one atomic
+    balance update per account, the balance_after of later trades and
+    the data versions. Used by the batch route and the stop-loss /
+    take-profit triggers. Raises TradeConflict as commit_trades does.
+    """
+    # Load every affected account once
+    account_ids = {trade.account_id for trade in trades.values()}
+    accounts = {account.id: account for account in db.query(Account).filter(Account.id.in_(account_ids)).all()}
+
+    # Apply closes in chronological order so each balance_after is correct
+    closed_by_account = {account_id: [] for account_id in accounts}
+    for item in sorted(items, key=lambda item: (comparable_time(item.date_closed), item.trade_id)):
+        trade = trades[item.trade_id]
+        account_stats.remove_trade(db, trade)
+        net = apply_trade_close(trade, item)
+        account_stats.add_trade(db, trade)
+        closed_by_account[trade.account_id].append((trade, net))
+
+    # One atomic balance update per account
+    for account_id, closed_trades in closed_by_account.items():
+        balances = post_entries(db, accounts[account_id], [
+            (net, trade.date_closed, "TRADE", trade.id) for trade, net in closed_trades
+        ])
+        for (trade, _), balance in zip(closed_trades, balances):
+            trade.balance_after = balance
+
+    # Backdated closes shift the balance_after of later trades
+    rebalance = [
+        (accounts[account_id], closed_trades[0][0].date_closed)
+        for account_id, closed_trades in closed_by_account.items() if closed_trades
+    ]
+
+    bump_data_version(db, user_id, *accounts)
+    commit_trades(db, rebalance)
@@ -0,0 +1,279 @@
+# Streaming bulk import of trades from CSV / NDJSON uploads
+import io
+import os
+import csv
+import json
+import hashlib
+from decimal import Decimal
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.trade import Trade
+from app.models.account import Account
+from app.schemas.trade import TradeCreate, TradeClose
+from app.utils import account_stats
+from app.utils.balances import recompute_balance, recompute_balance_after
+from app.utils.ledger import post_closed_trades, comparable_time
+from app.utils.data_version import bump_data_version
+from app.utils.trade_calc import calculate_risk_reward, calculate_pnl
+from app.utils.statements import read_mt_statement, read_fills
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+# Only this many row errors are returned; the counts cover every row
+MAX_REPORTED_ERRORS = 1000
+
+CLOSE_FIELDS = ("date_closed", "exit_price", "win_loss")
+
+
+def read_csv(stream):
+    """
+    Yield (row_number, record, error) for each data row of a binary CSV
+    stream. The stream is decoded and parsed incrementally.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    for row_number, record in enumerate(csv.DictReader(text), start=1):
+        yield row_number, record, None
+
+
+def read_ndjson(stream):
+    """
+    Yield (row_number, record, error) for each non-empty line of a
+    binary NDJSON stream.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+# Parsers by import format; each yields (row_number, record, error)
+READERS = {
+    "csv": read_csv,
+    "ndjson": read_ndjson,
+    "mt4": read_mt_statement,
+    "mt5": read_mt_statement,
+    "fills": read_fills,
+}
+
+# Columns that identify a trade when the source has no id of its own
+HASH_FIELDS = ("currency_pair", "direction", "position_size", "entry_price", "date_open", "date_closed", "exit_price")
+
+
+def _clean(record: dict) -> dict:
+    # CSV has no nulls; treat empty cells as missing
+    return {
+        key.strip(): value.strip() if isinstance(value, str) else value
+        for key, value in record.items()
+        if key is not None and value not in ("", None)
+    }
+
+
+def validation_messages(error: ValidationError):
+    return [
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    ]
+
+
+def content_hash(values: dict) -> str:
+    def normalize(value):
+        if isinstance(value, Decimal):
+            return format(value.normalize(), "f")
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return "" if value is None else str(value)
+
+    key = "|".join(normalize(values[field]) for field in HASH_FIELDS)
+    return "sha256:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def trade_values(account_id: int, record: dict) -> dict:
+    """
+    Validate one record with TradeCreate (plus TradeClose if any closing
+    field is given) and return the column values of the new trade, with
+    risk/reward and P&L filled in. A broker P&L in "pnl" takes precedence
+    over the price-based one. external_id is the record's own id or a
+    hash of its content. Raises ValidationError.
+    """
+    record = _clean(record)
+    trade = TradeCreate(**record)
+
+    values = {
+        "account_id": account_id,
+        "date_open": trade.date_open,
+        "date_closed": None,
+        "currency_pair": trade.currency_pair,
+        "position_size": trade.position_size,
+        "direction": trade.direction.value,
+        "entry_price": trade.entry_price,
+        "stop_loss": trade.stop_loss,
+        "take_profit": trade.take_profit,
+        "exit_price": None,
+        "risk_reward": calculate_risk_reward(
+            trade.direction.value, trade.entry_price, trade.stop_loss, trade.take_profit
+        ),
+        "win_loss": "OPEN",
+        "profit_amount": None,
+        "loss_amount": None,
+        "profit_percentage": None,
+        "loss_percentage": None,
+    }
+
+    if any(field in record for field in CLOSE_FIELDS) and record.get("win_loss") != "OPEN":
+        close = TradeClose(**{field: record[field] for field in CLOSE_FIELDS if field in record})
+        values.update({
+            "date_closed": close.date_closed,
+            "exit_price": close.exit_price,
+            "win_loss": close.win_loss.value,
+        })
+        values.update(calculate_pnl(trade.direction.value, trade.position_size, trade.entry_price, close.exit_price))
+
+        if record.get("pnl") is not None:
+            pnl = Decimal(record["pnl"])
+            profit = pnl > 0
+            values.update({
+                "profit_amount": pnl if profit else None,
+                "loss_amount": None if profit else -pnl,
+                "profit_percentage": values["profit_percentage"] if profit else None,
+                "loss_percentage": None if profit else values["loss_percentage"],
+            })
+
+    external_id = str(record.get("external_id") or "")[:128]
+    values["external_id"] = external_id or content_hash(values)
+
+    return values
+
+
+def _add_error(report: dict, row_number: int, errors):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row_number, "errors": errors})
+    else:
+        report["errors_truncated"] = True
+
+
+def _write_batch(db: Session, account_id: int, report: dict, batch, row_numbers):
+    """
+    Write one batch in its own transaction. Rows whose external_id the
+    account already has are skipped, except that a closed row closes a
+    trade imported while still open. Returns the earliest close date
+    written, or None.
+    """
+    earliest = None
+    try:
+        # One lookup on ix_trades_account_external_id for the whole batch
+        existing = {
+            external_id: (trade_id, win_loss, version)
+            for external_id, trade_id, win_loss, version in db.query(
+                Trade.external_id, Trade.id, Trade.win_loss, Trade.version
+            ).filter(
+                Trade.account_id == account_id,
+                Trade.external_id.in_({values["external_id"] for values in batch})
+            )
+        }
+
+        inserts, updates, seen, closed = [], [], set(), []
+        for values in batch:
+            external_id = values["external_id"]
+            if external_id in seen:
+                report["duplicates"] += 1
+                continue
+            seen.add(external_id)
+
+            if external_id not in existing:
+                inserts.append(values)
+                if values["win_loss"] != "OPEN":
+                    closed.append(external_id)
+            elif existing[external_id][1] == "OPEN" and values["win_loss"] != "OPEN":
+                closed.append(external_id)
+                # The version makes the UPDATE skip a trade changed since the lookup
+                updates.append({"id": existing[external_id][0], "version": existing[external_id][2], **{
+                    key: value for key, value in values.items() if key not in ("account_id", "external_id")
+                }})
+            else:
+                report["duplicates"] += 1
+
+        # One multi-row INSERT per batch
+        if inserts:
+            db.execute(insert(Trade), inserts)
+        if updates:
+            db.execute(update(Trade), updates)
+        if closed:
+            earliest = post_closed_trades(db, account_id, closed)
+        db.commit()
+        report["imported"] += len(inserts)
+        report["updated"] += len(updates)
+    except SQLAlchemyError as e:
+        db.rollback()
+        for row_number in row_numbers:
+            _add_error(report, row_number, [f"Database error: {str(e.orig if hasattr(e, 'orig') else e)}"])
+        return None
+    return earliest
+
+
+def import_trades(db: Session, account: Account, records, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Insert the trades from `records` ((row_number, record, error) tuples
+    from a reader) into `account` in batches of `batch_size`. Invalid
+    rows are skipped and reported, and rows already imported are
+    counted as duplicates. The account balance, stats and the
+    balance_after of trades closed from the earliest import on are
+    recomputed once after the last batch.
+    """
+    account_id = account.id
+    user_id = account.user_id
+    report = {"total_rows": 0, "imported": 0, "updated": 0, "duplicates": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    batch, row_numbers = [], []
+    batch_closes = []
+
+    for row_number, record, error in records:
+        report["total_rows"] += 1
+
+        if error is not None:
+            _add_error(report, row_number, [error])
+            continue
+
+        try:
+            values = trade_values(account_id, record)
+        except ValidationError as e:
+            _add_error(report, row_number, validation_messages(e))
+            continue
+
+        batch.append(values)
+        row_numbers.append(row_number)
+
+        if len(batch) >= batch_size:
+            batch_closes.append(_write_batch(db, account_id, report, batch, row_numbers))
+            batch, row_numbers = [], []
+
+    if batch:
+        batch_closes.append(_write_batch(db, account_id, report, batch, row_numbers))
+
+    if report["imported"] or report["updated"]:
+        account = db.get(Account, account_id)
+        recompute_balance(db, account)
+
+        # balance_after from the earliest imported close on
+        closes = [date for date in batch_closes if date is not None]
+        if closes:
+            recompute_balance_after(db, account, min(closes, key=comparable_time))
+        account_stats.rebuild_account_stats(db, account_id)
+        bump_data_version(db, user_id, account_id)
+        db.commit()
+
+    return report
@@ -0,0 +1,233 @@
+# Stop-loss / take-profit triggers: the levels of open trades kept per
+# instrument in sorted arrays, so a tick batch finds the crossed ones
+# with a binary search instead of a scan of every open trade
+import os
+import math
+import logging
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+
+from app.models.trade import Trade
+from app.models.account import Account
+from app.schemas.trade import TradeCloseBatchItem, WinLoss
+from app.utils.trade_close import TradeConflict, close_trades
+from app.utils.trade_calc import calculate_pnl, net_pnl
+
+logger = logging.getLogger(__name__)
+
+# "notify" only reports fired levels; "close" also closes the trade at the tick price
+TRIGGER_ACTION = os.getenv("TRIGGER_ACTION", "notify").lower()
+
+STOP_LOSS = 0
+TAKE_PROFIT = 1
+TRIGGER_NAMES = ("STOP_LOSS", "TAKE_PROFIT")
+
+
+class _Side:
+    # Levels of one side of an instrument in ascending price order
+    __slots__ = ("prices", "trade_ids", "kinds")
+
+    def __init__(self, levels):
+        levels.sort()
+        self.prices = np.array([level[0] for level in levels], dtype=float)
+        self.trade_ids = np.array([level[1] for level in levels], dtype=np.int64)
+        self.kinds = np.array([level[2] for level in levels], dtype=np.int8)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def cut(self, start, end):
+        self.prices = self.prices[start:end]
+        self.trade_ids = self.trade_ids[start:end]
+        self.kinds = self.kinds[start:end]
+
+
+class TriggerIndex:
+    """
+    Stop-loss and take-profit levels of open trades, per instrument in
+    two sorted arrays: levels that fire once the price falls to them
+    (long stops, short targets) and levels that fire once it rises to
+    them (long targets, short stops). The levels a batch crosses are a
+    suffix of the first array and a prefix of the second, found by
+    binary search and cut off, so a batch costs O(log n + k) per
+    instrument for k fired levels.
+
+    A trade fires once, on whichever level the batch crossed first; it
+    is not indexed again until its levels change. Callers serialize
+    access.
+    """
+
+    def __init__(self):
+        self.below = {}
+        self.above = {}
+        self.fired = 0
+
+        self._trades = {}
+        self._account_trades = {}
+        self._instrument_trades = {}
+        self._fired = {}
+
+    def __len__(self):
+        return sum(len(side) for side in self.below.values()) + sum(len(side) for side in self.above.values())
+
+    def replace(self, account_ids, rows):
+        """
+        Replace the trades of `account_ids` by `rows` of (trade id,
+        account id, instrument, direction, size, entry price, stop loss,
+        take profit), and rebuild the arrays of the instruments touched.
+        """
+        dirty = set()
+        replaced = set()
+        for account_id in account_ids:
+            for trade_id in self._account_trades.pop(account_id, ()):
+                instrument = self._trades.pop(trade_id)[1]
+                self._instrument_trades[instrument].discard(trade_id)
+                replaced.add(trade_id)
+                dirty.add(instrument)
+
+        for trade_id, account_id, instrument, direction, _, _, stop_loss, take_profit in rows:
+            if stop_loss is None and take_profit is None:
+                continue
+            instrument = instrument.upper()
+            self._trades[trade_id] = (account_id, instrument, direction, stop_loss, take_profit)
+            self._account_trades.setdefault(account_id, []).append(trade_id)
+            self._instrument_trades.setdefault(instrument, set()).add(trade_id)
+            dirty.add(instrument)
+
+        # Forget fired trades that were closed or had their levels moved
+        for trade_id in replaced & self._fired.keys():
+            trade = self._trades.get(trade_id)
+            if trade is None or trade[3:] != self._fired[trade_id]:
+                del self._fired[trade_id]
+
+        for instrument in dirty:
+            self._rebuild(instrument)
+
+    def _rebuild(self, instrument):
+        below = []
+        above = []
+        for trade_id in self._instrument_trades.get(instrument, ()):
+            if trade_id in self._fired:
+                continue
+            _, _, direction, stop_loss, take_profit = self._trades[trade_id]
+            falls_to, rises_to = (stop_loss, take_profit) if direction == "LONG" else (take_profit, stop_loss)
+            falls_kind, rises_kind = (STOP_LOSS, TAKE_PROFIT) if direction == "LONG" else (TAKE_PROFIT, STOP_LOSS)
+            if falls_to is not None:
+                below.append((falls_to, trade_id, falls_kind))
+            if rises_to is not None:
+                above.append((rises_to, trade_id, rises_kind))
+
+        if below or above:
+            self.below[instrument] = _Side(below)
+            self.above[instrument] = _Side(above)
+        else:
+            self.below.pop(instrument, None)
+            self.above.pop(instrument, None)
+            if not self._instrument_trades.get(instrument):
+                self._instrument_trades.pop(instrument, None)
+
+    def check(self, ticks, as_of: datetime = None):
+        """
+        Fire the levels crossed by a batch of (instrument, price) ticks,
+        in tick order. Returns one event per fired trade, priced at the
+        first tick that reached its level.
+        """
+        paths = {}
+        for instrument, price in ticks:
+            if instrument in self.below:
+                path = paths.get(instrument)
+                if path is None:
+                    paths[instrument] = [price]
+                else:
+                    path.append(price)
+
+        events = []
+        for instrument, path in paths.items():
+            below = self.below[instrument]
+            above = self.above[instrument]
+            start = int(below.prices.searchsorted(min(path), "left"))
+            end = int(above.prices.searchsorted(max(path), "right"))
+            if start == len(below) and end == 0:
+                continue
+
+            # Index of the first tick at or past each crossed level
+            path = np.array(path)
+            crossed = []
+            if start < len(below):
+                lowest = np.minimum.accumulate(path)
+                first = np.searchsorted(-lowest, -below.prices[start:], "left")
+                crossed.extend(zip(first.tolist(), below.kinds[start:].tolist(), below.trade_ids[start:].tolist(), below.prices[start:].tolist()))
+            if end:
+                highest = np.maximum.accumulate(path)
+                first = np.searchsorted(highest, above.prices[:end], "left")
+                crossed.extend(zip(first.tolist(), above.kinds[:end].tolist(), above.trade_ids[:end].tolist(), above.prices[:end].tolist()))
+            below.cut(0, start)
+            above.cut(end, None)
+
+            # The trade's other level may be crossed later in the same batch
+            crossed.sort()
+            for index, kind, trade_id, level in crossed:
+                if trade_id in self._fired:
+                    continue
+                account_id, _, direction, stop_loss, take_profit = self._trades[trade_id]
+                self._fired[trade_id] = (stop_loss, take_profit)
+                events.append({
+                    "trade_id": trade_id,
+                    "account_id": account_id,
+                    "instrument": instrument,
+                    "direction": direction,
+                    "trigger": TRIGGER_NAMES[kind],
+                    "level": level,
+                    "price": float(path[index]),
+                    "at": as_of.isoformat() if as_of else None,
+                })
+
+        self.fired += len(events)
+        return events
+
+
+def close_triggered(db, events):
+    """
+    Close the trades of fired triggers at the tick price through the
+    batch close logic, one commit per user. Trades closed, or with the
+    level moved, since the trigger fired are left alone. Returns the ids
+    of the trades closed.
+    """
+    fired = {event["trade_id"]: event for event in events}
+    rows = db.query(Trade, Account.user_id).join(Account).filter(
+        Trade.id.in_(list(fired)),
+        Trade.win_loss == "OPEN"
+    ).all()
+
+    by_user = {}
+    for trade, user_id in rows:
+        event = fired[trade.id]
+        level = trade.stop_loss if event["trigger"] == "STOP_LOSS" else trade.take_profit
+        if level is None or not math.isclose(float(level), event["level"]):
+            continue
+        by_user.setdefault(user_id, {})[trade.id] = trade
+
+    closed = []
+    for user_id, trades in by_user.items():
+        items = []
+        for trade_id, trade in trades.items():
+            # Stops fill at the market, so a gap past the level is not hidden
+            exit_price = Decimal(repr(fired[trade_id]["price"]))
+            net = net_pnl(calculate_pnl(trade.direction, trade.position_size, trade.entry_price, exit_price))
+            items.append(TradeCloseBatchItem(
+                trade_id=trade_id,
+                date_closed=datetime.fromisoformat(fired[trade_id]["at"]) if fired[trade_id]["at"] else datetime.utcnow(),
+                exit_price=exit_price,
+                win_loss=WinLoss.WIN if net > 0 else WinLoss.LOSS
+            ))
+
+        try:
+            close_trades(db, user_id, trades, items)
+            closed.extend(trades)
+        except TradeConflict as e:
+            # Changed by a request meanwhile; the next refresh reindexes it
+            logger.warning(f"Triggered close of trades {sorted(trades)} skipped: {e}")
+
+    return closed
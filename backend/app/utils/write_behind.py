@@ -0,0 +1,173 @@
+# Write-behind buffer for low-value writes issued on read paths
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import insert, update
+
+from app.db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Queues inserts and primary-key updates in memory and writes them in
+    one transaction once `max_size` writes are pending or every
+    `interval` seconds, whichever comes first. Updates to the same row
+    are coalesced, so only the latest values are written.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_size: int = 500, interval: float = 2.0):
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.interval = interval
+
+        self._inserts = []
+        self._updates = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._flush_hooks = []
+        self._failure_hooks = []
+
+        self.flush_count = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def add(self, model, values: dict):
+        """Queue an INSERT of `values` into `model`'s table."""
+        with self._lock:
+            self._inserts.append((model, values))
+            depth = len(self._inserts) + len(self._updates)
+        self._notify(depth)
+
+    def update(self, model, pk, values: dict):
+        """Queue an UPDATE of the row with primary key `pk`."""
+        with self._lock:
+            key = (model, pk)
+            pending = self._updates.pop(key, {})
+            pending.update(values)
+            self._updates[key] = pending
+            depth = len(self._inserts) + len(self._updates)
+        self._notify(depth)
+
+    def register_flush_hook(self, hook):
+        """
+        Run `hook(db, inserts)` inside every flush transaction, after the
+        queued writes. `inserts` maps model -> list of inserted values.
+        """
+        self._flush_hooks.append(hook)
+
+    def register_failure_hook(self, hook):
+        """
+        Run `hook(inserts)` after a flush failed and its writes were
+        dropped, e.g. to forget state recorded when they were queued.
+        """
+        self._failure_hooks.append(hook)
+
+    def _notify(self, depth):
+        if depth >= self.max_size:
+            self._wakeup.set()
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._inserts) + len(self._updates)
+
+    def flush(self) -> int:
+        """Write everything queued so far in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                inserts, self._inserts = self._inserts, []
+                updates, self._updates = self._updates, OrderedDict()
+
+            if not inserts and not updates:
+                return 0
+
+            # Group by table so each becomes one executemany statement
+            insert_batches = OrderedDict()
+            for model, values in inserts:
+                insert_batches.setdefault(model, []).append(values)
+
+            update_batches = OrderedDict()
+            for (model, pk), values in updates.items():
+                pk_name = model.__mapper__.primary_key[0].key
+                update_batches.setdefault(model, []).append({pk_name: pk, **values})
+
+            started = time.perf_counter()
+            db = self.session_factory()
+            try:
+                for model, rows in insert_batches.items():
+                    db.execute(insert(model), rows)
+                for model, rows in update_batches.items():
+                    db.execute(update(model), rows)
+                for hook in self._flush_hooks:
+                    hook(db, insert_batches)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.failed_flushes += 1
+                logger.error(f"Write-behind flush failed, dropping {len(inserts) + len(updates)} write(s): {str(e)}")
+                for hook in self._failure_hooks:
+                    try:
+                        hook(insert_batches)
+                    except Exception as hook_error:
+                        logger.error(f"Write-behind failure hook failed: {str(hook_error)}")
+                return 0
+            finally:
+                db.close()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            written = len(inserts) + len(updates)
+            self.flush_count += 1
+            self.rows_written += written
+            self.last_flush_ms = elapsed_ms
+            self.total_flush_ms += elapsed_ms
+
+            return written
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and write whatever is still queued."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        return {
+            "queue_depth": self.depth(),
+            "max_size": self.max_size,
+            "interval": self.interval,
+            "flush_count": self.flush_count,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": self.total_flush_ms / self.flush_count if self.flush_count else 0,
+        }
+
+
+write_buffer = WriteBehindBuffer(
+    max_size=int(os.getenv("WRITE_BEHIND_MAX_SIZE", "500")),
+    interval=float(os.getenv("WRITE_BEHIND_INTERVAL", "2.0")),
+)
@@ -0,0 +1,99 @@
+import sys
+import os
+import time
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Run against a throwaway SQLite database in a temporary directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.chdir(tempfile.mkdtemp(prefix="bench_close_batch_"))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.init_db import create_tables
+from app.models.user import User
+from app.models.trade import Trade
+from app.models.account import Account
+from app.auth.jwt import create_access_token
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def setup_client():
+    """Create the schema, a user and an account; return (client, account_id)"""
+    create_tables()
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    account = Account(user_id=user.id, name="bench", initial_balance=10000, current_balance=10000, currency="USD")
+    db.add(account)
+    db.commit()
+    
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': str(user.id)})}"
+    account_id = account.id
+    db.close()
+    return client, account_id
+
+def open_trades(account_id, count):
+    """Insert `count` open trades directly and return their ids"""
+    start = datetime(2024, 1, 1)
+    db = SessionLocal()
+    rows = [
+        {
+            "account_id": account_id,
+            "date_open": start + timedelta(minutes=i),
+            "currency_pair": "EURUSD",
+            "position_size": Decimal("1000"),
+            "direction": "LONG",
+            "entry_price": Decimal("1.1"),
+            "win_loss": "OPEN",
+        }
+        for i in range(count)
+    ]
+    db.execute(insert(Trade), rows)
+    db.commit()
+    ids = [trade_id for (trade_id,) in db.query(Trade.id).filter(Trade.win_loss == "OPEN").order_by(Trade.id).all()]
+    db.close()
+    return ids[-count:]
+
+def close_payload(trade_id, i):
+    return {
+        "date_closed": (datetime(2024, 2, 1) + timedelta(minutes=i)).isoformat(),
+        "exit_price": "1.2" if i % 2 else "1.05",
+        "win_loss": "WIN" if i % 2 else "LOSS",
+    }
+
+def bench(client, account_id, count):
+    ids = open_trades(account_id, count)
+    started = time.perf_counter()
+    for i, trade_id in enumerate(ids):
+        response = client.patch(f"/api/trades/trades/{trade_id}/close", json=close_payload(trade_id, i))
+        assert response.status_code == 200, response.text
+    sequential = time.perf_counter() - started
+    
+    ids = open_trades(account_id, count)
+    started = time.perf_counter()
+    response = client.patch("/api/trades/trades/close-batch", json={
+        "trades": [{"trade_id": trade_id, **close_payload(trade_id, i)} for i, trade_id in enumerate(ids)]
+    })
+    assert response.status_code == 200, response.text
+    batched = time.perf_counter() - started
+    
+    logger.info(
+        f"{count:>5} closes: sequential {sequential * 1000:.0f} ms ({count / sequential:.0f} trades/s), "
+        f"batch {batched * 1000:.0f} ms ({count / batched:.0f} trades/s), {sequential / batched:.1f}x"
+    )
+
+if __name__ == "__main__":
+    client, account_id = setup_client()
+    for count in (40, 200, 1000):
+        bench(client, account_id, count)
@@ -0,0 +1,137 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+# Run against a throwaway SQLite database in a temporary directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.chdir(tempfile.mkdtemp(prefix="bench_list_serialization_"))
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+from fastapi.utils import create_response_field
+from sqlalchemy import insert
+
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.init_db import create_tables
+from app.models.user import User
+from app.models.trade import Trade
+from app.models.account import Account
+from app.schemas.trade import TradeResponse
+from app.auth.jwt import create_access_token
+from app.utils.serialization import list_columns, list_response
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+TRADES = 10000
+ROUNDS = 5
+SPARSE_FIELDS = ("id", "currency_pair", "profit_amount", "loss_amount", "date_closed")
+
+def setup_client():
+    """Create the schema, a user and an account with TRADES trades"""
+    create_tables()
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    account = Account(user_id=user.id, name="bench", initial_balance=10000, current_balance=10000, currency="USD")
+    db.add(account)
+    db.flush()
+
+    start = datetime(2024, 1, 1)
+    db.execute(insert(Trade), [
+        {
+            "account_id": account.id,
+            "date_open": start + timedelta(minutes=i),
+            "date_closed": start + timedelta(minutes=i + 30) if i % 4 else None,
+            "currency_pair": "EURUSD" if i % 3 else "BTCUSD",
+            "position_size": Decimal("1000"),
+            "direction": "LONG" if i % 2 else "SHORT",
+            "entry_price": Decimal("1.1"),
+            "stop_loss": Decimal("1.09"),
+            "take_profit": Decimal("1.12"),
+            "exit_price": Decimal("1.11") if i % 4 else None,
+            "risk_reward": Decimal("2"),
+            "win_loss": ("WIN" if i % 2 else "LOSS") if i % 4 else "OPEN",
+            "profit_amount": Decimal("10.5") if i % 4 and i % 2 else None,
+            "loss_amount": Decimal("4.25") if i % 4 and not i % 2 else None,
+            "balance_after": Decimal("10000") + i if i % 4 else None,
+        }
+        for i in range(TRADES)
+    ])
+    db.commit()
+
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': str(user.id)})}"
+    account_id = account.id
+    db.close()
+    return client, account_id
+
+def orm_path(db, account_id):
+    # What the list endpoints did before: ORM instances validated one by
+    # one through TradeResponse, then encoded by the stdlib JSON encoder
+    trades = db.query(Trade).filter(Trade.account_id == account_id).order_by(Trade.date_open.desc(), Trade.id.desc()).all()
+    field = create_response_field("Response_list", List[TradeResponse])
+    content = asyncio.run(serialize_response(field=field, response_content=trades, is_coroutine=True))
+    return JSONResponse(content).body
+
+def row_path(db, account_id, fields=None):
+    rows = db.query(*list_columns(Trade, TradeResponse, fields, ("date_open", "id"))).filter(
+        Trade.account_id == account_id
+    ).order_by(Trade.date_open.desc(), Trade.id.desc()).all()
+    return list_response(TradeResponse, rows, Response(), fields).body
+
+def timed(function, *args):
+    """Best of ROUNDS runs, each in a fresh session; returns (seconds, body)"""
+    best = None
+    for _ in range(ROUNDS):
+        db = SessionLocal()
+        started = time.perf_counter()
+        body = function(db, *args)
+        elapsed = time.perf_counter() - started
+        db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+def bench_api(client, account_id, limit=500):
+    # End to end: page through every trade with the largest page size
+    started = time.perf_counter()
+    cursor, rows = None, 0
+    while True:
+        response = client.get(f"/api/trades/accounts/{account_id}/trades",
+                              params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        rows += len(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    elapsed = time.perf_counter() - started
+    logger.info(f"API, {limit}-row pages: {rows} trades in {elapsed * 1000:.0f} ms ({rows / elapsed:.0f} rows/s)")
+
+if __name__ == "__main__":
+    client, account_id = setup_client()
+
+    orm, orm_body = timed(orm_path, account_id)
+    rows, row_body = timed(row_path, account_id)
+    sparse, sparse_body = timed(row_path, account_id, SPARSE_FIELDS)
+
+    # The fast path must produce the same document
+    assert json.loads(orm_body) == json.loads(row_body), "row path output differs from the ORM path"
+    assert json.loads(sparse_body)[0].keys() == set(SPARSE_FIELDS)
+
+    logger.info(f"{TRADES} trades, ORM + per-row validation + json: {orm * 1000:.0f} ms ({TRADES / orm:.0f} rows/s)")
+    logger.info(f"{TRADES} trades, column rows + bulk TypeAdapter: {rows * 1000:.0f} ms ({TRADES / rows:.0f} rows/s), {orm / rows:.1f}x")
+    logger.info(f"{TRADES} trades, sparse fieldset of {len(SPARSE_FIELDS)}: {sparse * 1000:.0f} ms ({TRADES / sparse:.0f} rows/s), {orm / sparse:.1f}x")
+    bench_api(client, account_id)
@@ -0,0 +1,113 @@
+import sys
+import os
+import time
+import random
+import asyncio
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Run against a throwaway SQLite database in a temporary directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.chdir(tempfile.mkdtemp(prefix="bench_mark_to_market_"))
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.db.database import SessionLocal
+from app.db.init_db import create_tables
+from app.models.user import User
+from app.models.trade import Trade
+from app.models.account import Account
+from app.utils.mark_to_market import MarkToMarket
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ACCOUNTS = 500
+POSITIONS = 10000
+INSTRUMENTS = 40
+TICKS = 200000
+
+def setup_positions():
+    """Create ACCOUNTS accounts holding POSITIONS open trades over INSTRUMENTS instruments"""
+    create_tables()
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    db.execute(insert(Account), [
+        {"user_id": user.id, "name": f"bench {i}", "initial_balance": 10000, "current_balance": 10000, "currency": "USD"}
+        for i in range(ACCOUNTS)
+    ])
+    account_ids = [account_id for (account_id,) in db.query(Account.id).all()]
+
+    random.seed(1)
+    start = datetime(2024, 1, 1)
+    db.execute(insert(Trade), [
+        {
+            "account_id": random.choice(account_ids),
+            "date_open": start + timedelta(minutes=i),
+            "currency_pair": f"PAIR{i % INSTRUMENTS}",
+            "position_size": Decimal(random.randint(1, 100) * 1000),
+            "direction": random.choice(["LONG", "SHORT"]),
+            "entry_price": Decimal("1.1") + Decimal(random.randint(-500, 500)) / 10000,
+            "win_loss": "OPEN",
+        }
+        for i in range(POSITIONS)
+    ])
+    db.commit()
+    db.close()
+    return account_ids
+
+def tick_batches(batch_size):
+    random.seed(2)
+    prices = [1.1] * INSTRUMENTS
+    batch = []
+    for _ in range(TICKS):
+        instrument = random.randrange(INSTRUMENTS)
+        prices[instrument] *= 1 + random.gauss(0, 0.0001)
+        batch.append((f"PAIR{instrument}", prices[instrument]))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def bench(account_ids, batch_size, subscribed: bool):
+    engine = MarkToMarket()
+    engine.refresh()
+
+    # Every account watched by a client whose loop is idle, as when the
+    # WebSocket senders lag behind: updates coalesce instead of queueing
+    loop = asyncio.new_event_loop()
+    if subscribed:
+        engine.subscribe(account_ids, loop, asyncio.Event())
+
+    batches = list(tick_batches(batch_size))
+    started = time.perf_counter()
+    for batch in batches:
+        engine.ingest(batch)
+    elapsed = time.perf_counter() - started
+
+    # Incremental per-tick deltas must agree with a full recompute
+    incremental = engine.book.unrealized.copy()
+    engine.book.recompute()
+    drift = float(np.max(np.abs(incremental - engine.book.unrealized)))
+
+    stats = engine.stats()
+    logger.info(
+        f"batches of {batch_size:>4}{' +push' if subscribed else '      '}: {TICKS / elapsed:>9.0f} ticks/s, "
+        f"p50 {stats['p50_batch_ms']:.3f} ms, p99 {stats['p99_batch_ms']:.3f} ms, max {stats['max_batch_ms']:.1f} ms per batch, "
+        f"drift {drift:.2e}"
+    )
+    loop.close()
+
+if __name__ == "__main__":
+    account_ids = setup_positions()
+    logger.info(f"{POSITIONS} open positions, {ACCOUNTS} accounts, {INSTRUMENTS} instruments, {TICKS} ticks")
+    for batch_size in (1, 10, 100, 1000):
+        bench(account_ids, batch_size, subscribed=False)
+        bench(account_ids, batch_size, subscribed=True)
@@ -0,0 +1,54 @@
+import sys
+import os
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.utils.analytics import rolling_metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def synthetic_trades(count, seed=42):
+    """Closed trades, one every ~15 minutes, with random outcomes"""
+    rng = np.random.default_rng(seed)
+    is_win = rng.random(count) < 0.45
+    pnl = np.where(is_win, rng.gamma(2.0, 50.0, count), -rng.gamma(2.0, 30.0, count))
+    return pd.DataFrame({
+        "timestamp": np.datetime64("2015-01-01") + np.cumsum(rng.integers(60, 1800, count)).astype("timedelta64[s]"),
+        "pnl": pnl,
+        "r_multiple": pnl / 40.0,
+        "is_win": is_win.astype(np.int64),
+        "is_loss": (~is_win).astype(np.int64),
+    })
+
+def naive_win_rate(closed, window):
+    """Reference O(n*w) implementation for the correctness check"""
+    wins = closed["is_win"].to_numpy()
+    return np.array([wins[i - window + 1:i + 1].mean() for i in range(window - 1, len(wins))])
+
+def bench(count, windows):
+    closed = synthetic_trades(count)
+    
+    started = time.perf_counter()
+    rolling_metrics(closed, windows)
+    by_trades = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    rolling_metrics(closed, windows, by_days=True)
+    by_days = time.perf_counter() - started
+    
+    logger.info(f"{count:>9} trades, windows {windows}: {by_trades * 1000:.1f} ms by trades, {by_days * 1000:.1f} ms by days")
+
+if __name__ == "__main__":
+    # Correctness against the naive implementation on a small sample
+    sample = synthetic_trades(5000)
+    fast = rolling_metrics(sample, [50])[50]["win_rate"][49:]
+    assert np.allclose(fast, naive_win_rate(sample, 50)), "rolling win rate mismatch"
+    
+    for count in (10_000, 100_000, 1_000_000):
+        bench(count, [20, 50, 100, 500])
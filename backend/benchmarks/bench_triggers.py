@@ -0,0 +1,122 @@
+import sys
+import os
+import time
+import random
+import logging
+import tempfile
+
+# Run against a throwaway SQLite database in a temporary directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.chdir(tempfile.mkdtemp(prefix="bench_triggers_"))
+
+import numpy as np
+
+from app.utils.triggers import TriggerIndex
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TRADES = 50000
+INSTRUMENTS = 20
+TICKS = 200000
+
+def open_trades():
+    """TRADES open trades, each with a stop loss and a take profit: 2 * TRADES resting levels"""
+    random.seed(1)
+    rows = []
+    for trade_id in range(1, TRADES + 1):
+        direction = random.choice(["LONG", "SHORT"])
+        entry = 1.1 * (1 + random.uniform(-0.01, 0.01))
+        risk = entry * random.uniform(0.002, 0.03)
+        reward = risk * random.uniform(1, 3)
+        if direction == "LONG":
+            stop_loss, take_profit = entry - risk, entry + reward
+        else:
+            stop_loss, take_profit = entry + risk, entry - reward
+        rows.append((trade_id, trade_id % 500, f"PAIR{trade_id % INSTRUMENTS}", direction, 1000.0, entry, stop_loss, take_profit))
+    return rows
+
+def tick_batches(batch_size):
+    random.seed(2)
+    prices = [1.1] * INSTRUMENTS
+    batch = []
+    for _ in range(TICKS):
+        instrument = random.randrange(INSTRUMENTS)
+        prices[instrument] *= 1 + random.gauss(0, 0.0002)
+        batch.append((f"PAIR{instrument}", prices[instrument]))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class LinearScan:
+    """Baseline: every live level of the instrument compared on each batch (NumPy, no index)"""
+
+    def __init__(self, rows):
+        self.levels = {}
+        for trade_id, _, instrument, direction, _, _, stop_loss, take_profit in rows:
+            falls_to, rises_to = (stop_loss, take_profit) if direction == "LONG" else (take_profit, stop_loss)
+            self.levels.setdefault(instrument, []).extend([(falls_to, trade_id, True), (rises_to, trade_id, False)])
+        self.levels = {
+            instrument: (np.array([level[0] for level in levels]), np.array([level[1] for level in levels]),
+                         np.array([level[2] for level in levels]), np.ones(len(levels), dtype=bool))
+            for instrument, levels in self.levels.items()
+        }
+        self.fired = set()
+
+    def check(self, ticks):
+        paths = {}
+        for instrument, price in ticks:
+            paths.setdefault(instrument, []).append(price)
+
+        fired = []
+        for instrument, path in paths.items():
+            prices, trade_ids, falls, live = self.levels[instrument]
+            hit = live & np.where(falls, prices >= min(path), prices <= max(path))
+            for trade_id in np.unique(trade_ids[hit]).tolist():
+                if trade_id not in self.fired:
+                    self.fired.add(trade_id)
+                    fired.append({"trade_id": trade_id})
+            live &= ~np.isin(trade_ids, trade_ids[hit])
+        return fired
+
+def replay(engine, batches):
+    fired = []
+    latencies = []
+    started = time.perf_counter()
+    for batch in batches:
+        batch_started = time.perf_counter()
+        fired.append({event["trade_id"] for event in engine.check(batch)})
+        latencies.append((time.perf_counter() - batch_started) * 1000)
+    return time.perf_counter() - started, np.array(latencies), fired
+
+def bench(rows, batch_size):
+    batches = list(tick_batches(batch_size))
+
+    index = TriggerIndex()
+    started = time.perf_counter()
+    index.replace(range(500), rows)
+    build_ms = (time.perf_counter() - started) * 1000
+    resting = len(index)
+
+    indexed_elapsed, indexed_ms, indexed_fired = replay(index, batches)
+    scan_elapsed, scan_ms, scan_fired = replay(LinearScan(rows), batches)
+
+    # Same trades must fire in the same batches either way
+    assert indexed_fired == scan_fired, "trigger index and linear scan disagree"
+
+    logger.info(
+        f"batches of {batch_size:>4}: {resting} resting levels (built in {build_ms:.0f} ms), "
+        f"{sum(len(fired) for fired in indexed_fired)} trades fired; "
+        f"index {TICKS / indexed_elapsed:>9.0f} ticks/s (p99 {np.percentile(indexed_ms, 99):.3f} ms), "
+        f"linear scan {TICKS / scan_elapsed:>8.0f} ticks/s (p99 {np.percentile(scan_ms, 99):.3f} ms), "
+        f"{scan_elapsed / indexed_elapsed:.1f}x"
+    )
+
+if __name__ == "__main__":
+    rows = open_trades()
+    logger.info(f"{TRADES} open trades, {INSTRUMENTS} instruments, {TICKS} ticks")
+    for batch_size in (1, 10, 100, 1000):
+        bench(rows, batch_size)
@@ -0,0 +1,144 @@
+import sys
+import os
+import time
+import logging
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Run against a throwaway SQLite database in a temporary directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.chdir(tempfile.mkdtemp(prefix="stress_concurrent_close_"))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, func
+
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.init_db import create_tables
+from app.models.user import User
+from app.models.trade import Trade
+from app.models.account import Account
+from app.models.balance_entry import BalanceEntry
+from app.auth.jwt import create_access_token
+from app.utils.ledger import balance_at
+from app.utils.account_stats import rebuild_account_stats
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+TRADES = 400
+DEPOSITS = 100
+THREADS = 16
+INITIAL_BALANCE = Decimal("10000")
+
+def setup_client():
+    """Create the schema, a user, an account and its open trades"""
+    create_tables()
+    db = SessionLocal()
+    user = User(username="stress", email="stress@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    account = Account(user_id=user.id, name="stress", initial_balance=INITIAL_BALANCE,
+                      current_balance=INITIAL_BALANCE, currency="USD")
+    db.add(account)
+    db.flush()
+
+    start = datetime(2024, 1, 1)
+    db.execute(insert(Trade), [
+        {
+            "account_id": account.id,
+            "date_open": start + timedelta(minutes=i),
+            "currency_pair": "EURUSD",
+            "position_size": Decimal("1000"),
+            "direction": "LONG",
+            "entry_price": Decimal("1.1"),
+            "win_loss": "OPEN",
+        }
+        for i in range(TRADES)
+    ])
+    rebuild_account_stats(db, account.id)
+    db.commit()
+    trade_ids = [trade_id for (trade_id,) in db.query(Trade.id).order_by(Trade.id).all()]
+
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': str(user.id)})}"
+    account_id = account.id
+    db.close()
+    return client, account_id, trade_ids
+
+def close(client, trade_id, i):
+    return client.patch(f"/api/trades/trades/{trade_id}/close", json={
+        "date_closed": (datetime(2024, 2, 1) + timedelta(minutes=i)).isoformat(),
+        "exit_price": "1.2" if i % 2 else "1.05",
+        "win_loss": "WIN" if i % 2 else "LOSS",
+    }).status_code
+
+def deposit(client, account_id, i):
+    return client.post(f"/api/deposits/accounts/{account_id}/deposits", json={
+        "amount": "10",
+        "date": (datetime(2024, 1, 15) + timedelta(minutes=i)).isoformat(),
+    }).status_code
+
+def stress():
+    """
+    Close every trade twice at the same time, from THREADS threads, while
+    deposits come in. Each trade must close exactly once and the final
+    balance must match the trades and deposits actually written.
+    """
+    client, account_id, trade_ids = setup_client()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        closes = [pool.submit(close, client, trade_id, i) for i, trade_id in enumerate(trade_ids)]
+        closes += [pool.submit(close, client, trade_id, i) for i, trade_id in enumerate(trade_ids)]
+        deposits = [pool.submit(deposit, client, account_id, i) for i in range(DEPOSITS)]
+        close_statuses = Counter(future.result() for future in closes)
+        deposit_statuses = Counter(future.result() for future in deposits)
+    elapsed = time.perf_counter() - started
+
+    logger.info(f"{len(closes)} close requests and {DEPOSITS} deposits in {elapsed:.1f} s")
+    logger.info(f"close statuses: {dict(close_statuses)}, deposit statuses: {dict(deposit_statuses)}")
+
+    db = SessionLocal()
+    account = db.get(Account, account_id)
+    profit, loss, closed = db.query(
+        func.coalesce(func.sum(Trade.profit_amount), 0),
+        func.coalesce(func.sum(Trade.loss_amount), 0),
+        func.count(Trade.date_closed),
+    ).filter(Trade.account_id == account_id).one()
+    trade_entries = db.query(func.count(BalanceEntry.id)).filter(
+        BalanceEntry.account_id == account_id, BalanceEntry.source == "TRADE"
+    ).scalar()
+    expected = INITIAL_BALANCE + Decimal(profit) - Decimal(loss) + 10 * deposit_statuses[201]
+    ledger = balance_at(db, account)
+    db.close()
+
+    logger.info(f"balance {account.current_balance}, expected {expected}, ledger {ledger}")
+
+    failures = []
+    # The losing request of a double close gets 400 (already closed) or 409 (version check)
+    unexpected = set(close_statuses) - {200, 400, 409} | set(deposit_statuses) - {201}
+    if unexpected:
+        failures.append(f"unexpected statuses: {sorted(unexpected)}")
+    if close_statuses[200] != TRADES or closed != TRADES:
+        failures.append(f"{close_statuses[200]} successful closes and {closed} closed trades, expected {TRADES}")
+    if trade_entries != TRADES:
+        failures.append(f"{trade_entries} trade ledger entries, expected {TRADES}")
+    if abs(Decimal(account.current_balance) - expected) > Decimal("0.0001"):
+        failures.append("current_balance lost an update")
+    if abs(ledger - expected) > Decimal("0.0001"):
+        failures.append("ledger balance does not match")
+    return failures
+
+if __name__ == "__main__":
+    failures = stress()
+    for failure in failures:
+        logger.error(failure)
+    if failures:
+        sys.exit(1)
+    logger.info("No lost updates and no double closes")
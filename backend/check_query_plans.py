@@ -0,0 +1,106 @@
+import re
+import sys
+import logging
+from datetime import datetime
+from sqlalchemy import func, cast, Float
+from app.db.database import SessionLocal, engine
+from app.db.init_db import create_tables
+from app.models.account import Account
+from app.models.trade import Trade
+from app.models.deposit import Deposit
+from app.models.trade_detail import TradeDetail
+from app.models.trade_screenshot import TradeScreenshot
+from app.models.goal import Goal
+from app.models.balance_entry import BalanceEntry
+from app.models.balance_checkpoint import BalanceCheckpoint
+from app.utils.export import trades_statement, deposits_statement
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 12, 31)
+
+# (name, query, whether the rows must come out of the index already sorted)
+def hot_queries(db):
+    trades = db.query(Trade).filter(Trade.account_id == 1)
+    page = lambda query: query.order_by(Trade.date_open.desc(), Trade.id.desc()).limit(101)
+
+    return [
+        ("accounts of a user", db.query(Account).filter(Account.user_id == 1), False),
+        ("trade page", page(trades), True),
+        ("trade page, date range", page(trades.filter(Trade.date_open >= START, Trade.date_open <= END)), True),
+        ("trade page, open only", page(trades.filter(Trade.date_closed.is_(None))), True),
+        ("trade page, by outcome", page(trades.filter(Trade.win_loss == "WIN")), True),
+        ("closed trade totals", db.query(
+            func.sum(Trade.profit_amount), func.sum(Trade.loss_amount)
+        ).filter(Trade.account_id == 1, Trade.date_closed.isnot(None)), False),
+        ("closed trades of a user", db.query(Trade.id, cast(Trade.profit_amount, Float)).join(
+            Account, Trade.account_id == Account.id
+        ).filter(Account.user_id == 1, Trade.date_closed.isnot(None)), False),
+        ("trade export", trades_statement(1), True),
+        ("trade export with details", trades_statement(1, None, START, END, include_details=True), True),
+        ("deposit export", deposits_statement(1, None, START, END), True),
+        ("deposit page", db.query(Deposit).filter(Deposit.account_id == 1).order_by(
+            Deposit.date.desc(), Deposit.id.desc()
+        ).limit(101), True),
+        ("deposit total", db.query(func.sum(Deposit.amount)).filter(Deposit.account_id == 1), False),
+        ("trade details", db.query(TradeDetail).filter(TradeDetail.trade_id == 1), False),
+        ("screenshot page", db.query(TradeScreenshot).filter(TradeScreenshot.trade_id == 1).order_by(
+            TradeScreenshot.uploaded_at, TradeScreenshot.id
+        ).limit(101), True),
+        ("balance checkpoint seek", db.query(BalanceCheckpoint).filter(
+            BalanceCheckpoint.account_id == 1, BalanceCheckpoint.as_of <= END
+        ).order_by(BalanceCheckpoint.as_of.desc()).limit(1), True),
+        ("ledger sum after checkpoint", db.query(func.sum(BalanceEntry.amount)).filter(
+            BalanceEntry.account_id == 1, BalanceEntry.occurred_at > START, BalanceEntry.occurred_at <= END
+        ), False),
+        ("goal page", db.query(Goal).filter(Goal.user_id == 1).order_by(
+            Goal.start_date.desc(), Goal.id.desc()
+        ).limit(101), True),
+    ]
+
+def explain(db, query):
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return [row[-1] for row in rows]
+
+def problems(plan, sorted_by_index):
+    found = []
+    for step in plan:
+        # "SCAN trades" (or "SCAN TABLE trades" on older SQLite) reads the whole table
+        if re.match(r"SCAN (TABLE )?\w+$", step):
+            found.append(f"full scan: {step}")
+        if sorted_by_index and "TEMP B-TREE" in step:
+            found.append(f"sorts outside the index: {step}")
+    return found
+
+def check():
+    """EXPLAIN each hot query and report any that do not use an index"""
+    create_tables()
+
+    db = SessionLocal()
+    failures = 0
+    try:
+        for name, query, sorted_by_index in hot_queries(db):
+            plan = explain(db, query)
+            issues = problems(plan, sorted_by_index)
+            status = "FAIL" if issues else "ok"
+            logger.info(f"{status:4} {name}: {' | '.join(plan)}")
+            for issue in issues:
+                logger.error(f"     {issue}")
+            failures += bool(issues)
+    finally:
+        db.close()
+    return failures
+
+if __name__ == "__main__":
+    logger.info("Checking query plans of the hot queries")
+    failures = check()
+    if failures:
+        logger.error(f"{failures} query plan(s) do not use an index")
+        sys.exit(1)
+    logger.info("All hot queries use an index")
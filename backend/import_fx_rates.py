@@ -0,0 +1,57 @@
+import sys
+import csv
+import logging
+from datetime import datetime
+from decimal import Decimal
+from app.db.database import SessionLocal, engine, Base
+from app.models.fx_rate import FxRate
+from app.utils.fx import normalize_currency, PIVOT_CURRENCY
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def import_fx_rates(path):
+    """
+    Load FX rates from a CSV file with columns currency,as_of,rate where
+    rate is the price of one unit of currency in USD. A row replaces any
+    existing rate for the same currency and as_of.
+    """
+    # Create the table if this database predates it
+    Base.metadata.create_all(bind=engine, tables=[FxRate.__table__])
+    
+    with open(path, newline="") as f:
+        rows = [
+            {
+                "currency": normalize_currency(row["currency"]),
+                "as_of": datetime.fromisoformat(row["as_of"]),
+                "rate": Decimal(row["rate"]),
+            }
+            for row in csv.DictReader(f)
+        ]
+    
+    rows = [row for row in rows if row["currency"] != PIVOT_CURRENCY]
+    
+    db = SessionLocal()
+    try:
+        for row in rows:
+            db.query(FxRate).filter(
+                FxRate.currency == row["currency"],
+                FxRate.as_of == row["as_of"]
+            ).delete(synchronize_session=False)
+        db.add_all([FxRate(**row) for row in rows])
+        db.commit()
+        logger.info(f"Imported {len(rows)} FX rate(s) from {path}")
+    except Exception as e:
+        logger.error(f"Error importing FX rates: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python import_fx_rates.py <rates.csv>")
+        sys.exit(1)
+    
+    import_fx_rates(sys.argv[1])
@@ -0,0 +1,26 @@
+import logging
+from app.db.database import SessionLocal
+from app.utils.snapshots import prune_all_snapshots
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def prune():
+    """Apply the analysis_results retention policies to every user"""
+    db = SessionLocal()
+    try:
+        deleted = prune_all_snapshots(db)
+        db.commit()
+        logger.info(f"Deleted {deleted} expired analysis result(s)")
+    except Exception as e:
+        logger.error(f"Error pruning analysis results: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logger.info("Starting analysis results pruning")
+    prune()
+    logger.info("Analysis results pruning completed")
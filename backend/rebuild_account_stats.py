@@ -0,0 +1,34 @@
+import sys
+import logging
+from app.db.database import SessionLocal, engine, Base
+from app.models.account_stats import AccountStats
+from app.utils.account_stats import rebuild_all_account_stats
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def rebuild(account_ids=None):
+    """Repair the account_stats table from the raw trades"""
+    # Create the table if this database predates it
+    Base.metadata.create_all(bind=engine, tables=[AccountStats.__table__])
+    
+    db = SessionLocal()
+    try:
+        written = rebuild_all_account_stats(db, account_ids)
+        db.commit()
+        logger.info(f"Rebuilt stats for {written} account(s)")
+    except Exception as e:
+        logger.error(f"Error rebuilding account stats: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    # Optional account ids, e.g. `python rebuild_account_stats.py 3 7`
+    account_ids = [int(arg) for arg in sys.argv[1:]] or None
+    
+    logger.info("Starting account stats rebuild")
+    rebuild(account_ids)
+    logger.info("Account stats rebuild completed")
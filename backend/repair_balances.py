@@ -0,0 +1,63 @@
+import sys
+import logging
+from app.db.database import SessionLocal
+from app.db.init_db import create_tables
+from app.models.account import Account
+from app.utils.balances import balance_discrepancies, recompute_balance, recompute_balance_after
+from app.utils.data_version import bump_data_version
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def repair(account_ids=None, fix=False):
+    """
+    Check current_balance of the given accounts (all if None) against
+    initial balance + deposits + P&L. With fix, reset the drifted
+    balances and rewrite every trade's balance_after.
+    """
+    # Apply pending migrations if this database predates them
+    create_tables()
+
+    db = SessionLocal()
+    try:
+        discrepancies = balance_discrepancies(db, account_ids)
+        for account_id, current, expected in discrepancies:
+            logger.warning(f"Account {account_id}: current_balance {current}, expected {expected}")
+        logger.info(f"{len(discrepancies)} account balance(s) out of line")
+
+        if not fix:
+            return discrepancies
+
+        accounts = db.query(Account)
+        if account_ids is not None:
+            accounts = accounts.filter(Account.id.in_(account_ids))
+
+        drifted = {account_id for account_id, _, _ in discrepancies}
+        for account in accounts.all():
+            if account.id in drifted:
+                recompute_balance(db, account)
+            rewritten = recompute_balance_after(db, account)
+            if rewritten:
+                logger.info(f"Account {account.id}: rewrote balance_after of {rewritten} trade(s)")
+            # Clients holding the old values must not get a 304
+            if account.id in drifted or rewritten:
+                bump_data_version(db, account.user_id, account.id)
+        db.commit()
+        return discrepancies
+    except Exception as e:
+        logger.error(f"Error repairing balances: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    # `python repair_balances.py [--fix] [account_id ...]`
+    args = sys.argv[1:]
+    fix = "--fix" in args
+    account_ids = [int(arg) for arg in args if arg != "--fix"] or None
+
+    logger.info("Starting balance check" + (" and repair" if fix else ""))
+    repair(account_ids, fix)
+    logger.info("Balance check completed")
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app's SQLite URL is relative to the working directory and resolved
+# when the engine is created, so move to a throwaway directory first
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.chdir(tempfile.mkdtemp(prefix="trading_journal_tests_"))
+
+from fastapi.testclient import TestClient
+
+from app.db.database import engine, SessionLocal
+from app.db.init_db import create_tables
+from app.models.user import User
+from app.models.account import Account
+from app.auth.jwt import create_access_token
+
+
+@pytest.fixture
+def db():
+    # A fresh database file for every test
+    engine.dispose()
+    if os.path.exists("trading_journal.db"):
+        os.remove("trading_journal.db")
+    create_tables()
+    session = SessionLocal()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    user = User(username="trader", email="trader@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def account(db, user):
+    account = Account(user_id=user.id, name="Main", initial_balance=1000, current_balance=1000, currency="USD")
+    db.add(account)
+    db.commit()
+    return account
+
+
+@pytest.fixture
+def client(db, user):
+    from app.main import app
+
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': str(user.id)})}"
+    return client
@@ -0,0 +1,74 @@
+from datetime import datetime
+from decimal import Decimal
+
+from app.models.account_stats import AccountStats
+from app.utils.account_stats import rebuild_account_stats
+
+EXTREMES = ("max_profit", "max_loss", "first_open", "last_close")
+
+
+def open_and_close(client, account_id, day, exit_price, win_loss="WIN"):
+    trade = client.post(f"/api/trades/accounts/{account_id}/trades", json={
+        "currency_pair": "EURUSD",
+        "position_size": "100",
+        "direction": "LONG",
+        "entry_price": "1.0",
+        "date_open": f"2024-05-{day:02d}T00:00:00",
+    }).json()
+    response = client.patch(f"/api/trades/trades/{trade['id']}/close", json={
+        "date_closed": f"2024-05-{day:02d}T12:00:00",
+        "exit_price": exit_price,
+        "win_loss": win_loss,
+    })
+    assert response.status_code == 200
+    return trade["id"]
+
+
+def stats_of(db, account_id):
+    db.expire_all()
+    stats = db.get(AccountStats, account_id)
+    return {name: getattr(stats, name) for name in EXTREMES + ("total_count", "win_count", "loss_count")}
+
+
+def rebuilt(db, account_id):
+    # What a full recompute from the trades table gives
+    stats = rebuild_account_stats(db, account_id)
+    values = {name: getattr(stats, name) for name in EXTREMES + ("total_count", "win_count", "loss_count")}
+    db.rollback()
+    return values
+
+
+def test_removing_the_extreme_trade_requeries_the_extremes(client, db, account):
+    first = open_and_close(client, account.id, 1, "1.1")
+    largest = open_and_close(client, account.id, 2, "1.3")
+    open_and_close(client, account.id, 3, "1.2")
+    loss = open_and_close(client, account.id, 4, "0.9", "LOSS")
+
+    stats = stats_of(db, account.id)
+    assert stats["max_profit"] == Decimal(30)
+    assert stats["max_loss"] == Decimal(10)
+
+    # The largest win, the only loss, then the earliest open
+    for trade_id in (largest, loss, first):
+        assert client.delete(f"/api/trades/trades/{trade_id}").status_code == 204
+        assert stats_of(db, account.id) == rebuilt(db, account.id)
+
+    stats = stats_of(db, account.id)
+    assert stats["max_profit"] == Decimal(20)
+    assert stats["max_loss"] is None
+    assert stats["first_open"] == datetime(2024, 5, 3)
+    assert stats["last_close"] == datetime(2024, 5, 3, 12)
+    assert stats["total_count"] == 1
+
+
+def test_removing_a_trade_below_the_extremes_keeps_them(client, db, account):
+    open_and_close(client, account.id, 1, "1.3")
+    smaller = open_and_close(client, account.id, 2, "1.1")
+    open_and_close(client, account.id, 3, "1.2")
+
+    assert client.delete(f"/api/trades/trades/{smaller}").status_code == 204
+
+    stats = stats_of(db, account.id)
+    assert stats == rebuilt(db, account.id)
+    assert stats["max_profit"] == Decimal(30)
+    assert stats["first_open"] == datetime(2024, 5, 1)
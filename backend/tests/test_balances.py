@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from app.models.trade import Trade
+from app.utils.balances import recompute_balance_after
+
+
+def open_and_close(client, account_id, day, exit_price):
+    trade = client.post(f"/api/trades/accounts/{account_id}/trades", json={
+        "currency_pair": "EURUSD",
+        "position_size": "100",
+        "direction": "LONG",
+        "entry_price": "1.0",
+        "date_open": f"2024-05-{day:02d}T00:00:00",
+    }).json()
+    response = client.patch(f"/api/trades/trades/{trade['id']}/close", json={
+        "date_closed": f"2024-05-{day:02d}T12:00:00",
+        "exit_price": exit_price,
+        "win_loss": "WIN",
+    })
+    assert response.status_code == 200
+    return trade["id"]
+
+
+def balances_after(client, account_id):
+    trades = client.get(f"/api/trades/accounts/{account_id}/trades", params={"order": "asc"}).json()
+    return [Decimal(trade["balance_after"]) for trade in trades]
+
+
+def test_backdated_delete_shifts_later_balance_after(client, account):
+    first = open_and_close(client, account.id, 1, "1.1")
+    open_and_close(client, account.id, 2, "1.2")
+    open_and_close(client, account.id, 3, "1.3")
+    assert balances_after(client, account.id) == [1010, 1030, 1060]
+
+    assert client.delete(f"/api/trades/trades/{first}").status_code in (200, 204)
+
+    assert balances_after(client, account.id) == [1020, 1050]
+    assert Decimal(client.get(f"/api/accounts/{account.id}").json()["current_balance"]) == 1050
+
+
+def test_backdated_deposit_counts_before_later_trades(client, account):
+    open_and_close(client, account.id, 1, "1.1")
+    open_and_close(client, account.id, 3, "1.3")
+
+    response = client.post(f"/api/deposits/accounts/{account.id}/deposits", json={
+        "amount": "500",
+        "date": "2024-05-02T00:00:00",
+    })
+    assert response.status_code in (200, 201)
+
+    assert balances_after(client, account.id) == [1010, 1540]
+
+
+def test_recompute_rewrites_only_wrong_values(client, db, account):
+    open_and_close(client, account.id, 1, "1.1")
+    second = open_and_close(client, account.id, 2, "1.2")
+    open_and_close(client, account.id, 3, "1.3")
+
+    db.query(Trade).filter(Trade.id == second).update({Trade.balance_after: 0}, synchronize_session=False)
+    db.commit()
+
+    assert recompute_balance_after(db, account) == 1
+    db.commit()
+    assert balances_after(client, account.id) == [1010, 1030, 1060]
+    assert recompute_balance_after(db, account) == 0
+
+
+def test_batch_close_mixes_aware_and_naive_times(client, account):
+    ids = [
+        client.post(f"/api/trades/accounts/{account.id}/trades", json={
+            "currency_pair": "EURUSD",
+            "position_size": "100",
+            "direction": "LONG",
+            "entry_price": "1.0",
+            "date_open": "2024-05-01T00:00:00",
+        }).json()["id"]
+        for _ in range(2)
+    ]
+
+    # 10:00+02:00 is 08:00 UTC, before the naive (UTC) 09:00 close
+    response = client.patch("/api/trades/trades/close-batch", json={"trades": [
+        {"trade_id": ids[0], "date_closed": "2024-05-02T09:00:00", "exit_price": "1.1", "win_loss": "WIN"},
+        {"trade_id": ids[1], "date_closed": "2024-05-02T10:00:00+02:00", "exit_price": "1.2", "win_loss": "WIN"},
+    ]})
+
+    assert response.status_code == 200
+    assert [Decimal(trade["balance_after"]) for trade in response.json()] == [1030, 1020]
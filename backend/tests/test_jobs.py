@@ -0,0 +1,105 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils import jobs
+from app.schemas.analysis import JobCreate
+from app.utils.jobs import JobManager
+
+
+@pytest.fixture
+def release(monkeypatch):
+    # One worker that holds every job until the test releases it
+    release = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=1)
+
+    def execute_job(kind, user_id, params):
+        release.wait(5)
+        now = time.time()
+        return {"result_id": None, "content_hash": None, "started_at": now, "finished_at": now}
+
+    monkeypatch.setattr(jobs, "execute_job", execute_job)
+    monkeypatch.setattr(jobs, "get_process_pool", lambda name: pool)
+    monkeypatch.setattr(jobs, "remember_hash", lambda *args: None)
+    yield release
+    release.set()
+    pool.shutdown(wait=True)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_queued_job_is_cancelled_before_it_reaches_a_worker(release):
+    manager = JobManager(max_per_user=5, workers=1)
+    first = manager.submit(1, "pattern_analysis", {})
+    second = manager.submit(1, "pattern_analysis", {})
+    third = manager.submit(1, "pattern_analysis", {})
+
+    # Only as many jobs as workers are handed to the pool
+    assert first.snapshot()["status"] == "running"
+    assert second.snapshot()["status"] == "queued"
+    assert second.snapshot()["started_at"] is None
+    assert second.future is None
+
+    assert manager.cancel(second).status == "cancelled"
+
+    release.set()
+    wait_for(lambda: third.status == "done")
+
+    assert first.status == "done"
+    assert second.future is None
+    stats = manager.stats()
+    assert (stats["completed"], stats["cancelled"]) == (2, 1)
+
+
+def test_running_job_is_cancelled_once_it_finishes(release):
+    manager = JobManager(max_per_user=5, workers=1)
+    job = manager.submit(1, "pattern_analysis", {})
+
+    assert manager.cancel(job).status == "cancelling"
+
+    release.set()
+    wait_for(lambda: job.status == "cancelled")
+    assert job.result_id is None
+
+
+@pytest.mark.parametrize("kind, params, path", [
+    ("recommendations", {}, "/api/analysis/recommendations"),
+    ("equity", {"points": 10}, "/api/analysis/equity?points=10"),
+    ("rolling", {"windows": [2]}, "/api/analysis/rolling?windows=2"),
+    ("portfolio", {}, "/api/analysis/portfolio"),
+])
+def test_report_jobs_match_the_routes(client, db, user, account, kind, params, path):
+    for day in range(1, 5):
+        trade = client.post(f"/api/trades/accounts/{account.id}/trades", json={
+            "currency_pair": "EURUSD",
+            "position_size": "100",
+            "direction": "LONG",
+            "entry_price": "1.0",
+            "stop_loss": "0.9",
+            "date_open": f"2024-05-{day:02d}T00:00:00",
+        }).json()
+        client.patch(f"/api/trades/trades/{trade['id']}/close", json={
+            "date_closed": f"2024-05-{day:02d}T12:00:00",
+            "exit_price": "1.1" if day % 2 else "0.95",
+            "win_loss": "WIN" if day % 2 else "LOSS",
+        })
+
+    # What a worker computes from the validated params, in JSON form; the
+    # fixture's session still holds the account as it was before the closes
+    db.expire_all()
+    job = JobCreate(kind=kind, params=params)
+    data = jobs._run_report(db, kind, user.id, job.params)
+    data = json.loads(json.dumps(data, default=lambda value: value.isoformat()))
+
+    expected = client.get(path).json()
+    data.pop("as_of", None)
+    expected.pop("as_of", None)
+    assert data == expected
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.models.balance_checkpoint import BalanceCheckpoint
+from app.utils.ledger import LEDGER_CHECKPOINT_INTERVAL, post_entries, balance_at
+
+START = datetime(2024, 1, 1)
+
+
+def post(db, account, entries):
+    post_entries(db, account, [(amount, at, "DEPOSIT", None) for at, amount in entries])
+    # The before_commit listener writes the checkpoints
+    db.commit()
+
+
+def expected(account, entries, at, inclusive=True):
+    return Decimal(account.initial_balance) + sum(
+        (Decimal(amount) for occurred_at, amount in entries if occurred_at < at or (inclusive and occurred_at == at)),
+        Decimal(0)
+    )
+
+
+def checkpoints(db, account):
+    return db.query(BalanceCheckpoint).filter(
+        BalanceCheckpoint.account_id == account.id
+    ).order_by(BalanceCheckpoint.as_of).all()
+
+
+def ledger(count):
+    # One entry at START, then pairs sharing a timestamp, so an interval
+    # boundary falls between two entries of the same time
+    return [(START, 1)] + [(START + timedelta(minutes=1 + i // 2), i + 2) for i in range(count - 1)]
+
+
+def test_checkpoints_cover_every_entry_at_their_time(db, account):
+    entries = ledger(2 * LEDGER_CHECKPOINT_INTERVAL + 10)
+    post(db, account, entries)
+
+    written = checkpoints(db, account)
+    assert len(written) == 2
+    for checkpoint in written:
+        assert Decimal(account.initial_balance) + Decimal(checkpoint.total) == expected(account, entries, checkpoint.as_of)
+        # Never between two entries of the same time
+        assert sum(1 for at, _ in entries if at == checkpoint.as_of) == 2
+
+
+def test_balance_at_a_checkpoint_and_between_checkpoints(db, account):
+    entries = ledger(2 * LEDGER_CHECKPOINT_INTERVAL + 10)
+    post(db, account, entries)
+    first, second = checkpoints(db, account)
+
+    # Exactly at a checkpoint: both entries of that time, or neither
+    assert balance_at(db, account, first.as_of) == expected(account, entries, first.as_of)
+    assert balance_at(db, account, first.as_of, inclusive=False) == expected(account, entries, first.as_of, inclusive=False)
+
+    # Between the two checkpoints, on an entry time and between entry times
+    middle = first.as_of + (second.as_of - first.as_of) / 2
+    for at in (middle, middle + timedelta(seconds=30), second.as_of - timedelta(minutes=1)):
+        assert balance_at(db, account, at) == expected(account, entries, at)
+        assert balance_at(db, account, at, inclusive=False) == expected(account, entries, at, inclusive=False)
+
+    # Before the first checkpoint, after the last, and now
+    assert balance_at(db, account, START, inclusive=False) == Decimal(account.initial_balance)
+    assert balance_at(db, account, START) == expected(account, entries, START)
+    end = entries[-1][0]
+    assert balance_at(db, account, end) == expected(account, entries, end)
+    assert balance_at(db, account) == Decimal(account.current_balance)
+
+
+def test_backdated_entry_rewrites_later_checkpoints(db, account):
+    entries = ledger(2 * LEDGER_CHECKPOINT_INTERVAL + 10)
+    post(db, account, entries)
+    first, second = checkpoints(db, account)
+
+    backdated = [(first.as_of + timedelta(seconds=1), 1000)]
+    post(db, account, backdated)
+    entries += backdated
+
+    written = checkpoints(db, account)
+    assert written[0].as_of == first.as_of
+    for checkpoint in written:
+        assert Decimal(account.initial_balance) + Decimal(checkpoint.total) == expected(account, entries, checkpoint.as_of)
+
+    for at in (first.as_of, backdated[0][0], second.as_of, entries[-2][0]):
+        assert balance_at(db, account, at) == expected(account, entries, at)
@@ -0,0 +1,120 @@
+import io
+from decimal import Decimal
+
+from app.utils.statements import read_fills, read_mt_statement, _mt_columns
+from app.utils.trade_import import import_trades
+
+FILLS = """Date(UTC),Pair,Side,Price,Executed,Trade ID
+2024-01-02 10:00:00,BTC/USDT,BUY,100,1,f1
+2024-01-02 11:00:00,BTC/USDT,BUY,110,2,f2
+2024-01-02 12:00:00,BTC/USDT,SELL,120,2,f3
+2024-01-02 13:00:00,BTC/USDT,SELL,90,1,f4
+"""
+
+
+def newest_first(csv_text: str) -> str:
+    header, *rows = csv_text.strip().split("\n")
+    return "\n".join([header, *reversed(rows)]) + "\n"
+
+
+def records(reader, text: str):
+    return list(reader(io.BytesIO(text.encode())))
+
+
+def test_fills_match_partial_lots_fifo():
+    rows = records(read_fills, FILLS)
+
+    assert [error for _, _, error in rows] == [None, None, None]
+    trades = [record for _, record, _ in rows]
+    assert [trade["external_id"] for trade in trades] == ["fill:f1:f3", "fill:f2:f3", "fill:f2:f4"]
+    assert [Decimal(trade["position_size"]) for trade in trades] == [1, 1, 1]
+    assert [trade["entry_price"] for trade in trades] == ["100", "110", "110"]
+    assert [trade["win_loss"] for trade in trades] == ["WIN", "WIN", "LOSS"]
+    assert all(trade["currency_pair"] == "BTCUSDT" and trade["direction"] == "LONG" for trade in trades)
+    assert trades[2]["date_open"] == "2024-01-02 11:00:00"
+    assert trades[2]["date_closed"] == "2024-01-02 13:00:00"
+
+
+def test_fills_reversal_opens_the_remainder():
+    fills = """time,symbol,side,price,qty,id
+1,ETHUSDT,BUY,10,1,a
+2,ETHUSDT,SELL,12,3,b
+3,ETHUSDT,BUY,11,2,c
+"""
+    trades = [record for _, record, _ in records(read_fills, fills)]
+
+    # b closes a's lot and leaves a short of 2, which c closes
+    assert [(trade["external_id"], trade["direction"], trade["position_size"]) for trade in trades] == [
+        ("fill:a:b", "LONG", "1"),
+        ("fill:b:c", "SHORT", "2"),
+    ]
+    assert trades[1]["win_loss"] == "WIN"
+
+
+def test_fills_newest_first_file_is_read_in_time_order():
+    oldest_first = records(read_fills, FILLS)
+    reversed_rows = records(read_fills, newest_first(FILLS))
+
+    assert [record for _, record, _ in reversed_rows] == [record for _, record, _ in oldest_first]
+    # Row numbers still point at the lines of the file as uploaded
+    assert [row_number for row_number, _, _ in oldest_first] == [3, 3, 4]
+    assert [row_number for row_number, _, _ in reversed_rows] == [2, 2, 1]
+
+
+def test_fills_missing_columns_are_reported():
+    rows = records(read_fills, "Date,Pair,Price\n2024-01-02,BTCUSDT,100\n")
+
+    assert rows == [(1, None, "Missing fill columns: quantity, side")]
+
+
+def test_mt_columns_maps_mt4_and_mt5_headers():
+    mt4 = _mt_columns(["Ticket", "Open Time", "Type", "Size", "Item", "Price", "S / L", "T / P",
+                       "Close Time", "Price", "Commission", "Taxes", "Swap", "Profit"])
+    assert {name: mt4[name] for name in ("ticket", "open_time", "symbol", "size", "open_price", "close_time", "close_price", "profit")} == {
+        "ticket": 0, "open_time": 1, "symbol": 4, "size": 3, "open_price": 5, "close_time": 8, "close_price": 9, "profit": 13,
+    }
+
+    # MT5 repeats Time and Price; the second of each is the close
+    mt5 = _mt_columns(["Time", "Position", "Symbol", "Type", "Volume", "Price", "S / L", "T / P",
+                       "Time", "Price", "Commission", "Swap", "Profit"])
+    assert {name: mt5[name] for name in ("ticket", "open_time", "symbol", "size", "open_price", "close_time", "close_price")} == {
+        "ticket": 1, "open_time": 0, "symbol": 2, "size": 4, "open_price": 5, "close_time": 8, "close_price": 9,
+    }
+
+    assert _mt_columns(["Deposit/Withdrawal:", "1 000.00"]) is None
+
+
+def test_mt4_statement_rows():
+    html = """<table>
+<tr><td colspan=14>Closed Transactions:</td></tr>
+<tr><td>Ticket</td><td>Open Time</td><td>Type</td><td>Size</td><td>Item</td><td>Price</td><td>S / L</td><td>T / P</td>
+<td>Close Time</td><td>Price</td><td>Commission</td><td>Taxes</td><td>Swap</td><td>Profit</td></tr>
+<tr><td>1001</td><td>2024.01.02 10:00:00</td><td>buy</td><td>0.10</td><td>eurusd</td><td>1.1000</td><td>1.0950</td><td>0.0000</td>
+<td>2024.01.02 12:00:00</td><td>1.1020</td><td>-0.70</td><td>0.00</td><td>0.00</td><td>20.00</td></tr>
+<tr><td>1002</td><td>2024.01.02 13:00:00</td><td>balance</td><td colspan=10>Deposit</td><td>500.00</td></tr>
+</table>"""
+    rows = records(read_mt_statement, html)
+
+    assert len(rows) == 1
+    _, record, error = rows[0]
+    assert error is None
+    assert record["external_id"] == "mt:1001"
+    assert record["currency_pair"] == "EURUSD"
+    assert record["date_open"] == "2024-01-02T10:00:00"
+    assert record["stop_loss"] == "1.0950"
+    assert record["take_profit"] is None
+    assert record["pnl"] == Decimal("19.30")
+    assert record["win_loss"] == "WIN"
+
+
+def test_reimport_of_overlapping_export_skips_known_trades(db, account):
+    first = import_trades(db, account, records(read_fills, FILLS))
+    assert (first["imported"], first["duplicates"], first["failed"]) == (3, 0, 0)
+
+    again = import_trades(db, account, records(read_fills, newest_first(FILLS)))
+    assert (again["imported"], again["duplicates"]) == (0, 3)
+
+    # A later export overlapping the first adds only the new round trip
+    later = FILLS + "2024-01-03 09:00:00,BTC/USDT,BUY,95,1,f5\n2024-01-03 10:00:00,BTC/USDT,SELL,97,1,f6\n"
+    overlap = import_trades(db, account, records(read_fills, later))
+    assert (overlap["imported"], overlap["duplicates"]) == (1, 3)
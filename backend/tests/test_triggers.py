@@ -0,0 +1,58 @@
+import pytest
+
+from app.utils.triggers import TriggerIndex
+
+
+def row(trade_id, direction="LONG", stop_loss=0.95, take_profit=1.05, instrument="EURUSD"):
+    return (trade_id, 1, instrument, direction, 1000.0, 1.0, stop_loss, take_profit)
+
+
+def fired(events):
+    return [(event["trade_id"], event["trigger"], event["price"]) for event in events]
+
+
+@pytest.mark.parametrize("ticks, expected", [
+    # Target reached first, then the stop
+    ([1.01, 1.06, 0.94], [(1, "TAKE_PROFIT", 1.06)]),
+    # Stop reached first, then the target
+    ([0.99, 0.94, 1.06], [(1, "STOP_LOSS", 0.94)]),
+])
+def test_batch_crossing_both_levels_fires_once_on_the_first(ticks, expected):
+    index = TriggerIndex()
+    index.replace([1], [row(1)])
+
+    assert fired(index.check([("EURUSD", price) for price in ticks])) == expected
+
+    # Neither level fires again until the trade is re-indexed
+    assert index.check([("EURUSD", 0.5), ("EURUSD", 1.5)]) == []
+
+
+def test_short_trade_fires_on_the_first_tick_past_its_level():
+    index = TriggerIndex()
+    index.replace([1], [row(1, "SHORT", stop_loss=1.05, take_profit=0.95), row(2, instrument="GBPUSD")])
+
+    events = index.check([("EURUSD", 1.0), ("GBPUSD", 1.0), ("EURUSD", 0.96), ("EURUSD", 0.93), ("EURUSD", 0.90)])
+
+    assert fired(events) == [(1, "TAKE_PROFIT", 0.93)]
+    assert fired(index.check([("EURUSD", 1.10), ("GBPUSD", 0.94)])) == [(2, "STOP_LOSS", 0.94)]
+
+
+def test_replace_rearms_only_when_the_levels_change():
+    index = TriggerIndex()
+    index.replace([1], [row(1)])
+    assert fired(index.check([("EURUSD", 0.94)])) == [(1, "STOP_LOSS", 0.94)]
+
+    # Same levels (e.g. another trade of the account changed): stays fired
+    index.replace([1], [row(1), row(2, stop_loss=0.90)])
+    assert fired(index.check([("EURUSD", 0.93)])) == []
+
+    # Stop moved: armed again at the new level
+    index.replace([1], [row(1, stop_loss=0.92), row(2, stop_loss=0.90)])
+    assert fired(index.check([("EURUSD", 0.93)])) == []
+    assert fired(index.check([("EURUSD", 0.91)])) == [(1, "STOP_LOSS", 0.91)]
+
+    # Trade closed (no longer in the account's rows), then reopened with
+    # the same levels: a new position, so armed again
+    index.replace([1], [row(2, stop_loss=0.90)])
+    index.replace([1], [row(1, stop_loss=0.92), row(2, stop_loss=0.90)])
+    assert fired(index.check([("EURUSD", 0.89)])) == [(1, "STOP_LOSS", 0.89), (2, "STOP_LOSS", 0.89)]